@@ -0,0 +1,98 @@
+"""
+Versioned response cache for the public catalog endpoints.
+
+Rendered JSON bytes are stored per (namespace, version, language, lookup) in the
+default cache backend. Saving or deleting any catalog model bumps the namespace
+version (see ``core.cache`` and ``api.signals``), so stale entries are never read
+again and simply expire on their own TTL. Nothing is cached while the default
+backend is process-local (``core.cache.versioned_cache_enabled``).
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.translation import get_language
+from rest_framework.response import Response
+
+from core.cache import get_cache_version, versioned_cache_enabled
+
+# How long a rendered catalog response stays cached (seconds). Invalidation is
+# driven by version bumps, so this only bounds memory held by old versions.
+CATALOG_CACHE_TIMEOUT = getattr(settings, "API_CATALOG_CACHE_TIMEOUT", 3600)
+
+
+def catalog_cache_key(namespace, lookup=None):
+    """Build the cache key for a list (``lookup=None``) or detail response."""
+    version = get_cache_version(f"api:{namespace}")
+    language = get_language() or settings.LANGUAGE_CODE
+    return f"api:catalog:{namespace}:v{version}:{language}:{lookup or '__list__'}"
+
+
+def _etag(content):
+    return f'"{hashlib.md5(content, usedforsecurity=False).hexdigest()}"'
+
+
+def _etag_matches(request, etag):
+    header = request.META.get("HTTP_IF_NONE_MATCH", "")
+    if not header:
+        return False
+    candidates = {tag.strip() for tag in header.split(",")}
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+class CatalogCacheMixin:
+    """
+    Serve ``list``/``retrieve`` from the versioned catalog cache.
+
+    Usage:
+        class ServicoViewSet(CatalogCacheMixin, viewsets.ReadOnlyModelViewSet):
+            cache_namespace = "servicos"
+
+    Only JSON responses with status 200 are cached. Every cached response carries
+    an ``ETag``; conditional GETs with a matching ``If-None-Match`` get a 304.
+    """
+
+    cache_namespace = None
+
+    def list(self, request, *args, **kwargs):
+        return self._cached_response(super().list, request, None, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup = kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        return self._cached_response(super().retrieve, request, lookup, *args, **kwargs)
+
+    def _cached_response(self, handler, request, lookup, *args, **kwargs):
+        if request.accepted_renderer.format != "json" or not versioned_cache_enabled():
+            return handler(request, *args, **kwargs)
+
+        key = catalog_cache_key(self.cache_namespace, lookup)
+        cached = cache.get(key)
+        if cached is None:
+            self._catalog_cache_key = key
+            return handler(request, *args, **kwargs)
+
+        etag, content_type, content = cached
+        if _etag_matches(request, etag):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(content, content_type=content_type)
+        response["ETag"] = etag
+        patch_vary_headers(response, ("Accept",))
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        key = getattr(self, "_catalog_cache_key", None)
+        if key and isinstance(response, Response) and response.status_code == 200:
+            response.render()
+            etag = _etag(response.content)
+            cache.set(
+                key,
+                (etag, response["Content-Type"], response.content),
+                CATALOG_CACHE_TIMEOUT,
+            )
+            response["ETag"] = etag
+        return response
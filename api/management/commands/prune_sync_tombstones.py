@@ -0,0 +1,21 @@
+"""
+Management command to delete delta-sync tombstones past their retention.
+
+Meant to run once a day (cron / systemd timer):
+    python manage.py prune_sync_tombstones
+
+Clients whose watermark is older than ``SYNC_TOMBSTONE_RETENTION_DAYS`` get a
+full snapshot (``reset``) on their next sync, so nothing is lost.
+"""
+
+from django.core.management.base import BaseCommand
+
+from api.sync import prune_tombstones
+
+
+class Command(BaseCommand):
+    help = "Delete delta-sync deletion tombstones older than SYNC_TOMBSTONE_RETENTION_DAYS"
+
+    def handle(self, *args, **options):
+        deleted = prune_tombstones()
+        self.stdout.write(self.style.SUCCESS(f"✓ {deleted} tombstones pruned"))
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="RegistroExclusao",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("colecao", models.CharField(max_length=20, verbose_name="Coleção")),
+                ("objeto_id", models.BigIntegerField(verbose_name="ID do Objeto")),
+                ("usuario_id", models.BigIntegerField(verbose_name="Usuário")),
+                (
+                    "excluido_em",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Excluído em"),
+                ),
+            ],
+            options={
+                "verbose_name": "Registro de Exclusão",
+                "verbose_name_plural": "Registros de Exclusão",
+                "ordering": ["-excluido_em"],
+                "indexes": [
+                    models.Index(
+                        fields=["usuario_id", "excluido_em", "id"], name="api_exclusao_usuario_idx"
+                    ),
+                    models.Index(fields=["excluido_em"], name="api_exclusao_excluido_idx"),
+                ],
+            },
+        ),
+    ]
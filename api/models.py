@@ -1 +1,34 @@
-# Create your models here.
+"""
+API v1 models.
+"""
+
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class RegistroExclusao(models.Model):
+    """
+    Tombstone of a row deleted from a delta-synced collection (see ``api.sync``).
+
+    ``usuario_id`` is a plain integer rather than a foreign key so tombstones can
+    be written while the owner itself is being deleted.
+    """
+
+    colecao = models.CharField(_("Coleção"), max_length=20)
+    objeto_id = models.BigIntegerField(_("ID do Objeto"))
+    usuario_id = models.BigIntegerField(_("Usuário"))
+    excluido_em = models.DateTimeField(_("Excluído em"), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("Registro de Exclusão")
+        verbose_name_plural = _("Registros de Exclusão")
+        ordering = ["-excluido_em"]
+        indexes = [
+            models.Index(
+                fields=["usuario_id", "excluido_em", "id"], name="api_exclusao_usuario_idx"
+            ),
+            models.Index(fields=["excluido_em"], name="api_exclusao_excluido_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.colecao} #{self.objeto_id}"
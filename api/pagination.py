@@ -0,0 +1,144 @@
+"""API v1 pagination."""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+# Upper bound of BigAutoField, the primary key type of every paginated model
+MAX_ID = 2**63 - 1
+
+
+class KeysetCursorPagination(BasePagination):
+    """
+    Keyset (cursor) pagination ordered on ``(created_at, id)``, newest first.
+
+    Each page is fetched with ``WHERE (created_at, id) < (:ts, :id)`` against the
+    composite ``(created_at, id)`` index, so page N costs the same as page 1 and
+    rows inserted while a client is iterating never shift or duplicate results.
+
+    The cursor is an opaque base64 token; clients only follow ``next``/``previous``.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 100
+    invalid_cursor_message = "Cursor inválido."
+
+    # Ordering is fixed: the cursor encodes (created_at, id) and the composite
+    # indexes declared on the paginated models match it.
+    ordering = ("-created_at", "-id")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+
+        cursor = self.decode_cursor(request)
+        reverse = cursor is not None and cursor["reverse"]
+
+        if reverse:
+            queryset = queryset.order_by("created_at", "id")
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if cursor is not None:
+            created_at, pk = cursor["created_at"], cursor["id"]
+            if reverse:
+                position = Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+            else:
+                position = Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+            queryset = queryset.filter(position)
+
+        # Fetch one extra row to know whether another page exists beyond this one
+        results = list(queryset[: self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[: self.page_size]
+
+        if reverse:
+            results.reverse()
+            self.has_previous, self.has_next = has_more, True
+        else:
+            self.has_previous, self.has_next = cursor is not None, has_more
+
+        self.page = results
+        return results
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def decode_cursor(self, request):
+        """Return the decoded cursor dict, or None when no cursor was supplied."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")))
+            pk = payload["i"]
+            # Only ids we could have issued: int() would silently coerce a float or
+            # bool, and an out-of-range int fails in the database (a 500)
+            if isinstance(pk, bool) or not isinstance(pk, int) or not 0 < pk <= MAX_ID:
+                raise ValueError(pk)
+            return {
+                "created_at": datetime.fromisoformat(payload["c"]),
+                "id": pk,
+                "reverse": bool(payload.get("r", False)),
+            }
+        except (binascii.Error, UnicodeError, ValueError, TypeError, KeyError):
+            raise NotFound(self.invalid_cursor_message) from None
+
+    def encode_cursor(self, obj, reverse=False):
+        """Return the page URL positioned just past ``obj`` in the given direction."""
+        payload = {"c": obj.created_at.isoformat(), "i": obj.pk}
+        if reverse:
+            payload["r"] = True
+        token = base64.urlsafe_b64encode(
+            json.dumps(payload, separators=(",", ":")).encode("ascii")
+        ).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
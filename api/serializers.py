@@ -1,5 +1,6 @@
 """API v1 serializers."""
 
+from django.db.models import Prefetch
 from rest_framework import serializers
 
 from clientes.models import Usuario
@@ -9,18 +10,42 @@ from notificacoes.models import Notificacao
 from orcamentos.models import Orcamento
 from pacotes.models import Pacote, RecursoPacote
 from portfolio.models import Case
-from projetos.models import Milestone, Projeto
+from projetos.models import MensagemProjeto, Milestone, Projeto
 from servicos.models import RecursoServico, Servico
 from suporte.models import RespostaTicket, Ticket
 
 
+class EagerLoadingMixin:
+    """
+    Declarative relation-loading plan for a serializer.
+
+    Serializers that render nested relations list them here so the API views can
+    apply ``select_related``/``prefetch_related`` before serialization, keeping
+    list endpoints at a constant number of queries regardless of row count.
+    """
+
+    select_related_fields = ()
+    prefetch_related_fields = ()
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        """Apply this serializer's relation-loading plan to ``queryset``."""
+        if cls.select_related_fields:
+            queryset = queryset.select_related(*cls.select_related_fields)
+        if cls.prefetch_related_fields:
+            queryset = queryset.prefetch_related(*cls.prefetch_related_fields)
+        return queryset
+
+
 class RecursoServicoSerializer(serializers.ModelSerializer):
     class Meta:
         model = RecursoServico
         fields = ["titulo_pt", "titulo_en", "descricao_pt", "descricao_en", "icone"]
 
 
-class ServicoSerializer(serializers.ModelSerializer):
+class ServicoSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    prefetch_related_fields = ("recursos",)
+
     recursos = RecursoServicoSerializer(many=True, read_only=True)
 
     class Meta:
@@ -50,7 +75,9 @@ class RecursoPacoteSerializer(serializers.ModelSerializer):
         fields = ["titulo_pt", "titulo_en", "incluido", "destaque"]
 
 
-class PacoteSerializer(serializers.ModelSerializer):
+class PacoteSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    prefetch_related_fields = ("recursos",)
+
     recursos = RecursoPacoteSerializer(many=True, read_only=True)
     preco_final = serializers.DecimalField(
         source="get_preco_final", max_digits=10, decimal_places=2, read_only=True
@@ -78,7 +105,9 @@ class PacoteSerializer(serializers.ModelSerializer):
         ]
 
 
-class CaseSerializer(serializers.ModelSerializer):
+class CaseSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    select_related_fields = ("categoria",)
+
     categoria_nome = serializers.CharField(source="categoria.nome_pt", read_only=True)
 
     class Meta:
@@ -147,7 +176,10 @@ class MilestoneSerializer(serializers.ModelSerializer):
         fields = ["id", "titulo", "descricao", "status", "data_previsao", "data_conclusao"]
 
 
-class ProjetoSerializer(serializers.ModelSerializer):
+class ProjetoSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    select_related_fields = ("pacote",)
+    prefetch_related_fields = ("milestones",)
+
     milestones = MilestoneSerializer(many=True, read_only=True)
     pacote_nome = serializers.CharField(source="pacote.nome_pt", read_only=True)
 
@@ -180,7 +212,12 @@ class RespostaTicketSerializer(serializers.ModelSerializer):
         fields = ["id", "autor", "autor_nome", "conteudo", "anexos", "created_at"]
 
 
-class TicketSerializer(serializers.ModelSerializer):
+class TicketSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    select_related_fields = ("projeto",)
+    prefetch_related_fields = (
+        Prefetch("respostas", queryset=RespostaTicket.objects.select_related("autor")),
+    )
+
     respostas = RespostaTicketSerializer(many=True, read_only=True)
     projeto_nome = serializers.CharField(source="projeto.nome", read_only=True)
 
@@ -216,7 +253,10 @@ class PagamentoSerializer(serializers.ModelSerializer):
         fields = ["id", "metodo", "valor", "status", "transacao_id", "data_pagamento"]
 
 
-class FaturaSerializer(serializers.ModelSerializer):
+class FaturaSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    select_related_fields = ("projeto",)
+    prefetch_related_fields = ("itens", "pagamentos")
+
     itens = ItemFaturaSerializer(many=True, read_only=True)
     pagamentos = PagamentoSerializer(many=True, read_only=True)
     projeto_nome = serializers.CharField(source="projeto.nome", read_only=True)
@@ -281,3 +321,52 @@ class NotificacaoSerializer(serializers.ModelSerializer):
     class Meta:
         model = Notificacao
         fields = ["id", "tipo", "categoria", "titulo", "mensagem", "url", "lida", "created_at"]
+
+
+class NotificacaoSyncSerializer(NotificacaoSerializer):
+    """Notification as served by the delta sync (``api.sync``)."""
+
+    class Meta(NotificacaoSerializer.Meta):
+        fields = [*NotificacaoSerializer.Meta.fields, "updated_at"]
+
+
+class TicketSyncSerializer(TicketSerializer):
+    """Ticket without its replies, which sync as a collection of their own."""
+
+    prefetch_related_fields = ()
+    respostas = None
+
+    class Meta(TicketSerializer.Meta):
+        fields = [f for f in TicketSerializer.Meta.fields if f != "respostas"]
+
+
+class RespostaTicketSyncSerializer(EagerLoadingMixin, RespostaTicketSerializer):
+    select_related_fields = ("autor", "ticket")
+
+    ticket = serializers.CharField(source="ticket.numero", read_only=True)
+
+    class Meta(RespostaTicketSerializer.Meta):
+        fields = [*RespostaTicketSerializer.Meta.fields, "ticket", "updated_at"]
+
+
+class MensagemProjetoSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    select_related_fields = ("autor", "projeto")
+
+    projeto = serializers.SlugRelatedField(slug_field="slug", read_only=True)
+    autor_nome = serializers.CharField(
+        source="autor.nome_completo", read_only=True, allow_null=True
+    )
+
+    class Meta:
+        model = MensagemProjeto
+        fields = [
+            "id",
+            "projeto",
+            "autor",
+            "autor_nome",
+            "conteudo",
+            "anexos",
+            "lido",
+            "created_at",
+            "updated_at",
+        ]
@@ -0,0 +1,85 @@
+"""
+Cache invalidation for the public catalog endpoints, and delta-sync tombstones.
+
+Any save or delete of a catalog model (or of the rows nested inside it) bumps the
+matching namespace version used by ``api.cache`` once the transaction commits, so
+a concurrent reader cannot cache the old payload under the new version. Deleting a row of a collection
+served by ``api.sync`` leaves a ``RegistroExclusao`` for its owner.
+"""
+
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from core.cache import bump_cache_version
+from notificacoes.models import Notificacao
+from pacotes.models import Pacote, RecursoPacote
+from portfolio.models import Case, CategoriaPortfolio
+from projetos.models import MensagemProjeto
+from servicos.models import RecursoServico, Servico
+from suporte.models import RespostaTicket, Ticket
+
+from .models import RegistroExclusao
+
+# model -> catalog cache namespace (must match the viewsets' cache_namespace)
+CATALOG_NAMESPACES = {
+    Servico: "servicos",
+    RecursoServico: "servicos",
+    Pacote: "pacotes",
+    RecursoPacote: "pacotes",
+    Case: "portfolio",
+    CategoriaPortfolio: "portfolio",
+}
+
+
+def invalidate_catalog_cache(sender, **kwargs):
+    transaction.on_commit(partial(bump_cache_version, f"api:{CATALOG_NAMESPACES[sender]}"))
+
+
+for _model in CATALOG_NAMESPACES:
+    post_save.connect(
+        invalidate_catalog_cache, sender=_model, dispatch_uid=f"catalog_save_{_model.__name__}"
+    )
+    post_delete.connect(
+        invalidate_catalog_cache, sender=_model, dispatch_uid=f"catalog_delete_{_model.__name__}"
+    )
+
+
+def _cliente_id(instance, relacao):
+    """``cliente_id`` of the row ``instance`` points to through ``relacao``."""
+    field = instance._meta.get_field(relacao)
+    if field.is_cached(instance):
+        return getattr(instance, relacao).cliente_id
+    return (
+        field.related_model._base_manager.filter(pk=getattr(instance, field.attname))
+        .values_list("cliente_id", flat=True)
+        .first()
+    )
+
+
+# model -> (sync collection, owner id of a deleted instance or None to skip)
+SYNC_COLLECTIONS = {
+    Notificacao: ("notificacoes", lambda obj: obj.usuario_id),
+    Ticket: ("tickets", lambda obj: obj.cliente_id),
+    RespostaTicket: (
+        "respostas",
+        lambda obj: None if obj.interno else _cliente_id(obj, "ticket"),
+    ),
+    MensagemProjeto: ("mensagens", lambda obj: _cliente_id(obj, "projeto")),
+}
+
+
+def record_sync_tombstone(sender, instance, **kwargs):
+    colecao, owner = SYNC_COLLECTIONS[sender]
+    usuario_id = owner(instance)
+    if usuario_id is not None:
+        RegistroExclusao.objects.create(
+            colecao=colecao, objeto_id=instance.pk, usuario_id=usuario_id
+        )
+
+
+for _model in SYNC_COLLECTIONS:
+    post_delete.connect(
+        record_sync_tombstone, sender=_model, dispatch_uid=f"sync_delete_{_model.__name__}"
+    )
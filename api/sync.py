@@ -0,0 +1,208 @@
+"""
+Delta sync: what changed in a client's collections since their last sync.
+
+- The watermark is an opaque token holding, per collection, the
+  ``(updated_at, id)`` of the last row handed out. Rows are read in that order
+  from the ``(owner, updated_at, id)`` / ``(updated_at, id)`` indexes, so a sync
+  touches only what changed and a client that is up to date gets back little
+  more than a new watermark.
+- Only rows changed before ``now - SYNC_SETTLE_SECONDS`` are served. A row's
+  ``updated_at`` is taken before its transaction commits; without the margin a
+  slow commit could land behind a watermark already handed out. Transactions
+  open longer than the margin can still be missed.
+- Deletions come back as ids under ``removidos``, read from the
+  ``RegistroExclusao`` tombstones written by ``api.signals``. Tombstones older
+  than ``SYNC_TOMBSTONE_RETENTION_DAYS`` are pruned by
+  ``manage.py prune_sync_tombstones``; a watermark older than that gets a full
+  snapshot flagged ``reset``.
+"""
+
+import base64
+import binascii
+import json
+from collections import defaultdict
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from notificacoes.models import Notificacao
+from projetos.models import MensagemProjeto
+from suporte.models import RespostaTicket, Ticket
+
+from .models import RegistroExclusao
+from .serializers import (
+    MensagemProjetoSerializer,
+    NotificacaoSyncSerializer,
+    RespostaTicketSyncSerializer,
+    TicketSyncSerializer,
+)
+
+EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+MICROSECOND = timedelta(microseconds=1)
+REMOVIDOS = "removidos"
+
+
+class InvalidWatermarkError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Colecao:
+    nome: str
+    serializer: type
+    # Builds the owner-scoped queryset for a user
+    queryset: Callable
+
+
+COLECOES = [
+    Colecao(
+        "notificacoes",
+        NotificacaoSyncSerializer,
+        lambda user: Notificacao.objects.filter(usuario=user),
+    ),
+    Colecao("tickets", TicketSyncSerializer, lambda user: Ticket.objects.filter(cliente=user)),
+    Colecao(
+        "respostas",
+        RespostaTicketSyncSerializer,
+        lambda user: RespostaTicket.objects.filter(ticket__cliente=user, interno=False),
+    ),
+    Colecao(
+        "mensagens",
+        MensagemProjetoSerializer,
+        lambda user: MensagemProjeto.objects.filter(projeto__cliente=user),
+    ),
+]
+
+
+def encode_watermark(posicoes):
+    """
+    Token for ``{colecao: (timestamp, id or None)}``.
+
+    ``id`` None means everything up to ``timestamp`` was seen; when every
+    collection is in that state at the same instant the token is one number.
+    """
+    valores = set(posicoes.values())
+    if len(valores) == 1 and next(iter(valores))[1] is None:
+        payload = _micros(next(iter(valores))[0])
+    else:
+        payload = {nome: [_micros(ts), pk] for nome, (ts, pk) in posicoes.items()}
+    return (
+        base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode())
+        .decode("ascii")
+        .rstrip("=")
+    )
+
+
+def decode_watermark(token):
+    """Inverse of ``encode_watermark``; raises ``InvalidWatermarkError``."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        nomes = [colecao.nome for colecao in COLECOES] + [REMOVIDOS]
+        if isinstance(payload, int):
+            return dict.fromkeys(nomes, (_from_micros(payload), None))
+        return {
+            nome: (_from_micros(payload[nome][0]), _optional_int(payload[nome][1]))
+            for nome in nomes
+        }
+    except (binascii.Error, UnicodeError, ValueError, TypeError, KeyError, IndexError):
+        raise InvalidWatermarkError(token) from None
+
+
+def sincronizar(user, since=None, limit=100):
+    """
+    Changes for ``user`` since the watermark ``since`` (everything when None).
+
+    Returns a JSON-able dict: the next ``watermark``, each collection with changed
+    rows, ``removidos`` with deleted ids per collection, and ``has_more`` /
+    ``reset`` when true.
+    """
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=getattr(settings, "SYNC_SETTLE_SECONDS", 2))
+    retention = timedelta(days=getattr(settings, "SYNC_TOMBSTONE_RETENTION_DAYS", 30))
+
+    posicoes = decode_watermark(since) if since else None
+    # Tombstones past the client's position may already be pruned: start over
+    reset = posicoes is None or posicoes[REMOVIDOS][0] < now - retention
+    if reset:
+        posicoes = {}
+
+    result, has_more = {}, False
+    for colecao in COLECOES:
+        queryset = colecao.queryset(user)
+        setup_eager_loading = getattr(colecao.serializer, "setup_eager_loading", None)
+        if setup_eager_loading is not None:
+            queryset = setup_eager_loading(queryset)
+        rows, mais = _page(queryset, "updated_at", posicoes.get(colecao.nome), cutoff, limit)
+        if rows:
+            result[colecao.nome] = colecao.serializer(rows, many=True).data
+        posicoes[colecao.nome] = (rows[-1].updated_at, rows[-1].pk) if mais else (cutoff, None)
+        has_more |= mais
+
+    if reset:
+        # A snapshot has nothing to remove
+        posicoes[REMOVIDOS] = (cutoff, None)
+    else:
+        tombstones, mais = _page(
+            RegistroExclusao.objects.filter(usuario_id=user.pk),
+            "excluido_em",
+            posicoes[REMOVIDOS],
+            cutoff,
+            limit,
+        )
+        removidos = defaultdict(list)
+        for tombstone in tombstones:
+            removidos[tombstone.colecao].append(tombstone.objeto_id)
+        if removidos:
+            result[REMOVIDOS] = dict(removidos)
+        last = tombstones[-1] if mais else None
+        posicoes[REMOVIDOS] = (last.excluido_em, last.pk) if last else (cutoff, None)
+        has_more |= mais
+
+    result["watermark"] = encode_watermark(posicoes)
+    if has_more:
+        result["has_more"] = True
+    if reset:
+        result["reset"] = True
+    return result
+
+
+def prune_tombstones(now=None):
+    """Delete tombstones past the retention window; returns how many."""
+    retention = timedelta(days=getattr(settings, "SYNC_TOMBSTONE_RETENTION_DAYS", 30))
+    cutoff = (now or timezone.now()) - retention
+    deleted, _by_model = RegistroExclusao.objects.filter(excluido_em__lt=cutoff).delete()
+    return deleted
+
+
+def _page(queryset, campo, posicao, cutoff, limit):
+    """Rows after ``posicao`` up to ``cutoff`` in ``(campo, id)`` order, and whether more remain."""
+    queryset = queryset.filter(**{f"{campo}__lte": cutoff})
+    if posicao is not None:
+        ts, pk = posicao
+        after = Q(**{f"{campo}__gt": ts})
+        if pk is not None:
+            after |= Q(**{campo: ts, "id__gt": pk})
+        queryset = queryset.filter(after)
+    # One extra row tells whether another page exists
+    rows = list(queryset.order_by(campo, "id")[: limit + 1])
+    return rows[:limit], len(rows) > limit
+
+
+def _micros(ts):
+    return (ts - EPOCH) // MICROSECOND
+
+
+def _from_micros(value):
+    if not isinstance(value, int):
+        raise TypeError(value)
+    return EPOCH + value * MICROSECOND
+
+
+def _optional_int(value):
+    if value is not None and not isinstance(value, int):
+        raise TypeError(value)
+    return value
@@ -4,21 +4,37 @@ Tests all API endpoints: auth, servicos, pacotes, portfolio,
 orcamentos, projetos, tickets, faturas, clientes, notificacoes, contato.
 """
 
+import asyncio
+import base64
 import datetime
+import json
 from decimal import Decimal
+from io import StringIO
 
+from asgiref.sync import async_to_sync, sync_to_async
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone, translation
 from rest_framework import status
 from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
 
+from api import sync
+from api.cache import catalog_cache_key
+from api.models import RegistroExclusao
 from core.models import Contato
-from faturas.models import Fatura
-from notificacoes.models import Notificacao
-from pacotes.models import Pacote
-from portfolio.models import Case
-from projetos.models import Projeto
-from servicos.models import Servico
-from suporte.models import Ticket
+from faturas.models import Fatura, ItemFatura, Pagamento
+from notificacoes import live, unread
+from notificacoes.models import ContadorNaoLidos, Notificacao
+from pacotes.models import Pacote, RecursoPacote
+from portfolio.models import Case, CategoriaPortfolio
+from projetos.models import MensagemProjeto, Milestone, Projeto, TimelineEvento
+from servicos.models import RecursoServico, Servico
+from suporte.models import RespostaTicket, Ticket
 
 User = get_user_model()
 
@@ -106,6 +122,34 @@ def make_fatura(cliente, **kwargs):
     )
 
 
+class QueryCountAssertionsMixin:
+    """Assertions that pin an endpoint's query count independently of row count."""
+
+    def assert_constant_queries(self, url, make_row, sizes=(1, 4)):
+        """
+        GET ``url`` after growing the dataset to each size in ``sizes`` and assert
+        the number of queries never changes. ``make_row(i)`` creates the i-th row
+        together with the nested relations the serializer renders.
+        """
+        counts = []
+        created = 0
+        for size in sizes:
+            # Committed, so the catalog cache versions are bumped as in production
+            with self.captureOnCommitCallbacks(execute=True):
+                while created < size:
+                    make_row(created)
+                    created += 1
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(
+            len(set(counts)),
+            1,
+            f"Query count for {url} grows with row count: {dict(zip(sizes, counts, strict=True))}",
+        )
+
+
 # ─────────────────────────── JWT Auth Tests ────────────────────────────────────
 
 
@@ -206,6 +250,7 @@ class ServicoAPITest(APITestCase):
     """Tests for the Servico (public) API endpoints."""
 
     def setUp(self):
+        cache.clear()
         self.servico = make_servico()
         self.servico_inativo = make_servico(
             tipo="manutencao",
@@ -266,6 +311,7 @@ class PacoteAPITest(APITestCase):
     """Tests for the Pacote (public) API endpoints."""
 
     def setUp(self):
+        cache.clear()
         self.pacote = make_pacote()
         self.pacote_inativo = make_pacote(tipo="completo", ativo=False)
 
@@ -313,6 +359,7 @@ class PortfolioAPITest(APITestCase):
     """Tests for the Portfolio/Case (public) API endpoints."""
 
     def setUp(self):
+        cache.clear()
         self.case = make_case()
         self.case_inativo = make_case(slug="case-inativo", ativo=False)
 
@@ -461,7 +508,7 @@ class ProjetoAPITest(APITestCase):
         token = self._get_token()
         self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
         response = self.client.get(self.projeto_url)
-        slugs = [p["slug"] for p in response.data]
+        slugs = [p["slug"] for p in response.data["results"]]
         self.assertIn(self.projeto.slug, slugs)
         self.assertNotIn(other_projeto.slug, slugs)
 
@@ -651,7 +698,7 @@ class FaturaAPITest(APITestCase):
         token = self._get_token()
         self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
         response = self.client.get(self.fatura_url)
-        numeros = [f["numero"] for f in response.data]
+        numeros = [f["numero"] for f in response.data["results"]]
         self.assertIn(self.fatura.numero, numeros)
         self.assertNotIn(other_fatura.numero, numeros)
 
@@ -889,7 +936,7 @@ class NotificacaoAPITest(APITestCase):
         self._make_notificacao("My Notification")
         self._auth()
         response = self.client.get(self.notif_url)
-        titulos = [n["titulo"] for n in response.data]
+        titulos = [n["titulo"] for n in response.data["results"]]
         self.assertIn("My Notification", titulos)
         self.assertNotIn("Other User Notification", titulos)
 
@@ -913,12 +960,45 @@ class NotificacaoAPITest(APITestCase):
         response = self.client.post(f"/api/v1/notificacoes/{other_notif.pk}/lida/")
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
+    def test_mark_lida_decrements_counter_once(self):
+        self._auth()
+        notif = self._make_notificacao()
+        unread.get_counts(self.user.pk)
+        ContadorNaoLidos.objects.filter(pk=self.user.pk).update(notificacoes=1)
+        for _ in range(2):
+            response = self.client.post(f"/api/v1/notificacoes/{notif.pk}/lida/")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(ContadorNaoLidos.objects.get(pk=self.user.pk).notificacoes, 0)
+
+    def test_mark_all_lidas(self):
+        other_user = make_user("notif_other3@example.com", "Notif Other 3")
+        Notificacao.objects.create(usuario=other_user, titulo="Other", mensagem=".")
+        for i in range(3):
+            self._make_notificacao(f"N{i}")
+        self._auth()
+        response = self.client.post("/api/v1/notificacoes/marcar-todas-lidas/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"marcadas": 3})
+        self.assertFalse(Notificacao.objects.filter(usuario=self.user, lida=False).exists())
+        self.assertTrue(Notificacao.objects.filter(usuario=other_user, lida=False).exists())
+
+    def test_nao_lidas_counts(self):
+        self._make_notificacao()
+        self._make_notificacao().delete()
+        self._auth()
+        response = self.client.get("/api/v1/notificacoes/nao-lidas/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"notificacoes": 1, "mensagens": 0})
+        self.client.post("/api/v1/notificacoes/marcar-todas-lidas/")
+        response = self.client.get("/api/v1/notificacoes/nao-lidas/")
+        self.assertEqual(response.data["notificacoes"], 0)
+
     def test_notificacao_response_fields(self):
         self._auth()
         self._make_notificacao()
         response = self.client.get(self.notif_url)
-        if response.data:
-            notif_data = response.data[0]
+        if response.data["results"]:
+            notif_data = response.data["results"][0]
             expected_fields = [
                 "id",
                 "tipo",
@@ -930,3 +1010,463 @@ class NotificacaoAPITest(APITestCase):
             ]
             for field in expected_fields:
                 self.assertIn(field, notif_data)
+
+
+# ─────────────────────────── Delta sync ───────────────────────────────────────
+
+
+@override_settings(SYNC_SETTLE_SECONDS=0)
+class SyncAPITest(APITestCase):
+    """Tests for the delta sync endpoint."""
+
+    url = "/api/v1/sync/"
+
+    def setUp(self):
+        self.user = make_user("sync@example.com", "Sync User")
+        self.other = make_user("sync_other@example.com", "Sync Other")
+        self.client.force_authenticate(self.user)
+        self.notif = Notificacao.objects.create(usuario=self.user, titulo="Oi", mensagem=".")
+        Notificacao.objects.create(usuario=self.other, titulo="Outro", mensagem=".")
+        self.ticket = make_ticket(self.user)
+        self.resposta = RespostaTicket.objects.create(ticket=self.ticket, conteudo="Resposta")
+        RespostaTicket.objects.create(ticket=self.ticket, conteudo="Nota", interno=True)
+        self.projeto = make_projeto(self.user)
+        self.mensagem = MensagemProjeto.objects.create(projeto=self.projeto, conteudo="Msg")
+
+    def sync(self, since=None, **params):
+        if since:
+            params["since"] = since
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def test_first_sync_is_a_scoped_snapshot(self):
+        data = self.sync().data
+        self.assertTrue(data["reset"])
+        self.assertEqual([n["id"] for n in data["notificacoes"]], [self.notif.pk])
+        self.assertEqual([t["numero"] for t in data["tickets"]], [self.ticket.numero])
+        self.assertNotIn("respostas", data["tickets"][0])
+        self.assertEqual([r["id"] for r in data["respostas"]], [self.resposta.pk])
+        self.assertEqual(data["respostas"][0]["ticket"], self.ticket.numero)
+        self.assertEqual(data["mensagens"][0]["projeto"], self.projeto.slug)
+        self.assertNotIn("removidos", data)
+
+    def test_steady_state_is_a_few_bytes(self):
+        watermark = self.sync().data["watermark"]
+        response = self.sync(watermark)
+        self.assertEqual(list(response.data), ["watermark"])
+        self.assertLess(len(response.content), 40)
+
+    def test_returns_only_changed_rows(self):
+        watermark = self.sync().data["watermark"]
+        self.client.post(f"/api/v1/notificacoes/{self.notif.pk}/lida/")
+        nova = RespostaTicket.objects.create(ticket=self.ticket, conteudo="Outra")
+        data = self.sync(watermark).data
+        self.assertEqual(set(data), {"notificacoes", "respostas", "watermark"})
+        self.assertTrue(data["notificacoes"][0]["lida"])
+        self.assertEqual([r["id"] for r in data["respostas"]], [nova.pk])
+
+    def test_deletions_come_back_as_tombstones(self):
+        watermark = self.sync().data["watermark"]
+        notif_pk, resposta_pk = self.notif.pk, self.resposta.pk
+        self.notif.delete()
+        self.resposta.delete()
+        RespostaTicket.objects.filter(interno=True).delete()
+        Notificacao.objects.filter(usuario=self.other).delete()
+        data = self.sync(watermark).data
+        self.assertEqual(
+            data["removidos"], {"notificacoes": [notif_pk], "respostas": [resposta_pk]}
+        )
+        self.assertNotIn("removidos", self.sync(data["watermark"]).data)
+
+    def test_pages_with_has_more(self):
+        for i in range(3):
+            Notificacao.objects.create(usuario=self.user, titulo=f"N{i}", mensagem=".")
+        first = self.sync(limit=2).data
+        self.assertTrue(first["has_more"])
+        second = self.sync(first["watermark"], limit=2).data
+        self.assertNotIn("has_more", second)
+        ids = [n["id"] for n in first["notificacoes"] + second["notificacoes"]]
+        self.assertEqual(len(ids), 4)
+        self.assertEqual(len(set(ids)), 4)
+
+    def test_recent_changes_wait_for_the_settle_margin(self):
+        with override_settings(SYNC_SETTLE_SECONDS=60):
+            data = self.sync().data
+        self.assertNotIn("notificacoes", data)
+
+    def test_stale_watermark_resets(self):
+        stale = sync.encode_watermark(
+            dict.fromkeys(
+                ["notificacoes", "tickets", "respostas", "mensagens", "removidos"],
+                (timezone.now() - datetime.timedelta(days=60), None),
+            )
+        )
+        self.assertTrue(self.sync(stale).data["reset"])
+
+    def test_invalid_watermark(self):
+        for since in ["nope", "bnVsbA", "eyJ4IjoxfQ"]:
+            response = self.client.get(self.url, {"since": since})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_query_count(self):
+        watermark = self.sync().data["watermark"]
+        Notificacao.objects.create(usuario=self.user, titulo="Nova", mensagem=".")
+        # One query per collection plus the tombstones
+        with self.assertNumQueries(5):
+            self.sync(watermark)
+
+    def test_requires_auth(self):
+        self.client.force_authenticate(None)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_prune_command(self):
+        self.notif.delete()
+        RegistroExclusao.objects.update(excluido_em=timezone.now() - datetime.timedelta(days=31))
+        self.resposta.delete()
+        out = StringIO()
+        call_command("prune_sync_tombstones", stdout=out)
+        self.assertIn("1 tombstones pruned", out.getvalue())
+        self.assertEqual(RegistroExclusao.objects.get().colecao, "respostas")
+
+
+# ─────────────────────────── Live events (SSE) ────────────────────────────────
+
+
+class NotificacaoStreamTest(APITestCase):
+    """Tests for the SSE endpoint (served through the async test client)."""
+
+    url = "/api/v1/notificacoes/stream/"
+
+    def setUp(self):
+        self.user = make_user("stream@example.com", "Stream User")
+        self.other = make_user("stream_other@example.com", "Stream Other")
+        self.async_client.force_login(self.user)
+
+    async def next_chunk(self, content):
+        return await asyncio.wait_for(anext(content), timeout=2)
+
+    async def open_stream(self, client=None, **kwargs):
+        response = await (client or self.async_client).get(self.url, **kwargs)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        content = aiter(response.streaming_content)
+        self.addCleanup(async_to_sync(self.close), content)
+        self.assertEqual(await self.next_chunk(content), b"retry: 3000\n\n")
+        return response, content
+
+    @staticmethod
+    async def close(content):
+        await content.aclose()
+
+    def commit(self, create):
+        with self.captureOnCommitCallbacks(execute=True):
+            return create()
+
+    def test_requires_asgi(self):
+        self.client.force_login(self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    async def test_requires_authentication(self):
+        response = await self.async_client_class().get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_pushes_new_notificacao_to_its_owner_only(self):
+        response, content = await self.open_stream()
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertEqual(response["X-Accel-Buffering"], "no")
+
+        await sync_to_async(self.commit)(
+            lambda: Notificacao.objects.create(usuario=self.other, titulo="Outro", mensagem=".")
+        )
+        notif = await sync_to_async(self.commit)(
+            lambda: Notificacao.objects.create(usuario=self.user, titulo="Nova", mensagem=".")
+        )
+        chunk = await self.next_chunk(content)
+        event, data = chunk.decode().split("\n")[:2]
+        self.assertEqual(event, "event: notificacao")
+        payload = json.loads(data.removeprefix("data: "))
+        self.assertEqual((payload["id"], payload["titulo"]), (notif.pk, "Nova"))
+
+    async def test_accepts_jwt(self):
+        token = await sync_to_async(RefreshToken.for_user)(self.user)
+        await self.open_stream(
+            self.async_client_class(),
+            headers={"authorization": f"Bearer {token.access_token}"},
+        )
+
+    async def test_pushes_timeline_and_public_ticket_replies(self):
+        _response, content = await self.open_stream()
+
+        def create():
+            projeto = make_projeto(self.user)
+            TimelineEvento.objects.create(projeto=projeto, tipo="atualizacao", titulo="Deploy")
+            ticket = make_ticket(self.user)
+            RespostaTicket.objects.create(ticket=ticket, conteudo="Nota", interno=True)
+            RespostaTicket.objects.create(ticket=ticket, conteudo="Resolvido")
+
+        await sync_to_async(self.commit)(create)
+        chunks = [await self.next_chunk(content) for _ in range(2)]
+        self.assertTrue(chunks[0].startswith(b"event: timeline\n"))
+        self.assertIn(b'"titulo":"Deploy"', chunks[0])
+        self.assertTrue(chunks[1].startswith(b"event: resposta_ticket\n"))
+        self.assertIn(b'"conteudo":"Resolvido"', chunks[1])
+
+    async def test_rolled_back_rows_are_not_published(self):
+        _response, content = await self.open_stream()
+        await sync_to_async(Notificacao.objects.create)(usuario=self.user, titulo="X", mensagem=".")
+        with self.assertRaises(TimeoutError):
+            await asyncio.wait_for(anext(content), timeout=0.1)
+
+    @override_settings(LIVE_EVENTS_HEARTBEAT=0.01, LIVE_EVENTS_MAX_AGE=0.1)
+    async def test_heartbeat_and_max_age(self):
+        _response, content = await self.open_stream()
+        self.assertEqual(await self.next_chunk(content), b": keep-alive\n\n")
+        chunks = [chunk async for chunk in content]
+        self.assertTrue(chunks)
+        self.assertEqual(set(chunks), {b": keep-alive\n\n"})
+        self.assertEqual(live.get_broker().subscribers(self.user.pk), 0)
+
+
+# ─────────────────────────── Query Count (N+1) ────────────────────────────────
+
+
+class APIQueryCountTest(QueryCountAssertionsMixin, APITestCase):
+    """List endpoints must run a constant number of queries (no N+1)."""
+
+    def setUp(self):
+        self.user = make_user("querycount@example.com", "Query Count User")
+        self.staff = make_user("querycount_staff@example.com", "Query Staff", is_staff=True)
+
+    def test_servicos_list_constant_queries(self):
+        def make_row(i):
+            servico = make_servico(slug=f"servico-qc-{i}")
+            RecursoServico.objects.create(servico=servico, titulo_pt="Recurso")
+
+        self.assert_constant_queries("/api/v1/servicos/", make_row)
+
+    def test_pacotes_list_constant_queries(self):
+        tipos = ["basico", "completo", "premium", "personalizado"]
+
+        def make_row(i):
+            pacote = make_pacote(tipo=tipos[i])
+            RecursoPacote.objects.create(pacote=pacote, titulo_pt="Recurso")
+
+        self.assert_constant_queries("/api/v1/pacotes/", make_row)
+
+    def test_portfolio_list_constant_queries(self):
+        def make_row(i):
+            categoria = CategoriaPortfolio.objects.create(nome_pt=f"Categoria {i}")
+            make_case(slug=f"case-qc-{i}", categoria=categoria)
+
+        self.assert_constant_queries("/api/v1/portfolio/", make_row)
+
+    def test_projetos_list_constant_queries(self):
+        self.client.force_authenticate(self.user)
+        pacote = make_pacote()
+
+        def make_row(i):
+            projeto = make_projeto(self.user, nome=f"Projeto QC {i}", pacote=pacote)
+            Milestone.objects.create(projeto=projeto, titulo="Kickoff")
+
+        self.assert_constant_queries("/api/v1/projetos/", make_row)
+
+    def test_tickets_list_constant_queries(self):
+        self.client.force_authenticate(self.user)
+        projeto = make_projeto(self.user)
+
+        def make_row(i):
+            ticket = make_ticket(self.user, projeto=projeto)
+            RespostaTicket.objects.create(ticket=ticket, autor=self.staff, conteudo="Resposta")
+
+        self.assert_constant_queries("/api/v1/tickets/", make_row)
+
+    def test_faturas_staff_list_constant_queries(self):
+        self.client.force_authenticate(self.staff)
+        projeto = make_projeto(self.user)
+
+        def make_row(i):
+            fatura = make_fatura(self.user, projeto=projeto)
+            ItemFatura.objects.create(
+                fatura=fatura, descricao="Item", quantidade=1, valor_unitario=Decimal("10.00")
+            )
+            Pagamento.objects.create(fatura=fatura, metodo="pix", valor=Decimal("10.00"))
+
+        self.assert_constant_queries("/api/v1/faturas/", make_row)
+
+
+# ─────────────────────────── Keyset Pagination ────────────────────────────────
+
+
+class KeysetPaginationAPITest(APITestCase):
+    """Tests for cursor pagination on the owner-scoped list endpoints."""
+
+    def setUp(self):
+        self.user = make_user("keyset@example.com", "Keyset User")
+        self.client.force_authenticate(self.user)
+        self.url = "/api/v1/faturas/"
+        self.faturas = [make_fatura(self.user) for _ in range(5)]
+
+    def _collect(self, url):
+        numeros = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            numeros.extend(f["numero"] for f in response.data["results"])
+            url = response.data["next"]
+        return numeros
+
+    def test_response_envelope(self):
+        response = self.client.get(self.url)
+        self.assertEqual(set(response.data), {"next", "previous", "results"})
+        self.assertIsNone(response.data["previous"])
+
+    def test_iterates_all_rows_newest_first(self):
+        numeros = self._collect(f"{self.url}?page_size=2")
+        expected = [f.numero for f in sorted(self.faturas, key=lambda f: (f.created_at, f.pk))]
+        self.assertEqual(numeros, expected[::-1])
+
+    def test_inserts_during_iteration_do_not_shift_pages(self):
+        first = self.client.get(f"{self.url}?page_size=2")
+        make_fatura(self.user)
+        make_fatura(self.user)
+        seen = [f["numero"] for f in first.data["results"]] + self._collect(first.data["next"])
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(len(set(seen)), 5)
+
+    def test_previous_link_returns_prior_page(self):
+        first = self.client.get(f"{self.url}?page_size=2")
+        second = self.client.get(first.data["next"])
+        back = self.client.get(second.data["previous"])
+        self.assertEqual(back.data["results"], first.data["results"])
+        self.assertIsNone(back.data["previous"])
+
+    def test_page_size_is_capped(self):
+        response = self.client.get(f"{self.url}?page_size=100000")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 5)
+
+    def test_invalid_cursor_returns_404(self):
+        response = self.client.get(f"{self.url}?cursor=not-a-cursor")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_id_must_be_an_issuable_pk(self):
+        created_at = timezone.now().isoformat()
+        for pk in (2**63, 0, -1, True, 1.5, "5", None):
+            token = base64.urlsafe_b64encode(json.dumps({"c": created_at, "i": pk}).encode())
+            response = self.client.get(f"{self.url}?cursor={token.decode()}")
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, pk)
+
+    def test_tickets_and_orcamentos_are_paginated(self):
+        make_ticket(self.user)
+        for url in ("/api/v1/tickets/", "/api/v1/orcamentos/"):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertIn("results", response.data)
+
+
+# ─────────────────────────── Catalog Response Cache ───────────────────────────
+
+
+@override_settings(VERSIONED_CACHE_ALLOW_LOCAL=True)
+class CatalogCacheAPITest(APITestCase):
+    """Tests for the versioned response cache on the public catalog endpoints."""
+
+    def setUp(self):
+        cache.clear()
+        self.servico = make_servico(slug="servico-cache")
+        self.url = "/api/v1/servicos/"
+
+    def test_second_request_is_served_without_queries(self):
+        first = self.client.get(self.url)
+        with CaptureQueriesContext(connection) as ctx:
+            second = self.client.get(self.url)
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second["Content-Type"], first["Content-Type"])
+
+    def test_save_invalidates_cached_list(self):
+        self.client.get(self.url)
+        self.servico.nome_pt = "Nome Atualizado"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.servico.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response.json()[0]["nome_pt"], "Nome Atualizado")
+
+    def test_nested_resource_change_invalidates_detail(self):
+        detail_url = f"{self.url}{self.servico.slug}/"
+        self.client.get(detail_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            RecursoServico.objects.create(servico=self.servico, titulo_pt="Novo Recurso")
+        response = self.client.get(detail_url)
+        self.assertEqual(len(response.json()["recursos"]), 1)
+
+    def test_delete_invalidates_cached_list(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.servico.delete()
+        self.assertEqual(self.client.get(self.url).json(), [])
+
+    def test_invalidated_only_after_commit(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.servico.nome_pt = "Ainda Nao Commitado"
+            self.servico.save()
+            # Before commit other readers still see the old row: keep serving the old entry
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.get(self.url)
+            self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual(self.client.get(self.url).json()[0]["nome_pt"], "Ainda Nao Commitado")
+
+    def test_other_namespaces_are_not_invalidated(self):
+        make_pacote()
+        self.client.get("/api/v1/pacotes/")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.servico.save()
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get("/api/v1/pacotes/")
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    def test_conditional_get_returns_304(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.assertTrue(etag)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_stale_etag_gets_full_response(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.servico.nome_pt = "Outro Nome"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.servico.save()
+        self.client.get(self.url)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_cache_key_is_per_language(self):
+        with translation.override("pt-br"):
+            pt_key = catalog_cache_key("servicos")
+        with translation.override("en"):
+            en_key = catalog_cache_key("servicos")
+        self.assertNotEqual(pt_key, en_key)
+
+    @override_settings(
+        VERSIONED_CACHE_ALLOW_LOCAL=False,
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    )
+    def test_process_local_backend_is_not_used(self):
+        # Other workers would never see a version bump made in this process
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+        self.assertGreater(len(ctx.captured_queries), 0)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_not_found_is_not_cached(self):
+        self.client.get(f"{self.url}nao-existe/")
+        make_servico(slug="nao-existe")
+        response = self.client.get(f"{self.url}nao-existe/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
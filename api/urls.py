@@ -32,4 +32,14 @@ urlpatterns = [
         views.NotificacaoMarcarLidaView.as_view(),
         name="notificacao_lida",
     ),
+    path(
+        "notificacoes/marcar-todas-lidas/",
+        views.NotificacaoMarcarTodasLidasView.as_view(),
+        name="notificacoes_marcar_todas_lidas",
+    ),
+    path("notificacoes/nao-lidas/", views.NaoLidosView.as_view(), name="nao_lidos"),
+    # Delta sync
+    path("sync/", views.SyncView.as_view(), name="sync"),
+    # Live events (SSE, ASGI only)
+    path("notificacoes/stream/", views.notificacoes_stream, name="notificacoes_stream"),
 ]
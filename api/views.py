@@ -1,14 +1,18 @@
 """API v1 views."""
 
-from django.http import JsonResponse
-from django.shortcuts import get_object_or_404
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
 from rest_framework import generics, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
 
 from faturas.models import Fatura
+from notificacoes import live, unread
 from notificacoes.models import Notificacao
 from orcamentos.models import Orcamento
 from pacotes.models import Pacote
@@ -17,6 +21,9 @@ from projetos.models import Projeto
 from servicos.models import Servico
 from suporte.models import Ticket
 
+from . import sync
+from .cache import CatalogCacheMixin
+from .pagination import KeysetCursorPagination
 from .serializers import (
     CaseSerializer,
     ClienteSerializer,
@@ -31,7 +38,23 @@ from .serializers import (
 )
 
 
-class ServicoViewSet(viewsets.ReadOnlyModelViewSet):
+class EagerLoadingViewMixin:
+    """
+    Apply the serializer's declared relation-loading plan to every queryset.
+
+    Hooks into ``filter_queryset`` so it also covers views that build their
+    queryset dynamically in ``get_queryset`` (owner scoping, staff access).
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        setup_eager_loading = getattr(self.get_serializer_class(), "setup_eager_loading", None)
+        if setup_eager_loading is not None:
+            queryset = setup_eager_loading(queryset)
+        return queryset
+
+
+class ServicoViewSet(CatalogCacheMixin, EagerLoadingViewMixin, viewsets.ReadOnlyModelViewSet):
     """Public service catalog."""
 
     queryset = Servico.objects.filter(ativo=True)
@@ -39,9 +62,10 @@ class ServicoViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [AllowAny]
     lookup_field = "slug"
     pagination_class = None
+    cache_namespace = "servicos"
 
 
-class PacoteViewSet(viewsets.ReadOnlyModelViewSet):
+class PacoteViewSet(CatalogCacheMixin, EagerLoadingViewMixin, viewsets.ReadOnlyModelViewSet):
     """Public pricing packages."""
 
     queryset = Pacote.objects.filter(ativo=True)
@@ -49,9 +73,10 @@ class PacoteViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [AllowAny]
     lookup_field = "tipo"
     pagination_class = None
+    cache_namespace = "pacotes"
 
 
-class CaseViewSet(viewsets.ReadOnlyModelViewSet):
+class CaseViewSet(CatalogCacheMixin, EagerLoadingViewMixin, viewsets.ReadOnlyModelViewSet):
     """Public portfolio cases."""
 
     queryset = Case.objects.filter(ativo=True)
@@ -59,13 +84,14 @@ class CaseViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [AllowAny]
     lookup_field = "slug"
     pagination_class = None
+    cache_namespace = "portfolio"
 
 
-class OrcamentoViewSet(viewsets.ModelViewSet):
+class OrcamentoViewSet(EagerLoadingViewMixin, viewsets.ModelViewSet):
     """Quote requests - create public, list for authenticated users."""
 
     serializer_class = OrcamentoSerializer
-    pagination_class = None
+    pagination_class = KeysetCursorPagination
 
     def get_queryset(self):
         if self.request.user.is_authenticated:
@@ -87,13 +113,13 @@ class OrcamentoViewSet(viewsets.ModelViewSet):
             serializer.save(ip_address=ip)
 
 
-class ProjetoViewSet(viewsets.ReadOnlyModelViewSet):
+class ProjetoViewSet(EagerLoadingViewMixin, viewsets.ReadOnlyModelViewSet):
     """Client projects."""
 
     serializer_class = ProjetoSerializer
     permission_classes = [IsAuthenticated]
     lookup_field = "slug"
-    pagination_class = None
+    pagination_class = KeysetCursorPagination
 
     def get_queryset(self):
         if self.request.user.is_staff:
@@ -101,13 +127,13 @@ class ProjetoViewSet(viewsets.ReadOnlyModelViewSet):
         return Projeto.objects.filter(cliente=self.request.user)
 
 
-class TicketViewSet(viewsets.ModelViewSet):
+class TicketViewSet(EagerLoadingViewMixin, viewsets.ModelViewSet):
     """Support tickets."""
 
     serializer_class = TicketSerializer
     permission_classes = [IsAuthenticated]
     lookup_field = "numero"
-    pagination_class = None
+    pagination_class = KeysetCursorPagination
 
     def get_queryset(self):
         if self.request.user.is_staff:
@@ -137,13 +163,13 @@ class TicketViewSet(viewsets.ModelViewSet):
         return Response({"status": "resposta adicionada"})
 
 
-class FaturaViewSet(viewsets.ReadOnlyModelViewSet):
+class FaturaViewSet(EagerLoadingViewMixin, viewsets.ReadOnlyModelViewSet):
     """Client invoices."""
 
     serializer_class = FaturaSerializer
     permission_classes = [IsAuthenticated]
     lookup_field = "numero"
-    pagination_class = None
+    pagination_class = KeysetCursorPagination
 
     def get_queryset(self):
         if self.request.user.is_staff:
@@ -172,12 +198,12 @@ class ContatoCreateView(generics.CreateAPIView):
         serializer.save(ip_address=ip)
 
 
-class NotificacaoListView(generics.ListAPIView):
+class NotificacaoListView(EagerLoadingViewMixin, generics.ListAPIView):
     """User notifications."""
 
     serializer_class = NotificacaoSerializer
     permission_classes = [IsAuthenticated]
-    pagination_class = None
+    pagination_class = KeysetCursorPagination
 
     def get_queryset(self):
         return Notificacao.objects.filter(usuario=self.request.user)
@@ -189,12 +215,90 @@ class NotificacaoMarcarLidaView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, pk):
-        notificacao = get_object_or_404(Notificacao, pk=pk, usuario=request.user)
-        notificacao.lida = True
-        notificacao.save()
+        if not unread.marcar_lida(request.user.pk, pk):
+            raise Http404
         return Response({"status": "marcada como lida"})
 
 
+class NotificacaoMarcarTodasLidasView(APIView):
+    """Mark all of the user's notifications as read with a single UPDATE."""
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        return Response({"marcadas": unread.marcar_todas_lidas(request.user.pk)})
+
+
+class NaoLidosView(APIView):
+    """Unread notification and project-message counts for the badges."""
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response(unread.get_counts(request.user.pk))
+
+
+class SyncView(APIView):
+    """
+    Delta sync of notifications, tickets, ticket replies and project messages.
+
+    ``GET ?since=<watermark>`` returns only the rows changed since that
+    watermark, the ids deleted since then under ``removidos`` and the next
+    ``watermark``; collections without changes are left out. Without ``since``
+    (and whenever the answer says ``reset``) it is a full snapshot. Call again
+    right away while ``has_more`` is set. See ``api.sync``.
+    """
+
+    permission_classes = [IsAuthenticated]
+    default_limit = 100
+    max_limit = 500
+
+    def get(self, request):
+        try:
+            limit = min(int(request.query_params["limit"]), self.max_limit)
+        except (KeyError, ValueError):
+            limit = self.default_limit
+        if limit <= 0:
+            limit = self.default_limit
+        try:
+            data = sync.sincronizar(request.user, request.query_params.get("since"), limit)
+        except sync.InvalidWatermarkError:
+            raise ValidationError({"since": "Watermark inválido."}) from None
+        return Response(data)
+
+
+def _stream_user(request):
+    """The user behind a JWT ``Authorization`` header or the session, or None."""
+    try:
+        authenticated = JWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return None
+    if authenticated is not None:
+        return authenticated[0]
+    return request.user if request.user.is_authenticated else None
+
+
+async def notificacoes_stream(request):
+    """
+    Server-Sent Events stream of the user's live events (``notificacoes.live``).
+
+    Only served under ASGI: under WSGI every open stream would hold a worker
+    thread, so clients get a 503 and keep polling the list endpoint instead.
+    """
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({"detail": "Live events require the ASGI server."}, status=503)
+    user = await sync_to_async(_stream_user)(request)
+    if user is None:
+        return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+
+    response = StreamingHttpResponse(live.stream(user.pk), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # nginx: pass events through unbuffered
+    return response
+
+
 def health_check(request):
     """Simple health check endpoint — returns 200 OK with JSON status."""
     return JsonResponse({"status": "ok"})
@@ -0,0 +1,75 @@
+"""
+Active session tracking.
+
+A ``SessaoAtiva`` row is created when a user logs in through a session (site
+login, admin, ``Client.force_login``) and removed on logout. After that the row
+is kept current by ``core.middleware``: ``ultimo_acesso`` is touched in batches
+by ``SessionActivityBuffer`` and ``session_key`` follows key rotation.
+"""
+
+import logging
+
+from django.contrib.auth.signals import user_logged_in, user_logged_out
+
+from core.ratelimit import get_client_ip
+
+from .models import SessaoAtiva
+
+logger = logging.getLogger(__name__)
+
+# (substring, label) pairs, first match wins: Edge and Opera also say "Chrome",
+# and Chrome also says "Safari"
+BROWSERS = (
+    ("Edg", "Edge"),
+    ("OPR", "Opera"),
+    ("Firefox", "Firefox"),
+    ("Chrome", "Chrome"),
+    ("Safari", "Safari"),
+)
+DEVICES = (
+    ("iPhone", "iPhone"),
+    ("iPad", "iPad"),
+    ("Android", "Android"),
+    ("Windows", "Windows"),
+    ("Macintosh", "Mac"),
+    ("Linux", "Linux"),
+)
+
+
+def describe_user_agent(user_agent):
+    """Return ``(dispositivo, navegador)`` labels for a User-Agent header."""
+
+    def match(table):
+        return next((label for token, label in table if token in user_agent), "Desconhecido")
+
+    return match(DEVICES), match(BROWSERS)
+
+
+def registrar_sessao(sender, request, user, **kwargs):
+    session = getattr(request, "session", None)
+    if session is None or not session.session_key:
+        return
+    dispositivo, navegador = describe_user_agent(request.META.get("HTTP_USER_AGENT", ""))
+    try:
+        SessaoAtiva.objects.update_or_create(
+            session_key=session.session_key,
+            defaults={
+                "usuario": user,
+                "ip_address": get_client_ip(request) or "0.0.0.0",
+                "dispositivo": dispositivo,
+                "navegador": navegador,
+            },
+        )
+    except Exception as e:
+        # Session tracking must never block a login
+        logger.error(f"Failed to record active session: {e}")
+
+
+def encerrar_sessao(sender, request, user, **kwargs):
+    session = getattr(request, "session", None)
+    if session is not None and session.session_key:
+        SessaoAtiva.objects.filter(session_key=session.session_key).delete()
+
+
+user_logged_in.connect(registrar_sessao, dispatch_uid="clientes_registrar_sessao")
+user_logged_out.connect(encerrar_sessao, dispatch_uid="clientes_encerrar_sessao")
@@ -5,6 +5,7 @@ Clientes App Tests - Usuario, PerfilEmpresa, LogLogin, SessaoAtiva
 from django.contrib.auth import get_user_model
 from django.db import IntegrityError
 from django.test import Client, TestCase
+from django.urls import reverse
 
 from clientes.models import LogLogin, PerfilEmpresa, SessaoAtiva
 
@@ -311,3 +312,40 @@ class ClienteAuthViewTest(TestCase):
     def test_authenticated_user_has_email(self):
         self.client.login(username="authtest@example.com", password="Senha@123456")
         self.assertEqual(self.user.email, "authtest@example.com")
+
+
+class SessaoAtivaTrackingTest(TestCase):
+    """Tests for SessaoAtiva rows created at login and removed at logout."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="tracking@example.com",
+            password="Senha@123456",
+            nome_completo="Tracking User",
+            is_active=True,
+            email_verified=True,
+        )
+        self.client = Client(
+            HTTP_USER_AGENT=(
+                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                "(KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+            ),
+            REMOTE_ADDR="203.0.113.7",
+        )
+
+    def test_login_creates_sessao_ativa(self):
+        self.client.post(
+            reverse("clientes:login"),
+            {"username": "tracking@example.com", "password": "Senha@123456"},
+        )
+        sessao = SessaoAtiva.objects.get(usuario=self.user)
+        self.assertEqual(sessao.session_key, self.client.session.session_key)
+        self.assertEqual(sessao.ip_address, "203.0.113.7")
+        self.assertEqual(sessao.dispositivo, "Windows")
+        self.assertEqual(sessao.navegador, "Chrome")
+
+    def test_logout_removes_sessao_ativa(self):
+        self.client.force_login(self.user)
+        self.assertEqual(SessaoAtiva.objects.filter(usuario=self.user).count(), 1)
+        self.client.post(reverse("clientes:logout"))
+        self.assertFalse(SessaoAtiva.objects.filter(usuario=self.user).exists())
@@ -9,7 +9,6 @@ from django.contrib.auth import update_session_auth_hash
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.views import LoginView as BaseLoginView
 from django.core.cache import cache
-from django.core.mail import send_mail
 from django.shortcuts import get_object_or_404, redirect
 from django.template.loader import render_to_string
 from django.urls import reverse, reverse_lazy
@@ -17,6 +16,7 @@ from django.utils.translation import gettext_lazy as _
 from django.views.generic import CreateView, TemplateView, UpdateView, View
 
 from core.ratelimit import RateLimitMixin, get_client_ip
+from notificacoes.outbox import queue_email
 
 from .forms import AlterarSenhaForm, PerfilForm, RegistroForm
 from .models import LogLogin, SessaoAtiva, Usuario
@@ -172,7 +172,7 @@ class RegistroView(RateLimitMixin, CreateView):
         return response
 
     def send_verification_email(self, user):
-        """Send verification email. Returns True if successful, False otherwise."""
+        """Queue verification email. Returns True if queued, False otherwise."""
         try:
             verification_url = self.request.build_absolute_uri(
                 reverse("clientes:verificar_email", kwargs={"token": user.email_verification_token})
@@ -185,18 +185,13 @@ class RegistroView(RateLimitMixin, CreateView):
                     "verification_url": verification_url,
                 },
             )
-            send_mail(
-                subject,
-                message,
-                settings.DEFAULT_FROM_EMAIL,
-                [user.email],
-                html_message=message,
-                fail_silently=False,
+            queue_email(
+                user.email, subject, message, tipo="verificacao_email", conteudo_html=message
             )
-            logger.info(f"Verification email sent to {user.email}")
+            logger.info(f"Verification email queued for {user.email}")
             return True
         except Exception as e:
-            logger.error(f"Failed to send verification email to {user.email}: {e}")
+            logger.error(f"Failed to queue verification email for {user.email}: {e}")
             return False
 
 
@@ -343,13 +338,9 @@ class ReenviarVerificacaoView(RateLimitMixin, View):
                     "verification_url": verification_url,
                 },
             )
-            send_mail(
-                subject,
-                message,
-                settings.DEFAULT_FROM_EMAIL,
-                [user.email],
-                html_message=message,
-                fail_silently=True,  # Don't reveal errors to user
+            # Queued: delivery errors never reach the user (no enumeration signal)
+            queue_email(
+                user.email, subject, message, tipo="verificacao_email", conteudo_html=message
             )
         except Usuario.DoesNotExist:
             # SECURITY: Don't reveal that email doesn't exist
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.utils.html import format_html
 
-from .models import FAQ, ConfiguracaoSite, Contato, Depoimento
+from .models import FAQ, ConfiguracaoSite, Contato, DeployJob, Depoimento
 
 
 @admin.register(ConfiguracaoSite)
@@ -77,3 +77,23 @@ class FAQAdmin(admin.ModelAdmin):
     list_editable = ["ativo", "ordem"]
     search_fields = ["pergunta_pt", "resposta_pt"]
     ordering = ["categoria", "ordem"]
+
+
+@admin.register(DeployJob)
+class DeployJobAdmin(admin.ModelAdmin):
+    list_display = ["id", "status", "commit", "pushes", "created_at", "finished_at"]
+    list_filter = ["status", "created_at"]
+    search_fields = ["commit", "ref"]
+    readonly_fields = [
+        "status",
+        "ref",
+        "commit",
+        "pushes",
+        "exit_code",
+        "erro",
+        "log_path",
+        "created_at",
+        "started_at",
+        "finished_at",
+    ]
+    ordering = ["-created_at"]
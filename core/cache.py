@@ -0,0 +1,55 @@
+"""
+Versioned cache namespaces.
+
+Cached data (rendered fragments, API responses) embeds the current namespace
+version in its key. Bumping the version makes every old entry unreachable at
+once, without scanning or deleting keys; old entries simply expire on their TTL.
+
+A bump is only seen by the processes that share the cache backend. With the
+per-process ``LocMemCache`` (the fallback when ``REDIS_URL`` is empty) the other
+gunicorn workers would keep serving their stale copies, so callers check
+``versioned_cache_enabled()`` and skip caching there.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def _version_key(namespace):
+    return f"cache_version:{namespace}"
+
+
+def get_cache_version(namespace):
+    """Return the current version for ``namespace``, initialising it if needed."""
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock rather than 1: if the version key was evicted while
+        # old entries survived, a restart from 1 could resurrect them.
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key, 0)
+    return version
+
+
+def bump_cache_version(namespace):
+    """Invalidate every cached entry in ``namespace``."""
+    key = _version_key(namespace)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def versioned_cache_enabled():
+    """
+    Whether versioned entries can be cached in the default backend.
+
+    False for a process-local backend unless ``VERSIONED_CACHE_ALLOW_LOCAL`` is
+    set, which is only safe when a single process serves requests (runserver).
+    """
+    if getattr(settings, "VERSIONED_CACHE_ALLOW_LOCAL", False):
+        return True
+    return not isinstance(caches["default"], LocMemCache)
@@ -10,7 +10,8 @@ def site_settings(request):
     from core.models import ConfiguracaoSite
 
     try:
-        config = ConfiguracaoSite.objects.first()
+        # Two-tier cached singleton: no DB query in steady state
+        config = ConfiguracaoSite.get_cached()
     except Exception:
         config = None
 
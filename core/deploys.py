@@ -0,0 +1,168 @@
+"""
+Deploy queue for the GitHub webhook.
+
+``github_webhook`` calls ``enqueue_deploy`` and answers 202 straight away, so no
+web worker waits on the deploy script. ``manage.py run_deploys --loop`` (run on
+the host, under systemd or supervisor) executes queued jobs one at a time in
+their own process group, streaming the script output to a log file per job.
+"""
+
+import logging
+import os
+import signal
+import subprocess
+from datetime import timedelta
+from pathlib import Path
+
+from decouple import config
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import DeployJob
+
+logger = logging.getLogger(__name__)
+
+# Wall-clock limit for one run of the deploy script
+DEPLOY_TIMEOUT = getattr(settings, "DEPLOY_TIMEOUT", 600)
+
+# Seconds between SIGTERM and SIGKILL when a deploy times out
+KILL_GRACE = 10
+
+DEPLOY_LOG_DIR = Path(getattr(settings, "DEPLOY_LOG_DIR", settings.BASE_DIR / "logs" / "deploy"))
+
+
+def deploy_script():
+    return config("DEPLOY_SCRIPT_PATH", default="./deploy.sh")
+
+
+def enqueue_deploy(ref="", commit=""):
+    """
+    Queue a deploy of ``commit``, or fold it into the job already waiting.
+
+    Returns ``(job, coalesced)``. The partial unique constraint on ``status``
+    guarantees a single pending job even when pushes race each other.
+    """
+    while True:
+        with transaction.atomic():
+            job = DeployJob.objects.select_for_update().filter(status="pendente").first()
+            if job is not None:
+                job.pushes += 1
+                job.ref, job.commit = ref, commit
+                job.save(update_fields=["pushes", "ref", "commit"])
+                return job, True
+            try:
+                with transaction.atomic():
+                    return DeployJob.objects.create(ref=ref, commit=commit), False
+            except IntegrityError:
+                # A concurrent push created the pending job first; fold into it
+                continue
+
+
+def claim_next(now=None):
+    """Mark the pending job as running and return it, unless a deploy is already running."""
+    now = now or timezone.now()
+    with transaction.atomic():
+        reap_stale(now)
+        if DeployJob.objects.filter(status="executando").exists():
+            return None
+        job = (
+            DeployJob.objects.select_for_update(skip_locked=True).filter(status="pendente").first()
+        )
+        if job is None:
+            return None
+        job.status = "executando"
+        job.started_at = now
+        job.log_path = str(DEPLOY_LOG_DIR / f"deploy-{job.pk}.log")
+        job.save(update_fields=["status", "started_at", "log_path"])
+    return job
+
+
+def reap_stale(now):
+    """Fail jobs left "executando" by a worker that died mid-deploy."""
+    cutoff = now - timedelta(seconds=DEPLOY_TIMEOUT + 5 * 60)
+    DeployJob.objects.filter(status="executando", started_at__lt=cutoff).update(
+        status="falha", finished_at=now, erro="Deploy worker stopped before the job finished"
+    )
+
+
+def run_job(job, script=None, timeout=None):
+    """Run the deploy script for a claimed ``job`` and record the outcome."""
+    script = script or deploy_script()
+    timeout = timeout or DEPLOY_TIMEOUT
+    path = Path(job.log_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    exit_code, erro = None, ""
+
+    with open(path, "ab") as log:
+        log.write(
+            f"# deploy #{job.pk} ref={job.ref} commit={job.commit} "
+            f"started={job.started_at.isoformat()}\n".encode()
+        )
+        log.flush()
+        try:
+            proc = subprocess.Popen(
+                [script],
+                stdin=subprocess.DEVNULL,
+                stdout=log,
+                stderr=subprocess.STDOUT,
+                start_new_session=True,
+                env={
+                    **os.environ,
+                    "DEPLOY_JOB_ID": str(job.pk),
+                    "DEPLOY_REF": job.ref,
+                    "DEPLOY_COMMIT": job.commit,
+                },
+            )
+        except OSError as exc:
+            erro = f"Could not start {script}: {exc}"
+        else:
+            try:
+                exit_code = proc.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                exit_code = _terminate(proc)
+                erro = f"Deploy timed out after {timeout}s"
+
+    job.exit_code = exit_code
+    job.erro = erro
+    job.status = "sucesso" if exit_code == 0 and not erro else "falha"
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "exit_code", "erro", "finished_at"])
+    log_method = logger.info if job.status == "sucesso" else logger.error
+    log_method("Deploy #%s finished: %s (exit %s) %s", job.pk, job.status, exit_code, erro)
+    return job
+
+
+def _terminate(proc):
+    """Stop the script and everything it spawned; returns the exit code."""
+    for sig in (signal.SIGTERM, signal.SIGKILL):
+        try:
+            os.killpg(proc.pid, sig)
+        except ProcessLookupError:
+            break
+        try:
+            return proc.wait(timeout=KILL_GRACE)
+        except subprocess.TimeoutExpired:
+            continue
+    return proc.wait()
+
+
+def run_pending():
+    """Run the next queued deploy, if any. Returns the finished job or None."""
+    job = claim_next()
+    if job is not None:
+        run_job(job)
+    return job
+
+
+def log_tail(job, size=8192):
+    """Last ``size`` bytes of the job's log, decoded leniently."""
+    if not job.log_path:
+        return ""
+    try:
+        with open(job.log_path, "rb") as log:
+            log.seek(0, os.SEEK_END)
+            log.seek(max(log.tell() - size, 0))
+            return log.read().decode("utf-8", errors="replace")
+    except OSError:
+        return ""
@@ -0,0 +1,237 @@
+"""
+Management command to benchmark hot request paths.
+
+Usage:
+    python manage.py benchmark home
+    python manage.py benchmark home --requests 2000
+    python manage.py benchmark ratelimit -n 100000
+    python manage.py benchmark validation -n 200
+    python manage.py benchmark headers -n 100000
+"""
+
+import logging
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.test import Client
+
+
+class Command(BaseCommand):
+    help = "Benchmark hot request paths (reports requests/sec or ns/op)"
+
+    SCENARIOS = {
+        "home": "HomeView with the page fragment cache cold vs warm",
+        "ratelimit": "RateLimiter.check_rate_limit throughput, 1 vs 8 threads",
+        "validation": "RequestValidationMiddleware over a replayed URL corpus",
+        "headers": "SecurityHeadersMiddleware per-response overhead",
+    }
+
+    # Realistic traffic mix for the validation scenario: mostly clean page/API/static
+    # hits, a few query strings, and a handful of probes that get blocked.
+    URL_CORPUS = [
+        "/",
+        "/en/",
+        "/servicos/",
+        "/en/servicos/",
+        "/pacotes/",
+        "/pacotes/?ordem=preco",
+        "/portfolio/",
+        "/portfolio/loja-virtual-moda/",
+        "/contato/",
+        "/orcamento/",
+        "/clientes/login/?next=/projetos/",
+        "/projetos/dashboard/",
+        "/faturas/2026/",
+        "/suporte/tickets/?status=aberto&page=2",
+        "/api/v1/servicos/",
+        "/api/v1/pacotes/1/",
+        "/api/v1/projetos/?cursor=eyJjIjoiMjAyNi0wMS0wMSIsImkiOjF9",
+        "/api/v1/notificacoes/?page_size=50",
+        "/static/css/style.css",
+        "/static/js/main.js",
+        "/media/portfolio/case-1.webp",
+        "/sitemap.xml",
+        "/robots.txt",
+        "/wp-login.php",
+        "/../../etc/passwd",
+        "/busca/?q=1%27%20OR%201=1--",
+    ]
+
+    def add_arguments(self, parser):
+        parser.add_argument("scenario", choices=sorted(self.SCENARIOS))
+        parser.add_argument(
+            "--requests",
+            "-n",
+            type=int,
+            default=500,
+            help="Iterations per measurement (default: 500)",
+        )
+
+    def handle(self, *args, **options):
+        scenario = options["scenario"]
+        self.stdout.write(
+            self.style.MIGRATE_HEADING(f"=== {scenario}: {self.SCENARIOS[scenario]} ===")
+        )
+        getattr(self, f"_bench_{scenario}")(options["requests"])
+
+    # ── helpers ────────────────────────────────────────────────────────────
+
+    def _client(self):
+        # Use an allowed host and HTTPS so SECURE_SSL_REDIRECT never short-circuits
+        from django.conf import settings
+
+        host = next((h.lstrip(".") for h in settings.ALLOWED_HOSTS if h != "*"), "localhost")
+        return Client(HTTP_HOST=host, secure=True)
+
+    def _time_requests(self, client, path, n, before_each=None):
+        """Return requests/sec for ``n`` sequential GETs of ``path``."""
+        client.get(path)  # warm up URL resolver, template loaders, connections
+        elapsed = 0.0
+        for _ in range(n):
+            if before_each:
+                before_each()
+            start = time.perf_counter()
+            response = client.get(path)
+            elapsed += time.perf_counter() - start
+            if response.status_code != 200:
+                raise RuntimeError(f"GET {path} returned {response.status_code}")
+        return n / elapsed
+
+    def _report(self, label, value, unit):
+        self.stdout.write(f"  {label:<28} {value:>12,.1f} {unit}")
+
+    # ── scenarios ──────────────────────────────────────────────────────────
+
+    def _bench_home(self, n):
+        from core.cache import bump_cache_version
+        from core.signals import HOME_CACHE_NAMESPACE
+
+        client = self._client()
+
+        cold = self._time_requests(
+            client, "/", n, before_each=lambda: bump_cache_version(HOME_CACHE_NAMESPACE)
+        )
+        warm = self._time_requests(client, "/", n)
+
+        self._report("uncached (before)", cold, "req/s")
+        self._report("fragment cached (after)", warm, "req/s")
+        self.stdout.write(self.style.SUCCESS(f"  speedup: {warm / cold:.2f}x"))
+
+    def _bench_ratelimit(self, n):
+        from django.core.cache import cache
+        from django.test import RequestFactory
+
+        from core.ratelimit import RateLimiter, get_backend
+
+        request = RequestFactory().get("/", REMOTE_ADDR="203.0.113.1")
+        # A limit no run can reach, so every check takes the counting path
+        limiter = RateLimiter(key="benchmark", rate=f"{n * 10}/d")
+        self.stdout.write(f"  backend: {type(get_backend()).__name__}")
+
+        # The cache is shared with sessions and sequence counters, so each phase counts
+        # under its own identity and only those keys are removed afterwards (no clear()).
+        run_id = os.urandom(4).hex()
+        idents = [f"benchmark-{run_id}-single", f"benchmark-{run_id}-threaded"]
+
+        def run(ident, count):
+            for _ in range(count):
+                limiter.check_rate_limit(request, ident)
+
+        try:
+            start = time.perf_counter()
+            run(idents[0], n)
+            single = time.perf_counter() - start
+
+            threads = 8
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=threads) as pool:
+                list(pool.map(run, [idents[1]] * threads, [n // threads] * threads))
+            threaded = time.perf_counter() - start
+        finally:
+            window = int(time.time() // limiter.period)
+            cache.delete_many(
+                [
+                    key
+                    for ident in idents
+                    for key in (
+                        limiter.counter_key(ident),
+                        f"{limiter.counter_key(ident)}:{window}",
+                        limiter.block_key(ident),
+                    )
+                ]
+            )
+
+        self._report("1 thread", n / single, "checks/s")
+        self._report("1 thread", single / n * 1e9, "ns/check")
+        self._report(f"{threads} threads", n / threaded, "checks/s")
+
+    def _bench_validation(self, n):
+        from django.test import RequestFactory
+
+        from core.middleware import RequestValidationMiddleware as Middleware
+
+        factory = RequestFactory()
+        requests = [factory.get(url, HTTP_HOST="ecommdev.com.br") for url in self.URL_CORPUS]
+        middleware = Middleware(lambda request: None)
+
+        def per_pattern(request):
+            # Previous implementation: one search per pattern, Host regex compiled per call
+            path, query = request.path, request.META.get("QUERY_STRING", "")
+            if len(request.get_full_path()) > Middleware.MAX_URL_LENGTH:
+                return False
+            if any(p.search(path) for p in Middleware.SUSPICIOUS_PATTERNS):
+                return False
+            if query and any(p.search(query) for p in Middleware.SQL_PATTERNS):
+                return False
+            return bool(re.match(r"^[\w\-\.:]+$", request.META.get("HTTP_HOST", "")))
+
+        def ns_per_request(check, before_pass=None):
+            elapsed = 0
+            for _ in range(n):
+                if before_pass:
+                    before_pass()
+                start = time.perf_counter_ns()
+                for request in requests:
+                    check(request)
+                elapsed += time.perf_counter_ns() - start
+            return elapsed / (n * len(requests))
+
+        logging.disable(logging.WARNING)  # blocked probes would log on every pass
+        try:
+            before = ns_per_request(per_pattern)
+            cold = ns_per_request(
+                middleware.process_request, Middleware.path_is_suspicious.cache_clear
+            )
+            warm = ns_per_request(middleware.process_request)
+        finally:
+            logging.disable(logging.NOTSET)
+
+        self.stdout.write(f"  corpus: {len(requests)} URLs x {n} passes")
+        self._report("per-pattern loop (before)", before, "ns/request")
+        self._report("fused, verdict cache cold", cold, "ns/request")
+        self._report("fused, verdict cache warm", warm, "ns/request")
+        self.stdout.write(self.style.SUCCESS(f"  speedup: {before / warm:.2f}x"))
+
+    def _bench_headers(self, n):
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+
+        from core.middleware import SecurityHeadersMiddleware
+
+        middleware = SecurityHeadersMiddleware(lambda request: None)
+        factory = RequestFactory()
+
+        def ns_per_response(path):
+            request = factory.get(path)
+            middleware.process_request(request)
+            responses = [HttpResponse() for _ in range(n)]
+            start = time.perf_counter_ns()
+            for response in responses:
+                middleware.process_response(request, response)
+            return (time.perf_counter_ns() - start) / n
+
+        self._report("public page", ns_per_response("/"), "ns/response")
+        self._report("admin page", ns_per_response("/gerenciar-ecd/"), "ns/response")
@@ -0,0 +1,69 @@
+"""
+Management command to EXPLAIN the client-area queries and flag missing indexes.
+
+Usage:
+    python manage.py check_query_plans              # seed a throwaway dataset, then check
+    python manage.py check_query_plans --no-seed    # check against the current data
+    python manage.py check_query_plans --verbose    # also print every plan
+
+Exits with an error when a query needs a full scan or an unindexed sort.
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.query_plans import check_plans, seed
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN the known owner-scoped queries and flag full scans and unindexed sorts"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--no-seed",
+            action="store_true",
+            help="Use the existing data instead of a seeded dataset",
+        )
+        parser.add_argument(
+            "--users",
+            type=int,
+            default=20,
+            help="Clients in the seeded dataset (default: 20)",
+        )
+        parser.add_argument(
+            "--per-user",
+            type=int,
+            default=25,
+            help="Rows per client and model in the seeded dataset (default: 25)",
+        )
+        parser.add_argument("--verbose", action="store_true", help="Print every query plan")
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.MIGRATE_HEADING("=== Query plans ==="))
+        with transaction.atomic():
+            if options["no_seed"]:
+                user = get_user_model().objects.order_by("pk").first()
+                if user is None:
+                    raise CommandError("No users to run the queries for; drop --no-seed")
+            else:
+                user = seed(options["users"], options["per_user"])
+            results = check_plans(user)
+            # The seeded rows are never committed
+            transaction.set_rollback(True)
+
+        for result in results:
+            if result.ok:
+                self.stdout.write(f"  ✓ {result.label}")
+            else:
+                self.stdout.write(
+                    self.style.ERROR(f"  ✗ {result.label}: {'; '.join(result.problems)}")
+                )
+            if options["verbose"] or not result.ok:
+                for line in result.plan.splitlines():
+                    self.stdout.write(f"      {line}")
+
+        flagged = sum(not result.ok for result in results)
+        if flagged:
+            raise CommandError(f"{flagged} of {len(results)} queries need an index")
+        self.stdout.write(self.style.SUCCESS(f"✓ {len(results)} queries use an index"))
@@ -0,0 +1,57 @@
+"""
+Management command to run deploys queued by the GitHub webhook (``DeployJob``).
+
+Run it on the host that owns the deploy script, under systemd or supervisor:
+    python manage.py run_deploys            # run the pending deploy, then exit
+    python manage.py run_deploys --loop     # keep polling (worker process)
+"""
+
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.deploys import run_pending
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Run queued GitHub deploys one at a time, logging output per job"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running, polling for new deploys",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5.0,
+            help="Seconds between polls (with --loop, default: 5)",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                try:
+                    job = run_pending()
+                except Exception:
+                    if not options["loop"]:
+                        raise
+                    # Keep the worker alive through DB hiccups; retry after a pause
+                    logger.exception("Deploy worker iteration failed")
+                    close_old_connections()
+                    time.sleep(options["interval"])
+                    continue
+                if job is not None:
+                    style = self.style.SUCCESS if job.status == "sucesso" else self.style.ERROR
+                    self.stdout.write(style(f"Deploy #{job.pk}: {job.status} ({job.log_path})"))
+                    continue
+                if not options["loop"]:
+                    break
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
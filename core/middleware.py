@@ -7,14 +7,30 @@ import base64
 import logging
 import os
 import re
+import threading
+import time
+from collections import namedtuple
+from functools import lru_cache
 
 from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 from django.http import HttpResponseForbidden
+from django.utils import timezone
 from django.utils.deprecation import MiddlewareMixin
 
 logger = logging.getLogger(__name__)
 
 
+def _fuse(patterns):
+    """Fuse compiled patterns into a single alternation, keeping each one's IGNORECASE flag."""
+    parts = []
+    for pattern in patterns:
+        flag = "i" if pattern.flags & re.IGNORECASE else ""
+        parts.append(f"(?{flag}:{pattern.pattern})" if flag else f"(?:{pattern.pattern})")
+    return re.compile("|".join(parts))
+
+
 class SecurityHeadersMiddleware(MiddlewareMixin):
     """
     Add security headers to all responses.
@@ -59,80 +75,114 @@ class SecurityHeadersMiddleware(MiddlewareMixin):
         if request.path.startswith("/__debug__/"):
             return response
 
+        bundle = _header_bundle()
+
         # Admin paths: apply a permissive but present CSP instead of no header.
         # SECURITY (7.3): Do NOT skip security headers for admin paths.
+        headers = response.headers
         if request.path.startswith("/gerenciar-ecd/"):
-            response["Content-Security-Policy"] = self.ADMIN_CSP
-            response["X-Content-Type-Options"] = "nosniff"
-            response["X-Frame-Options"] = "DENY"
-            response["Referrer-Policy"] = "strict-origin-when-cross-origin"
-            response["X-Permitted-Cross-Domain-Policies"] = "none"
+            for name, value in bundle.admin:
+                headers[name] = value
             return response
 
-        # Retrieve nonce generated in process_request (may be absent on very
-        # early error responses before process_request ran).
-        nonce = getattr(request, "csp_nonce", self._generate_nonce())
-
-        # Content-Security-Policy
-        # Configurable via settings, with secure defaults
-        csp_policy = getattr(settings, "CSP_POLICY", None)
-
-        if csp_policy is None:
-            # Secure default CSP — nonce replaces 'unsafe-inline' for scripts.
-            # 'unsafe-inline' is intentionally retained ONLY for style-src
-            # because Bootstrap/third-party CDN styles set inline styles that
-            # cannot yet be nonce-gated without breaking the UI.
-            csp_directives = [
-                "default-src 'self'",
-                f"script-src 'self' 'nonce-{nonce}' https://cdn.jsdelivr.net https://www.googletagmanager.com https://www.google-analytics.com",
-                "style-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net https://fonts.googleapis.com",
-                "font-src 'self' https://fonts.gstatic.com https://cdn.jsdelivr.net",
-                "img-src 'self' data: https: blob:",
-                "connect-src 'self' https://www.google-analytics.com https://api.mercadopago.com https://cdn.jsdelivr.net",
-                "frame-src 'self' https://www.mercadopago.com.br",
-                "frame-ancestors 'self'",
-                "form-action 'self'",
-                "base-uri 'self'",
-                "object-src 'none'",
-            ]
-            csp_policy = "; ".join(csp_directives)
-
-        # Only set CSP in production (can break development)
-        if not settings.DEBUG:
-            response["Content-Security-Policy"] = csp_policy
-        else:
-            # Report-only mode in development
-            response["Content-Security-Policy-Report-Only"] = csp_policy
-
-        # X-Content-Type-Options: prevent MIME sniffing
-        response["X-Content-Type-Options"] = "nosniff"
-
-        # X-Frame-Options: prevent clickjacking
-        response["X-Frame-Options"] = "DENY"
-
-        # Referrer Policy
-        response["Referrer-Policy"] = "strict-origin-when-cross-origin"
-
-        # Permissions-Policy: disable unnecessary browser features
-        permissions_policy = getattr(
-            settings,
-            "PERMISSIONS_POLICY",
-            "camera=(), microphone=(), geolocation=(), payment=(self), "
-            "accelerometer=(), gyroscope=(), magnetometer=(), usb=()",
-        )
-        response["Permissions-Policy"] = permissions_policy
-
-        # Additional hardening headers
-        response["X-Permitted-Cross-Domain-Policies"] = "none"
-        response["Cross-Origin-Embedder-Policy"] = (
-            "unsafe-none"  # Required for external resources (Bootstrap CDN etc.)
-        )
-        response["Cross-Origin-Opener-Policy"] = "same-origin"
-        response["Cross-Origin-Resource-Policy"] = "cross-origin"  # Allow CDN resources
+        for name, value in bundle.common:
+            headers[name] = value
+        csp = bundle.csp_head
+        if bundle.csp_tail is not None:
+            # Retrieve nonce generated in process_request (may be absent on very
+            # early error responses before process_request ran).
+            nonce = getattr(request, "csp_nonce", None) or self._generate_nonce()
+            csp = csp + nonce + bundle.csp_tail
+        headers[bundle.csp_name] = csp
 
         return response
 
 
+# Secure default CSP — nonce replaces 'unsafe-inline' for scripts.
+# 'unsafe-inline' is intentionally retained ONLY for style-src
+# because Bootstrap/third-party CDN styles set inline styles that
+# cannot yet be nonce-gated without breaking the UI.
+DEFAULT_CSP_DIRECTIVES = (
+    "default-src 'self'",
+    "script-src 'self' 'nonce-{nonce}' https://cdn.jsdelivr.net https://www.googletagmanager.com https://www.google-analytics.com",
+    "style-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net https://fonts.googleapis.com",
+    "font-src 'self' https://fonts.gstatic.com https://cdn.jsdelivr.net",
+    "img-src 'self' data: https: blob:",
+    "connect-src 'self' https://www.google-analytics.com https://api.mercadopago.com https://cdn.jsdelivr.net",
+    "frame-src 'self' https://www.mercadopago.com.br",
+    "frame-ancestors 'self'",
+    "form-action 'self'",
+    "base-uri 'self'",
+    "object-src 'none'",
+)
+
+DEFAULT_PERMISSIONS_POLICY = (
+    "camera=(), microphone=(), geolocation=(), payment=(self), "
+    "accelerometer=(), gyroscope=(), magnetometer=(), usb=()"
+)
+
+# csp_tail is None when CSP_POLICY is configured (no nonce); csp_head is then the
+# whole policy. Otherwise the nonce goes between csp_head and csp_tail.
+HeaderBundle = namedtuple("HeaderBundle", "common admin csp_name csp_head csp_tail")
+
+
+@lru_cache(maxsize=1)
+def _header_bundle():
+    """
+    Build every security header except the CSP nonce, once per process.
+
+    ``common`` and ``admin`` are ``(name, value)`` pairs that ``process_response``
+    assigns through ``response.headers``. The bundle is rebuilt when a relevant
+    setting changes (see ``_reset_header_bundle``).
+    """
+    common = tuple(
+        {
+            # X-Content-Type-Options: prevent MIME sniffing
+            "X-Content-Type-Options": "nosniff",
+            # X-Frame-Options: prevent clickjacking
+            "X-Frame-Options": "DENY",
+            "Referrer-Policy": "strict-origin-when-cross-origin",
+            # Permissions-Policy: disable unnecessary browser features
+            "Permissions-Policy": getattr(
+                settings, "PERMISSIONS_POLICY", DEFAULT_PERMISSIONS_POLICY
+            ),
+            # Additional hardening headers
+            "X-Permitted-Cross-Domain-Policies": "none",
+            # Required for external resources (Bootstrap CDN etc.)
+            "Cross-Origin-Embedder-Policy": "unsafe-none",
+            "Cross-Origin-Opener-Policy": "same-origin",
+            # Allow CDN resources
+            "Cross-Origin-Resource-Policy": "cross-origin",
+        }.items()
+    )
+    admin = tuple(
+        {
+            "Content-Security-Policy": SecurityHeadersMiddleware.ADMIN_CSP,
+            "X-Content-Type-Options": "nosniff",
+            "X-Frame-Options": "DENY",
+            "Referrer-Policy": "strict-origin-when-cross-origin",
+            "X-Permitted-Cross-Domain-Policies": "none",
+        }.items()
+    )
+
+    # Only enforce CSP in production (can break development); report-only in DEBUG
+    csp_name = (
+        "Content-Security-Policy-Report-Only" if settings.DEBUG else "Content-Security-Policy"
+    )
+    csp_policy = getattr(settings, "CSP_POLICY", None)
+    if csp_policy is not None:
+        return HeaderBundle(common, admin, csp_name, csp_policy, None)
+
+    head, tail = "; ".join(DEFAULT_CSP_DIRECTIVES).split("{nonce}")
+    return HeaderBundle(common, admin, csp_name, head, tail)
+
+
+@receiver(setting_changed)
+def _reset_header_bundle(setting, **kwargs):
+    if setting in ("DEBUG", "CSP_POLICY", "PERMISSIONS_POLICY"):
+        _header_bundle.cache_clear()
+
+
 class RequestValidationMiddleware(MiddlewareMixin):
     """
     Validate incoming requests for suspicious patterns.
@@ -171,40 +221,50 @@ class RequestValidationMiddleware(MiddlewareMixin):
         re.compile(r"((\%27)|(\'))union", re.IGNORECASE),
     ]
 
+    # One precompiled alternation per target, so each string is scanned once
+    PATH_PATTERN = _fuse(SUSPICIOUS_PATTERNS)
+    QUERY_PATTERN = _fuse(SQL_PATTERNS)
+    HOST_PATTERN = re.compile(r"[\w\-\.:]+")
+
+    # Number of distinct URL paths whose verdict is remembered per process
+    VERDICT_CACHE_SIZE = 4096
+
+    @staticmethod
+    @lru_cache(maxsize=VERDICT_CACHE_SIZE)
+    def path_is_suspicious(url_path):
+        """Return True if ``url_path`` matches a suspicious pattern (LRU-cached)."""
+        return RequestValidationMiddleware.PATH_PATTERN.search(url_path) is not None
+
     def process_request(self, request):
-        path = request.get_full_path()
         url_path = request.path  # path only, no query string
         query_string = request.META.get("QUERY_STRING", "")
 
         # Check URL length
-        if len(path) > self.MAX_URL_LENGTH:
+        if len(request.get_full_path()) > self.MAX_URL_LENGTH:
             logger.warning(
                 f"Blocked request with excessively long URL from {request.META.get('REMOTE_ADDR')}"
             )
             return HttpResponseForbidden("URL too long")
 
         # Check for suspicious patterns in the URL path (not query string — handled separately)
-        for pattern in self.SUSPICIOUS_PATTERNS:
-            if pattern.search(url_path):
-                logger.warning(
-                    f"Blocked suspicious request pattern from {request.META.get('REMOTE_ADDR')}: {url_path[:100]}"
-                )
-                return HttpResponseForbidden("Invalid request")
+        if self.path_is_suspicious(url_path):
+            logger.warning(
+                f"Blocked suspicious request pattern from {request.META.get('REMOTE_ADDR')}: {url_path[:100]}"
+            )
+            return HttpResponseForbidden("Invalid request")
 
         # Check SQL injection patterns ONLY in query string to avoid false positives
         # on legitimate URL path segments (e.g. slugs containing dashes or apostrophes).
-        if query_string:
-            for pattern in self.SQL_PATTERNS:
-                if pattern.search(query_string):
-                    logger.warning(
-                        f"Blocked potential SQL injection in query string from "
-                        f"{request.META.get('REMOTE_ADDR')}: {url_path[:100]}?{query_string[:100]}"
-                    )
-                    return HttpResponseForbidden("Invalid request")
+        if query_string and self.QUERY_PATTERN.search(query_string):
+            logger.warning(
+                f"Blocked potential SQL injection in query string from "
+                f"{request.META.get('REMOTE_ADDR')}: {url_path[:100]}?{query_string[:100]}"
+            )
+            return HttpResponseForbidden("Invalid request")
 
         # Check Host header for injection
         host = request.META.get("HTTP_HOST", "")
-        if host and not re.match(r"^[\w\-\.:]+$", host):
+        if host and not self.HOST_PATTERN.fullmatch(host):
             logger.warning(
                 f"Blocked request with suspicious Host header from {request.META.get('REMOTE_ADDR')}"
             )
@@ -221,6 +281,14 @@ class SessionSecurityMiddleware(MiddlewareMixin):
     - Session fingerprinting (optional)
     - Session rotation on privilege escalation
     - Concurrent session limits
+    - Session write elision (with ``SESSION_SAVE_EVERY_REQUEST = False``)
+
+    Write elision: the session is only persisted when its data changed or when
+    less than ``SESSION_REFRESH_WINDOW`` seconds remain before it expires, so a
+    typical authenticated page view writes nothing. The idle timeout therefore
+    lies between ``SESSION_REFRESH_WINDOW`` and ``SESSION_COOKIE_AGE``.
+    ``SessaoAtiva`` rows are created at login (``clientes.signals``); their
+    ``ultimo_acesso`` is touched in batches (see ``SessionActivityBuffer``).
     """
 
     def process_request(self, request):
@@ -242,39 +310,110 @@ class SessionSecurityMiddleware(MiddlewareMixin):
                 f"User agent changed for user {request.user.id} from session {session_key[:8]}..."
             )
 
+        if request.session.session_key:
+            session_activity.touch(request.session.session_key)
+
         return None
 
     def process_response(self, request, response):
-        # Regenerate session ID periodically for authenticated users
-        # Skip rotation on POST/PUT/DELETE to avoid CSRF token issues
         try:
-            if request.method in ("POST", "PUT", "DELETE", "PATCH"):
+            if not (hasattr(request, "user") and request.user.is_authenticated):
                 return response
-
-            # Skip rotation for admin to avoid CSRF issues
-            if request.path.startswith("/gerenciar-ecd/"):
+            session = getattr(request, "session", None)
+            if session is None or not session.session_key:
                 return response
 
-            if hasattr(request, "user") and request.user.is_authenticated:
-                if hasattr(request, "session") and request.session.session_key:
-                    last_rotation = request.session.get("_security_last_rotation", 0)
-
-                    import time
+            now = int(time.time())
 
-                    now = int(time.time())
+            # Regenerate session ID periodically for authenticated users
+            # Skip rotation on POST/PUT/DELETE to avoid CSRF token issues,
+            # and for admin to avoid CSRF issues there as well
+            unsafe_method = request.method in ("POST", "PUT", "DELETE", "PATCH")
+            if not unsafe_method and not request.path.startswith("/gerenciar-ecd/"):
+                # Rotate session every 30 minutes
+                rotation_interval = getattr(settings, "SESSION_ROTATION_INTERVAL", 1800)
 
-                    # Rotate session every 30 minutes
-                    rotation_interval = getattr(settings, "SESSION_ROTATION_INTERVAL", 1800)
+                if now - session.get("_security_last_rotation", 0) > rotation_interval:
+                    old_key = session.session_key
+                    session.cycle_key()
+                    session["_security_last_rotation"] = now
+                    session_activity.rekey(old_key, session.session_key)
 
-                    if now - last_rotation > rotation_interval:
-                        request.session.cycle_key()
-                        request.session["_security_last_rotation"] = now
+            if not settings.SESSION_SAVE_EVERY_REQUEST:
+                self._refresh_expiry(session, now)
         except Exception as e:
             # Don't let session rotation errors break the response
             logger.warning(f"Session rotation error: {e}")
 
         return response
 
+    @staticmethod
+    def _refresh_expiry(session, now):
+        """Mark the session for saving only when it changed or nears expiry."""
+        if session.modified:
+            session["_security_refreshed"] = now
+            return
+        refresh_window = getattr(
+            settings, "SESSION_REFRESH_WINDOW", settings.SESSION_COOKIE_AGE // 2
+        )
+        expires_at = session.get("_security_refreshed", 0) + session.get_expiry_age()
+        if expires_at - now < refresh_window:
+            session["_security_refreshed"] = now
+
+
+class SessionActivityBuffer:
+    """
+    Batch ``SessaoAtiva.ultimo_acesso`` updates per process.
+
+    Session keys seen by the middleware are collected in memory and written
+    with a single ``UPDATE ... WHERE session_key IN (...)`` at most once every
+    ``SESSION_ACTIVITY_FLUSH_INTERVAL`` seconds, so ``ultimo_acesso`` is accurate
+    to that interval without a write per request.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = set()
+        self._last_flush = time.monotonic()
+
+    def touch(self, session_key):
+        interval = getattr(settings, "SESSION_ACTIVITY_FLUSH_INTERVAL", 60)
+        with self._lock:
+            self._keys.add(session_key)
+            if time.monotonic() - self._last_flush < interval:
+                return
+            keys, self._keys = self._keys, set()
+            self._last_flush = time.monotonic()
+        self._write(keys)
+
+    def rekey(self, old_key, new_key):
+        """Follow a session key rotation so the SessaoAtiva row stays linked."""
+        from clientes.models import SessaoAtiva
+
+        with self._lock:
+            if old_key in self._keys:
+                self._keys.discard(old_key)
+                self._keys.add(new_key)
+        SessaoAtiva.objects.filter(session_key=old_key).update(session_key=new_key)
+
+    def flush(self):
+        with self._lock:
+            keys, self._keys = self._keys, set()
+            self._last_flush = time.monotonic()
+        self._write(keys)
+
+    @staticmethod
+    def _write(keys):
+        if not keys:
+            return
+        from clientes.models import SessaoAtiva
+
+        # update() skips auto_now, so the timestamp is set explicitly
+        SessaoAtiva.objects.filter(session_key__in=keys).update(ultimo_acesso=timezone.now())
+
+
+session_activity = SessionActivityBuffer()
+
 
 class LoggingMiddleware(MiddlewareMixin):
     """
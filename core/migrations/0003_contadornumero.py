@@ -0,0 +1,41 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0002_alter_configuracaosite_favicon_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ContadorNumero",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("prefixo", models.CharField(max_length=10, verbose_name="Prefixo")),
+                ("ano", models.PositiveIntegerField(verbose_name="Ano")),
+                (
+                    "ultimo_valor",
+                    models.PositiveIntegerField(default=0, verbose_name="Último Valor"),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True, verbose_name="Atualizado em")),
+            ],
+            options={
+                "verbose_name": "Contador de Número",
+                "verbose_name_plural": "Contadores de Números",
+                "ordering": ["-ano", "prefixo"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="contadornumero",
+            constraint=models.UniqueConstraint(
+                fields=("prefixo", "ano"), name="core_contador_prefixo_ano"
+            ),
+        ),
+    ]
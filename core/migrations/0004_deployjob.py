@@ -0,0 +1,71 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0003_contadornumero"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DeployJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pendente", "Pendente"),
+                            ("executando", "Executando"),
+                            ("sucesso", "Sucesso"),
+                            ("falha", "Falha"),
+                        ],
+                        default="pendente",
+                        max_length=20,
+                        verbose_name="Status",
+                    ),
+                ),
+                ("ref", models.CharField(blank=True, max_length=255, verbose_name="Ref")),
+                ("commit", models.CharField(blank=True, max_length=64, verbose_name="Commit")),
+                ("pushes", models.PositiveIntegerField(default=1, verbose_name="Pushes")),
+                (
+                    "exit_code",
+                    models.IntegerField(blank=True, null=True, verbose_name="Código de Saída"),
+                ),
+                ("erro", models.TextField(blank=True, verbose_name="Erro")),
+                (
+                    "log_path",
+                    models.CharField(blank=True, max_length=500, verbose_name="Arquivo de Log"),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True, verbose_name="Criado em")),
+                (
+                    "started_at",
+                    models.DateTimeField(blank=True, null=True, verbose_name="Iniciado em"),
+                ),
+                (
+                    "finished_at",
+                    models.DateTimeField(blank=True, null=True, verbose_name="Finalizado em"),
+                ),
+            ],
+            options={
+                "verbose_name": "Deploy",
+                "verbose_name_plural": "Deploys",
+                "ordering": ["-created_at"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="deployjob",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("status", "pendente")),
+                fields=("status",),
+                name="core_deployjob_um_pendente",
+            ),
+        ),
+    ]
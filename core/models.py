@@ -2,11 +2,18 @@
 Core App Models - Site settings and contact
 """
 
+import time
+
+from django.conf import settings
+from django.core.cache import cache
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
+from core.cache import get_cache_version, versioned_cache_enabled
 from core.validators import validate_image
 
+_MISSING = object()
+
 
 class ConfiguracaoSite(models.Model):
     """Site-wide configuration settings."""
@@ -60,6 +67,48 @@ class ConfiguracaoSite(models.Model):
             raise ValueError("Já existe uma configuração do site")
         super().save(*args, **kwargs)
 
+    # ── Two-tier cache ────────────────────────────────────────────────────
+    # Tier 1: per-process copy, trusted for LOCAL_TTL seconds with no I/O at all.
+    # Tier 2: shared Django cache, keyed by the "site_config" cache version.
+    # Saving/deleting the config bumps the version (core.signals), so every
+    # worker picks up the change within LOCAL_TTL seconds. A process-local
+    # backend never sees other workers' bumps, so there tier 2 is skipped and
+    # an expired local copy is re-read from the DB.
+    CACHE_NAMESPACE = "site_config"
+    LOCAL_TTL = getattr(settings, "SITE_CONFIG_LOCAL_TTL", 10)
+    SHARED_TTL = 60 * 60 * 24
+
+    # (version, instance or None, monotonic expiry); replaced atomically
+    _local = (None, None, 0.0)
+
+    @classmethod
+    def get_cached(cls):
+        """Return the singleton config (or None) without touching the DB in steady state."""
+        version, value, expires = cls._local
+        now = time.monotonic()
+        if now < expires:
+            return value
+
+        if not versioned_cache_enabled():
+            value = cls.objects.first()
+            cls._local = (None, value, now + cls.LOCAL_TTL)
+            return value
+
+        current = get_cache_version(cls.CACHE_NAMESPACE)
+        if current != version:
+            key = f"{cls.CACHE_NAMESPACE}:v{current}"
+            value = cache.get(key, _MISSING)
+            if value is _MISSING:
+                value = cls.objects.first()
+                cache.set(key, value, cls.SHARED_TTL)
+        cls._local = (current, value, now + cls.LOCAL_TTL)
+        return value
+
+    @classmethod
+    def clear_local_cache(cls):
+        """Drop this process's copy so the next read consults the shared cache."""
+        cls._local = (None, None, 0.0)
+
 
 class Contato(models.Model):
     """Contact form submissions."""
@@ -166,3 +215,68 @@ class FAQ(models.Model):
         if lang and lang.startswith("en") and self.resposta_en:
             return self.resposta_en
         return self.resposta_pt
+
+
+class ContadorNumero(models.Model):
+    """Last number handed out per (prefix, year); see ``core.sequences``."""
+
+    prefixo = models.CharField(_("Prefixo"), max_length=10)
+    ano = models.PositiveIntegerField(_("Ano"))
+    ultimo_valor = models.PositiveIntegerField(_("Último Valor"), default=0)
+    updated_at = models.DateTimeField(_("Atualizado em"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("Contador de Número")
+        verbose_name_plural = _("Contadores de Números")
+        ordering = ["-ano", "prefixo"]
+        constraints = [
+            models.UniqueConstraint(fields=["prefixo", "ano"], name="core_contador_prefixo_ano"),
+        ]
+
+    def __str__(self):
+        return f"{self.prefixo}-{self.ano}: {self.ultimo_valor}"
+
+
+class DeployJob(models.Model):
+    """
+    Deploy requested by the GitHub webhook and run by ``manage.py run_deploys``.
+
+    At most one job is ``pendente`` at a time: pushes that arrive while it waits
+    are folded into it (``pushes`` counts them), so a burst of pushes costs one
+    deploy of the latest commit.
+    """
+
+    STATUS_CHOICES = [
+        ("pendente", _("Pendente")),
+        ("executando", _("Executando")),
+        ("sucesso", _("Sucesso")),
+        ("falha", _("Falha")),
+    ]
+
+    status = models.CharField(
+        _("Status"), max_length=20, choices=STATUS_CHOICES, default="pendente"
+    )
+    ref = models.CharField(_("Ref"), max_length=255, blank=True)
+    commit = models.CharField(_("Commit"), max_length=64, blank=True)
+    pushes = models.PositiveIntegerField(_("Pushes"), default=1)
+    exit_code = models.IntegerField(_("Código de Saída"), null=True, blank=True)
+    erro = models.TextField(_("Erro"), blank=True)
+    log_path = models.CharField(_("Arquivo de Log"), max_length=500, blank=True)
+    created_at = models.DateTimeField(_("Criado em"), auto_now_add=True)
+    started_at = models.DateTimeField(_("Iniciado em"), null=True, blank=True)
+    finished_at = models.DateTimeField(_("Finalizado em"), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _("Deploy")
+        verbose_name_plural = _("Deploys")
+        ordering = ["-created_at"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["status"],
+                condition=models.Q(status="pendente"),
+                name="core_deployjob_um_pendente",
+            ),
+        ]
+
+    def __str__(self):
+        return f"Deploy #{self.pk} {self.commit[:7]} ({self.status})"
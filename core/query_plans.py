@@ -0,0 +1,211 @@
+"""
+Index advisor for the client-area queries.
+
+``KNOWN_QUERIES`` mirrors the owner-scoped querysets the views and API run on
+every request. ``check_plans`` EXPLAINs each of them and reports full table
+scans and sorts the planner could not avoid with an index. On PostgreSQL
+sequential scans are disabled for the check, so a small dataset does not hide
+a missing index behind a cheap scan.
+
+``manage.py check_query_plans`` seeds a throwaway dataset (rolled back at the
+end) and fails when any query is flagged, so index drift shows up in CI.
+"""
+
+import datetime
+import json
+import re
+from dataclasses import dataclass, field
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.utils import timezone
+
+from faturas.models import Fatura
+from faturas.overdue import overdue_faturas
+from notificacoes.models import Notificacao
+from orcamentos.models import Orcamento
+from projetos.models import Projeto
+from suporte.models import Ticket
+
+PROJETOS_ATIVOS = ["em_desenvolvimento", "em_testes", "revisao"]
+TICKETS_ABERTOS = ["aberto", "em_atendimento"]
+ORCAMENTOS_PENDENTES = ["novo", "em_analise", "aguardando_info"]
+KEYSET = ("-created_at", "-id")
+SYNC = ("updated_at", "id")
+SINCE = datetime.datetime(2000, 1, 1, tzinfo=datetime.UTC)
+
+# (label, queryset builder taking the client user)
+KNOWN_QUERIES = [
+    ("dashboard: projetos recentes", lambda u: Projeto.objects.filter(cliente=u)[:5]),
+    (
+        "dashboard: projetos ativos",
+        lambda u: Projeto.objects.filter(cliente=u, status__in=PROJETOS_ATIVOS).order_by(),
+    ),
+    (
+        "dashboard: faturas pendentes",
+        lambda u: Fatura.objects.filter(cliente=u, status="pendente"),
+    ),
+    (
+        "dashboard: tickets abertos",
+        lambda u: Ticket.objects.filter(cliente=u, status__in=TICKETS_ABERTOS).order_by(),
+    ),
+    ("dashboard: orçamentos recentes", lambda u: Orcamento.objects.filter(cliente=u)[:5]),
+    (
+        "dashboard: orçamentos pendentes",
+        lambda u: Orcamento.objects.filter(cliente=u, status__in=ORCAMENTOS_PENDENTES).order_by(),
+    ),
+    ("faturas: lista", lambda u: Fatura.objects.filter(cliente=u)[:20]),
+    ("suporte: lista de tickets", lambda u: Ticket.objects.filter(cliente=u)[:20]),
+    ("projetos: lista", lambda u: Projeto.objects.filter(cliente=u)[:20]),
+    ("orcamentos: lista", lambda u: Orcamento.objects.filter(cliente=u)[:20]),
+    ("api: faturas", lambda u: Fatura.objects.filter(cliente=u).order_by(*KEYSET)[:21]),
+    ("api: tickets", lambda u: Ticket.objects.filter(cliente=u).order_by(*KEYSET)[:21]),
+    ("api: projetos", lambda u: Projeto.objects.filter(cliente=u).order_by(*KEYSET)[:21]),
+    ("api: orçamentos", lambda u: Orcamento.objects.filter(cliente=u).order_by(*KEYSET)[:21]),
+    (
+        "api: notificações",
+        lambda u: Notificacao.objects.filter(usuario=u).order_by(*KEYSET)[:21],
+    ),
+    (
+        "sync: notificações",
+        lambda u: Notificacao.objects.filter(usuario=u, updated_at__gt=SINCE).order_by(*SYNC)[:101],
+    ),
+    (
+        "sync: tickets",
+        lambda u: Ticket.objects.filter(cliente=u, updated_at__gt=SINCE).order_by(*SYNC)[:101],
+    ),
+    (
+        "faturas: varredura de vencidas",
+        lambda u: overdue_faturas().order_by("data_vencimento")[:500],
+    ),
+]
+
+SEEDED_MODELS = [Fatura, Ticket, Projeto, Orcamento, Notificacao]
+
+_SQLITE_SCAN = re.compile(r"\bSCAN (\w+)")
+_SQLITE_SORT = "USE TEMP B-TREE FOR ORDER BY"
+
+
+@dataclass
+class PlanCheck:
+    label: str
+    plan: str
+    problems: list = field(default_factory=list)
+
+    @property
+    def ok(self):
+        return not self.problems
+
+
+def check_plans(user, queries=None):
+    """EXPLAIN ``queries`` (default: ``KNOWN_QUERIES``) for ``user``; returns ``PlanCheck``s."""
+    results = []
+    with transaction.atomic():
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        for label, build in queries or KNOWN_QUERIES:
+            queryset = build(user)
+            if connection.vendor == "postgresql":
+                plan = queryset.explain(format="json")
+                problems = postgres_problems(json.loads(plan))
+            else:
+                plan = queryset.explain()
+                problems = sqlite_problems(plan)
+            results.append(PlanCheck(label, plan, problems))
+    return results
+
+
+def sqlite_problems(plan):
+    """Full scans and temporary sorts in an SQLite ``EXPLAIN QUERY PLAN``."""
+    problems = [f"full scan of {table}" for table in _SQLITE_SCAN.findall(plan)]
+    if _SQLITE_SORT in plan:
+        problems.append("sort not served by an index")
+    return problems
+
+
+def postgres_problems(plan):
+    """Sequential scans, unbounded index scans and sorts in a PostgreSQL JSON plan."""
+    problems = []
+    nodes = [plan[0]["Plan"]]
+    while nodes:
+        node = nodes.pop()
+        kind = node["Node Type"]
+        if kind == "Seq Scan":
+            problems.append(f"full scan of {node['Relation Name']}")
+        elif kind in {"Index Scan", "Index Only Scan"} and "Filter" in node:
+            if "Index Cond" not in node:
+                # Walks the whole index just for its order, filtering every row
+                problems.append(f"full index scan of {node['Relation Name']}")
+        elif kind in {"Sort", "Incremental Sort"}:
+            problems.append("sort not served by an index")
+        nodes.extend(node.get("Plans", []))
+    return problems
+
+
+def seed(users=20, per_user=25):
+    """Insert a synthetic client-area dataset and refresh planner statistics."""
+    User = get_user_model()
+    tag = timezone.now().strftime("%Y%m%d%H%M%S%f")
+    clientes = User.objects.bulk_create(
+        User(email=f"advisor-{tag}-{i}@example.invalid", nome_completo=f"Advisor {i}")
+        for i in range(users)
+    )
+    today = timezone.localdate()
+    faturas, tickets, projetos, orcamentos, notificacoes = [], [], [], [], []
+    for i, cliente in enumerate(clientes):
+        for j in range(per_user):
+            n = f"{tag[-8:]}{i:03d}{j:03d}"
+            faturas.append(
+                Fatura(
+                    numero=f"ADV-{n}",
+                    cliente=cliente,
+                    data_vencimento=today,
+                    status=Fatura.STATUS_CHOICES[j % len(Fatura.STATUS_CHOICES)][0],
+                )
+            )
+            tickets.append(
+                Ticket(
+                    numero=f"ADV-{n}",
+                    cliente=cliente,
+                    assunto="Index advisor",
+                    descricao="-",
+                    categoria="outro",
+                    status=Ticket.STATUS_CHOICES[j % len(Ticket.STATUS_CHOICES)][0],
+                )
+            )
+            projetos.append(
+                Projeto(
+                    cliente=cliente,
+                    nome="Index advisor",
+                    slug=f"advisor-{n}",
+                    status=Projeto.STATUS_CHOICES[j % len(Projeto.STATUS_CHOICES)][0],
+                )
+            )
+            orcamentos.append(
+                Orcamento(
+                    numero=f"ADV-{n}",
+                    cliente=cliente,
+                    nome_completo=cliente.nome_completo,
+                    email=cliente.email,
+                    telefone="-",
+                    cidade="-",
+                    estado="CE",
+                    tipo_projeto="personalizado",
+                    descricao_projeto="-",
+                    status=Orcamento.STATUS_CHOICES[j % len(Orcamento.STATUS_CHOICES)][0],
+                )
+            )
+            notificacoes.append(Notificacao(usuario=cliente, titulo="Index advisor", mensagem="-"))
+    for model, rows in zip(
+        SEEDED_MODELS, [faturas, tickets, projetos, orcamentos, notificacoes], strict=True
+    ):
+        model.objects.bulk_create(rows, batch_size=1000)
+
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            for model in [User, *SEEDED_MODELS]:
+                cursor.execute(f"ANALYZE {connection.ops.quote_name(model._meta.db_table)}")
+        else:
+            cursor.execute("ANALYZE")
+    return clientes[0]
@@ -1,12 +1,26 @@
 """
-Simple rate limiting for authentication endpoints.
-Uses Django's built-in cache framework - no external dependencies.
+Rate limiting for authentication endpoints.
+
+Counters are updated with atomic cache primitives, so concurrent requests across
+gunicorn workers/threads never lose increments:
+
+- With ``REDIS_URL`` set, a Lua script keeps a sliding window in a sorted set and
+  checks/records/blocks in a single round trip.
+- Otherwise a fixed window counter is maintained with ``cache.incr``/``cache.add``
+  (atomic on LocMemCache, memcached and Redis).
+
+When the cache cannot count (django-redis with ``IGNORE_EXCEPTIONS`` and Redis down
+returns ``None``), the limiter fails open: requests are allowed and not blocked.
 """
 
+import os
+import time
 from functools import wraps
 
 from django.conf import settings
 from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 from django.http import HttpResponseForbidden
 from django.utils.translation import gettext_lazy as _
 
@@ -26,7 +40,18 @@ def get_client_ip(request):
     SECURITY: Only trusts X-Forwarded-For header when the direct connection
     comes from a known trusted proxy. This prevents IP spoofing attacks
     that could bypass rate limiting.
+
+    The result is memoized on the request, so repeated calls are free.
     """
+    cached = getattr(request, "_ratelimit_client_ip", None)
+    if cached is not None:
+        return cached
+    client_ip = _resolve_client_ip(request)
+    request._ratelimit_client_ip = client_ip
+    return client_ip
+
+
+def _resolve_client_ip(request):
     remote_addr = request.META.get("REMOTE_ADDR", "")
 
     # Only trust X-Forwarded-For if request comes from a trusted proxy
@@ -53,9 +78,136 @@ def get_client_ip(request):
     return remote_addr
 
 
+# Sliding window check in one round trip.
+# KEYS[1] = window sorted set, KEYS[2] = block flag
+# ARGV = now_ms, period_ms, limit, block_seconds, member
+# Returns {allowed (0/1), count, reset_ms}
+_SLIDING_WINDOW_LUA = """
+local ttl = redis.call('PTTL', KEYS[2])
+if ttl > 0 then
+    return {0, -1, ttl}
+end
+local now = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - period)
+local count = redis.call('ZCARD', KEYS[1])
+if count >= limit then
+    redis.call('SET', KEYS[2], '1', 'EX', tonumber(ARGV[4]))
+    return {0, count, tonumber(ARGV[4]) * 1000}
+end
+redis.call('ZADD', KEYS[1], now, ARGV[5])
+redis.call('PEXPIRE', KEYS[1], period)
+local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+return {1, count + 1, tonumber(oldest[2]) + period - now}
+"""
+
+
+class CacheRateLimitBackend:
+    """
+    Fixed window counter on Django's cache using atomic ``incr``/``add``.
+
+    The window number is part of the key, so a new window starts from a fresh
+    key instead of a read-modify-write reset.
+    """
+
+    def hit(self, limiter, ident):
+        """Record one hit. Returns (allowed, count, reset_seconds)."""
+        now = time.time()
+        window = int(now // limiter.period)
+        block_key = limiter.block_key(ident)
+        key = f"{limiter.counter_key(ident)}:{window}"
+        reset = int((window + 1) * limiter.period - now) or 1
+
+        # One round trip for both the block flag and the current count
+        found = cache.get_many([block_key, key])
+        if block_key in found:
+            return False, -1, limiter.block_time
+
+        if key in found:
+            if found[key] >= limiter.limit:
+                count = found[key] + 1
+            else:
+                count = self._incr(key, limiter.period)
+        elif cache.add(key, 1, limiter.period):
+            count = 1
+        else:
+            count = self._incr(key, limiter.period)
+
+        if count is None:
+            # The cache swallowed an error (IGNORE_EXCEPTIONS): fail open
+            return True, 0, reset
+        if count > limiter.limit:
+            cache.set(block_key, True, limiter.block_time)
+            return False, count, limiter.block_time
+        return True, count, reset
+
+    @staticmethod
+    def _incr(key, timeout):
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # First hit of the window; another thread may win the add race
+            added = cache.add(key, 1, timeout)
+            if added is None:
+                return None
+            if added:
+                return 1
+            return cache.incr(key)
+
+
+class RedisRateLimitBackend:
+    """Sliding window on Redis, evaluated atomically by a server-side Lua script."""
+
+    def __init__(self):
+        from django_redis import get_redis_connection
+
+        self.client = get_redis_connection("default")
+        self.script = self.client.register_script(_SLIDING_WINDOW_LUA)
+        self.fallback = CacheRateLimitBackend()
+
+    def hit(self, limiter, ident):
+        from redis.exceptions import RedisError
+
+        now_ms = time.time_ns() // 1_000_000
+        keys = [
+            cache.make_key(limiter.counter_key(ident)),
+            cache.make_key(limiter.block_key(ident)),
+        ]
+        args = [now_ms, limiter.period * 1000, limiter.limit, limiter.block_time]
+        args.append(f"{now_ms}:{os.urandom(6).hex()}")
+        try:
+            allowed, count, reset_ms = self.script(keys=keys, args=args)
+        except RedisError:
+            # Degrade like the cache itself (IGNORE_EXCEPTIONS); fails open if it is down too
+            return self.fallback.hit(limiter, ident)
+        return bool(allowed), int(count), max(int(reset_ms) // 1000, 1)
+
+
+_backend = None
+
+
+def get_backend():
+    """Return the process-wide rate limit backend, chosen from ``REDIS_URL``."""
+    global _backend
+    if _backend is None:
+        if getattr(settings, "REDIS_URL", ""):
+            _backend = RedisRateLimitBackend()
+        else:
+            _backend = CacheRateLimitBackend()
+    return _backend
+
+
+@receiver(setting_changed)
+def _reset_backend(setting, **kwargs):
+    global _backend
+    if setting in ("REDIS_URL", "CACHES"):
+        _backend = None
+
+
 class RateLimiter:
     """
-    Simple rate limiter using Django's cache.
+    Rate limiter using atomic cache (or Redis) counters.
 
     Usage:
         @RateLimiter(key='login', rate='5/m')
@@ -95,58 +247,40 @@ class RateLimiter:
         seconds = period_map.get(period, 60)
         return count, seconds
 
+    def counter_key(self, ident):
+        return f"ratelimit:{self.key}:{ident}"
+
+    def block_key(self, ident):
+        return f"ratelimit:blocked:{self.key}:{ident}"
+
     def _get_cache_key(self, request):
         """Generate cache key based on IP and rate limit key."""
-        ip = get_client_ip(request)
-        return f"ratelimit:{self.key}:{ip}"
+        return self.counter_key(get_client_ip(request))
 
     def _get_block_key(self, request):
         """Generate block key for temporarily blocked IPs."""
-        ip = get_client_ip(request)
-        return f"ratelimit:blocked:{self.key}:{ip}"
+        return self.block_key(get_client_ip(request))
 
     def is_blocked(self, request):
         """Check if this IP is currently blocked."""
-        block_key = self._get_block_key(request)
-        return cache.get(block_key) is not None
+        return cache.get(self._get_block_key(request)) is not None
 
-    def check_rate_limit(self, request):
+    def check_rate_limit(self, request, ident=None):
         """
-        Check if request is within rate limit.
+        Check if request is within rate limit, recording the attempt.
+
+        Args:
+            ident: Client identity; resolved from the request when omitted
 
         Returns:
             tuple: (allowed: bool, remaining: int, reset_time: int)
         """
-        # Check if blocked
-        if self.is_blocked(request):
-            return False, 0, self.block_time
-
-        cache_key = self._get_cache_key(request)
-
-        # Get current count
-        current = cache.get(cache_key, {"count": 0, "reset": 0})
-
-        import time
-
-        now = time.time()
-
-        # Check if period has reset
-        if now > current.get("reset", 0):
-            current = {"count": 0, "reset": now + self.period}
-
-        # Check if over limit
-        if current["count"] >= self.limit:
-            # Block this IP
-            block_key = self._get_block_key(request)
-            cache.set(block_key, True, self.block_time)
-            return False, 0, self.block_time
-
-        # Increment count
-        current["count"] += 1
-        cache.set(cache_key, current, self.period)
-
-        remaining = self.limit - current["count"]
-        return True, remaining, int(current["reset"] - now)
+        if ident is None:
+            ident = get_client_ip(request)
+        allowed, count, reset = get_backend().hit(self, ident)
+        if not allowed:
+            return False, 0, reset
+        return True, self.limit - count, reset
 
     def __call__(self, view_func):
         """Decorator for views."""
@@ -188,12 +322,22 @@ class RateLimitMixin:
     ratelimit_rate = "10/m"
     ratelimit_block = 300
 
+    @classmethod
+    def get_ratelimiter(cls):
+        """Return this view class's limiter, built once on first use."""
+        # Look in the class's own __dict__ so subclasses never reuse a parent's limiter
+        limiter = cls.__dict__.get("_ratelimiter")
+        if limiter is None:
+            limiter = RateLimiter(
+                key=cls.ratelimit_key, rate=cls.ratelimit_rate, block_time=cls.ratelimit_block
+            )
+            cls._ratelimiter = limiter
+        return limiter
+
     def dispatch(self, request, *args, **kwargs):
-        limiter = RateLimiter(
-            key=self.ratelimit_key, rate=self.ratelimit_rate, block_time=self.ratelimit_block
-        )
+        limiter = self.get_ratelimiter()
 
-        allowed, remaining, reset = limiter.check_rate_limit(request)
+        allowed, remaining, reset = limiter.check_rate_limit(request, get_client_ip(request))
 
         if not allowed:
             return HttpResponseForbidden(
@@ -0,0 +1,64 @@
+"""
+Sequential document numbers (``INV-2026-0001``, ``ORC-2026-0001``, ``TKT-2026-0001``).
+
+Numbers come from one ``ContadorNumero`` row per (prefix, year), so allocating
+is O(1) and never scans the document table. The counter is incremented with an
+``UPDATE ... SET ultimo_valor = ultimo_valor + n``, which takes the row lock, so
+concurrent allocations are serialized and can never hand out the same number.
+The first allocation of a (prefix, year) seeds the counter from the rows that
+already exist.
+
+The counter deliberately lives only in the database, even when ``REDIS_URL`` is
+set: callers allocate inside the same ``transaction.atomic()`` as the INSERT of
+the document (see ``Fatura.save``, ``Orcamento.save``, ``Ticket.save``), so the
+increment commits or rolls back with it and numbering has no gaps. A Redis ``INCRBY`` cannot be rolled back,
+and keeping a durable high-water mark next to it would take the same row lock.
+"""
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.models import ContadorNumero
+
+
+def format_numero(prefix, year, value):
+    return f"{prefix}-{year}-{value:04d}"
+
+
+def allocate_numero(model, prefix, year=None):
+    """Return the next ``numero`` for ``model`` under ``prefix``, e.g. ``INV-2026-0042``."""
+    return allocate_numeros(model, prefix, 1, year)[0]
+
+
+def allocate_numeros(model, prefix, count, year=None):
+    """Reserve ``count`` consecutive numbers in one step and return them as strings."""
+    year = year or timezone.localdate().year
+    last = _allocate(prefix, year, count, lambda: _existing_max(model, prefix, year))
+    return [format_numero(prefix, year, value) for value in range(last - count + 1, last + 1)]
+
+
+def _existing_max(model, prefix, year):
+    """Highest numeric suffix already used (only read once, to seed a new counter)."""
+    numeros = model.objects.filter(numero__startswith=f"{prefix}-{year}-").values_list(
+        "numero", flat=True
+    )
+    # Parse instead of Max("numero"): string order breaks past 9999
+    return max((int(numero.rsplit("-", 1)[1]) for numero in numeros.iterator()), default=0)
+
+
+def _allocate(prefix, year, count, seed):
+    """Advance the counter row by ``count`` and return the new last value."""
+    counters = ContadorNumero.objects.filter(prefixo=prefix, ano=year)
+    with transaction.atomic():
+        if not counters.update(ultimo_valor=F("ultimo_valor") + count):
+            try:
+                with transaction.atomic():
+                    ContadorNumero.objects.create(
+                        prefixo=prefix, ano=year, ultimo_valor=seed() + count
+                    )
+            except IntegrityError:
+                # Another process created the counter first
+                counters.update(ultimo_valor=F("ultimo_valor") + count)
+        # The UPDATE holds the row lock until commit, so this read is ours alone
+        return counters.values_list("ultimo_valor", flat=True).get()
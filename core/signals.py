@@ -0,0 +1,53 @@
+"""
+Cache invalidation for the home page fragment and the site configuration.
+
+Saving or deleting any model rendered on the home page bumps the ``home`` cache
+version (see ``core.cache``), so the next request re-renders the fragment.
+Saving or deleting ``ConfiguracaoSite`` also bumps its own version, which every
+worker checks once its local copy expires. Both bumps wait for the transaction
+to commit: bumped earlier, a concurrent reader could still load the old rows
+and cache them under the new version.
+"""
+
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from pacotes.models import Pacote, RecursoPacote
+from portfolio.models import Case
+from servicos.models import Servico
+
+from .cache import bump_cache_version
+from .models import ConfiguracaoSite, Depoimento
+
+HOME_CACHE_NAMESPACE = "home"
+
+HOME_MODELS = (Servico, Pacote, RecursoPacote, Case, Depoimento, ConfiguracaoSite)
+
+
+def invalidate_home_cache(sender, **kwargs):
+    transaction.on_commit(partial(bump_cache_version, HOME_CACHE_NAMESPACE))
+
+
+def invalidate_site_config(sender, **kwargs):
+    transaction.on_commit(_bump_site_config)
+
+
+def _bump_site_config():
+    bump_cache_version(ConfiguracaoSite.CACHE_NAMESPACE)
+    ConfiguracaoSite.clear_local_cache()
+
+
+for _model in HOME_MODELS:
+    post_save.connect(
+        invalidate_home_cache, sender=_model, dispatch_uid=f"home_save_{_model.__name__}"
+    )
+    post_delete.connect(
+        invalidate_home_cache, sender=_model, dispatch_uid=f"home_delete_{_model.__name__}"
+    )
+
+post_save.connect(invalidate_site_config, sender=ConfiguracaoSite, dispatch_uid="site_config_save")
+post_delete.connect(
+    invalidate_site_config, sender=ConfiguracaoSite, dispatch_uid="site_config_delete"
+)
@@ -0,0 +1,136 @@
+"""
+Status state machines for models with a ``VALID_TRANSITIONS`` table.
+
+``StateMachineMixin`` remembers the state field's value when an instance is
+loaded (``from_db``) or saved, so ``clean()`` validates a transition without
+reading the row again. ``transition()`` moves a whole queryset with one UPDATE
+restricted, in SQL, to the statuses allowed to reach the target.
+"""
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+_UNKNOWN = object()
+
+
+class StateMachineMixin:
+    """
+    Mixin for models whose ``state_field`` follows ``VALID_TRANSITIONS``.
+
+    ``VALID_TRANSITIONS`` maps each status to the set of statuses it may move
+    to. Must come before ``models.Model`` in the bases.
+    """
+
+    state_field = "status"
+    VALID_TRANSITIONS = {}
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_state()
+        return instance
+
+    def _remember_state(self):
+        # Deferred fields are absent from __dict__; they stay unknown until loaded
+        self._loaded_state = self.__dict__.get(self.state_field, _UNKNOWN)
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or self.state_field in update_fields:
+            self._remember_state()
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        if fields is None or self.state_field in fields:
+            self._remember_state()
+
+    @property
+    def original_state(self):
+        """The state stored in the database, or None for unsaved instances."""
+        if self.pk is None:
+            return None
+        state = getattr(self, "_loaded_state", _UNKNOWN)
+        if state is _UNKNOWN:
+            # Built by hand rather than loaded: ask the database
+            state = (
+                type(self)
+                ._base_manager.filter(pk=self.pk)
+                .values_list(self.state_field, flat=True)
+                .first()
+            )
+        return state
+
+    @classmethod
+    def statuses_allowing(cls, target):
+        """Statuses ``VALID_TRANSITIONS`` allows to move to ``target``."""
+        return [status for status, allowed in cls.VALID_TRANSITIONS.items() if target in allowed]
+
+    def clean(self):
+        """Enforce valid state-machine transitions on the state field."""
+        super().clean()
+        original = self.original_state
+        current = getattr(self, self.state_field)
+        if original is None or original == current:
+            return  # New instance, or no change — always valid
+        allowed = self.VALID_TRANSITIONS.get(original, set())
+        if current not in allowed:
+            raise ValidationError(
+                _(
+                    'Transição de status inválida: "%(from)s" → "%(to)s". '
+                    "Transições permitidas: %(allowed)s"
+                ),
+                params={
+                    "from": original,
+                    "to": current,
+                    "allowed": ", ".join(sorted(allowed)) if allowed else _("nenhuma"),
+                },
+            )
+
+    @classmethod
+    def record_transitions(cls, rows, to_status, usuario=None, observacao=""):
+        """
+        Hook called by ``transition()`` inside its transaction.
+
+        ``rows`` are ``(pk, previous_status)`` pairs just moved to ``to_status``.
+        """
+
+
+def transition(queryset, to_status, *, usuario=None, observacao="", **updates):
+    """
+    Move every row of ``queryset`` allowed to reach ``to_status``; returns how many moved.
+
+    Rows in any other status are left alone. ``updates`` are extra fields set by
+    the same UPDATE; ``auto_now`` fields are bumped automatically.
+    """
+    model = queryset.model
+    field = model.state_field
+    if to_status not in model.VALID_TRANSITIONS:
+        raise ValueError(f"Unknown {model.__name__}.{field}: {to_status!r}")
+    sources = model.statuses_allowing(to_status)
+    if not sources:
+        return 0
+
+    db = queryset.db
+    now = timezone.now()
+    for model_field in model._meta.concrete_fields:
+        if getattr(model_field, "auto_now", False):
+            updates.setdefault(model_field.attname, now)
+
+    with transaction.atomic(using=db):
+        # Through a pk subquery so querysets with DISTINCT (admin search) can be locked
+        eligible = model._base_manager.using(db).filter(
+            pk__in=queryset.values("pk"), **{f"{field}__in": sources}
+        )
+        rows = list(eligible.select_for_update().order_by("pk").values_list("pk", field))
+        if not rows:
+            return 0
+        moved = (
+            model._base_manager.using(db)
+            .filter(pk__in=[pk for pk, _status in rows], **{f"{field}__in": sources})
+            .update(**{field: to_status}, **updates)
+        )
+        model.record_transitions(rows, to_status, usuario=usuario, observacao=observacao)
+    return moved
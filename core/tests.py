@@ -2,13 +2,63 @@
 Core App Tests - ConfiguracaoSite, Contato, Depoimento, FAQ + Views
 """
 
+import hashlib
+import hmac
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase
-
-from core.models import FAQ, ConfiguracaoSite, Contato, Depoimento
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.http import BadHeaderError, HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.views import View
+
+from clientes.models import SessaoAtiva
+from core import deploys, query_plans
+from core.cache import get_cache_version
+from core.middleware import (
+    DEFAULT_CSP_DIRECTIVES,
+    RequestValidationMiddleware,
+    SecurityHeadersMiddleware,
+    SessionActivityBuffer,
+)
+from core.models import FAQ, ConfiguracaoSite, Contato, DeployJob, Depoimento
+from core.ratelimit import (
+    CacheRateLimitBackend,
+    RateLimiter,
+    RateLimitMixin,
+    RedisRateLimitBackend,
+    get_backend,
+    get_client_ip,
+)
+from core.sequences import allocate_numero, allocate_numeros
+from servicos.models import Servico
+from suporte.models import Ticket
 
 User = get_user_model()
 
+# Pins tests that assert on the local-cache code paths when CI exports REDIS_URL
+LOCMEM_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "core-tests",
+    }
+}
+
 
 # ─────────────────────────── ConfiguracaoSite ───────────────────────────────
 
@@ -272,3 +322,948 @@ class FAQModelTest(TestCase):
         )
         faqs = list(FAQ.objects.all())
         self.assertTrue(len(faqs) >= 2)
+
+
+# ─────────────────────────── Home page cache ────────────────────────────────
+
+
+@override_settings(VERSIONED_CACHE_ALLOW_LOCAL=True)
+class HomeViewCacheTest(TestCase):
+    """Tests for the cached home page fragment."""
+
+    def setUp(self):
+        cache.clear()
+        self.servico = Servico.objects.create(
+            tipo="desenvolvimento",
+            nome_pt="Servico Destaque PT",
+            nome_en="Featured Service EN",
+            descricao_curta_pt="Curta",
+            descricao_pt="Completa",
+            destaque=True,
+        )
+
+    def _csp(self, response):
+        return response.get("Content-Security-Policy") or response.get(
+            "Content-Security-Policy-Report-Only"
+        )
+
+    def test_home_renders(self):
+        response = self.client.get("/")
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Servico Destaque PT")
+
+    def test_cached_render_skips_content_queries(self):
+        with CaptureQueriesContext(connection) as cold:
+            self.client.get("/")
+        with CaptureQueriesContext(connection) as warm:
+            response = self.client.get("/")
+        self.assertContains(response, "Servico Destaque PT")
+        self.assertLess(len(warm.captured_queries), len(cold.captured_queries))
+        tables = " ".join(q["sql"] for q in warm.captured_queries)
+        for table in ("servicos_servico", "pacotes_pacote", "portfolio_case", "core_depoimento"):
+            self.assertNotIn(table, tables)
+
+    @override_settings(
+        VERSIONED_CACHE_ALLOW_LOCAL=False,
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    )
+    def test_process_local_backend_renders_every_time(self):
+        self.client.get("/")
+        # Saved in another worker: no bump reaches this process
+        Servico.objects.filter(pk=self.servico.pk).update(nome_pt="Servico Renomeado")
+        self.assertContains(self.client.get("/"), "Servico Renomeado")
+
+    def test_model_save_invalidates_fragment(self):
+        self.client.get("/")
+        self.servico.nome_pt = "Servico Renomeado"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.servico.save()
+        self.assertContains(self.client.get("/"), "Servico Renomeado")
+
+    def test_fragment_invalidated_only_after_commit(self):
+        self.client.get("/")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.servico.nome_pt = "Servico Renomeado"
+            self.servico.save()
+            # Until commit other readers see the old row, so the old fragment stays current
+            self.assertNotContains(self.client.get("/"), "Servico Renomeado")
+        self.assertContains(self.client.get("/"), "Servico Renomeado")
+
+    def test_depoimento_change_invalidates_fragment(self):
+        self.client.get("/")
+        with self.captureOnCommitCallbacks(execute=True):
+            Depoimento.objects.create(
+                nome="Cliente Novo", empresa="Empresa X", depoimento_pt="Ótimo!", destaque=True
+            )
+        self.assertContains(self.client.get("/"), "Cliente Novo")
+
+    def test_fragment_is_cached_per_language(self):
+        self.assertContains(self.client.get("/"), "Servico Destaque PT")
+        self.assertContains(self.client.get("/en/"), "Featured Service EN")
+
+    def test_csp_nonce_is_fresh_on_cached_responses(self):
+        first = self._csp(self.client.get("/"))
+        second = self._csp(self.client.get("/"))
+        self.assertIn("'nonce-", second)
+        self.assertNotEqual(first, second)
+
+    def test_user_menu_is_not_cached(self):
+        self.client.get("/")
+        user = User.objects.create_user(
+            email="home@example.com", password="Senha@123456", nome_completo="Home", is_active=True
+        )
+        self.client.force_login(user)
+        self.assertContains(self.client.get("/"), reverse("projetos:dashboard"))
+
+
+@override_settings(VERSIONED_CACHE_ALLOW_LOCAL=True)
+class SiteConfigCacheTest(TestCase):
+    """Tests for the two-tier ConfiguracaoSite cache used by site_settings."""
+
+    def setUp(self):
+        cache.clear()
+        ConfiguracaoSite.clear_local_cache()
+        self.config = ConfiguracaoSite.objects.create(email_contato="antes@example.com")
+        self.addCleanup(ConfiguracaoSite.clear_local_cache)
+
+    def test_steady_state_issues_no_queries(self):
+        self.assertEqual(ConfiguracaoSite.get_cached(), self.config)
+        with self.assertNumQueries(0):
+            ConfiguracaoSite.get_cached()
+
+    def test_shared_tier_serves_other_workers(self):
+        ConfiguracaoSite.get_cached()
+        # Simulate a freshly started worker with an empty local copy
+        ConfiguracaoSite.clear_local_cache()
+        with self.assertNumQueries(0):
+            self.assertEqual(ConfiguracaoSite.get_cached().email_contato, "antes@example.com")
+
+    def test_save_invalidates_other_workers_after_local_ttl(self):
+        ConfiguracaoSite.get_cached()
+        stale_version, stale_value, _ = ConfiguracaoSite._local
+        self.config.email_contato = "depois@example.com"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.config.save()
+        # Another worker still holds the old copy, but its local TTL has expired
+        ConfiguracaoSite._local = (stale_version, stale_value, 0.0)
+        self.assertEqual(ConfiguracaoSite.get_cached().email_contato, "depois@example.com")
+
+    @override_settings(
+        VERSIONED_CACHE_ALLOW_LOCAL=False,
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    )
+    def test_process_local_backend_rereads_after_local_ttl(self):
+        ConfiguracaoSite.get_cached()
+        # Saved in another worker: no bump reaches this process
+        ConfiguracaoSite.objects.update(email_contato="depois@example.com")
+        with self.assertNumQueries(0):
+            self.assertEqual(ConfiguracaoSite.get_cached().email_contato, "antes@example.com")
+        version, value, _ = ConfiguracaoSite._local
+        ConfiguracaoSite._local = (version, value, 0.0)
+        self.assertEqual(ConfiguracaoSite.get_cached().email_contato, "depois@example.com")
+
+    def test_delete_invalidates(self):
+        ConfiguracaoSite.get_cached()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.config.delete()
+        self.assertIsNone(ConfiguracaoSite.get_cached())
+
+    def test_version_bumped_only_after_commit(self):
+        version = get_cache_version(ConfiguracaoSite.CACHE_NAMESPACE)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.config.save()
+            # A reader missing now still sees the old row, so it must not get a new key
+            self.assertEqual(get_cache_version(ConfiguracaoSite.CACHE_NAMESPACE), version)
+        self.assertNotEqual(get_cache_version(ConfiguracaoSite.CACHE_NAMESPACE), version)
+
+    def test_missing_config_is_cached_too(self):
+        ConfiguracaoSite.objects.all().delete()
+        self.assertIsNone(ConfiguracaoSite.get_cached())
+        ConfiguracaoSite.clear_local_cache()
+        with self.assertNumQueries(0):
+            self.assertIsNone(ConfiguracaoSite.get_cached())
+
+    def test_context_processor_uses_cached_config(self):
+        self.client.get("/")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/")
+        self.assertEqual(response.context["config"], self.config)
+        self.assertNotIn("core_configuracaosite", " ".join(q["sql"] for q in queries))
+
+
+# ─────────────────────────── Rate limiting ──────────────────────────────────
+
+
+class RateLimiterTest(TestCase):
+    """Tests for the atomic cache-backed rate limiter."""
+
+    def setUp(self):
+        cache.clear()
+        self.request = RequestFactory().get("/", REMOTE_ADDR="203.0.113.7")
+
+    @override_settings(REDIS_URL="", CACHES=LOCMEM_CACHES)
+    def test_default_backend_without_redis(self):
+        self.assertIsInstance(get_backend(), CacheRateLimitBackend)
+
+    def test_allows_up_to_limit_then_blocks(self):
+        limiter = RateLimiter(key="t_limit", rate="3/m", block_time=120)
+        results = [limiter.check_rate_limit(self.request) for _ in range(3)]
+        self.assertEqual([r[1] for r in results], [2, 1, 0])
+        self.assertTrue(all(r[0] for r in results))
+
+        allowed, remaining, reset = limiter.check_rate_limit(self.request)
+        self.assertFalse(allowed)
+        self.assertEqual((remaining, reset), (0, 120))
+        self.assertTrue(limiter.is_blocked(self.request))
+
+    def test_limits_are_per_ip(self):
+        limiter = RateLimiter(key="t_ip", rate="1/m")
+        other = RequestFactory().get("/", REMOTE_ADDR="198.51.100.1")
+        self.assertTrue(limiter.check_rate_limit(self.request)[0])
+        self.assertFalse(limiter.check_rate_limit(self.request)[0])
+        self.assertTrue(limiter.check_rate_limit(other)[0])
+
+    def test_concurrent_checks_lose_no_updates(self):
+        limiter = RateLimiter(key="t_concurrent", rate="1000/m")
+        threads, per_thread = 8, 100
+
+        def hammer(_):
+            return [limiter.check_rate_limit(self.request)[1] for _ in range(per_thread)]
+
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            remaining = [r for batch in pool.map(hammer, range(threads)) for r in batch]
+
+        # Every increment is observed exactly once
+        total = threads * per_thread
+        self.assertEqual(sorted(remaining), list(range(1000 - total, 1000)))
+
+    def test_concurrent_checks_never_exceed_limit(self):
+        limiter = RateLimiter(key="t_race", rate="50/m")
+
+        def hammer(_):
+            return sum(limiter.check_rate_limit(self.request)[0] for _ in range(25))
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            allowed = sum(pool.map(hammer, range(8)))
+        self.assertEqual(allowed, 50)
+
+    def test_decorator_sets_headers(self):
+        @RateLimiter(key="t_decorator", rate="2/m")
+        def view(request):
+            return HttpResponse("ok")
+
+        response = view(self.request)
+        self.assertEqual(response["X-RateLimit-Limit"], "2")
+        self.assertEqual(response["X-RateLimit-Remaining"], "1")
+        view(self.request)
+        self.assertEqual(view(self.request).status_code, 403)
+
+    @override_settings(REDIS_URL="", CACHES=LOCMEM_CACHES)
+    def test_block_and_counter_read_in_one_round_trip(self):
+        limiter = RateLimiter(key="t_get_many", rate="5/m")
+        limiter.check_rate_limit(self.request)
+        with patch.object(cache, "get_many", wraps=cache.get_many) as get_many:
+            limiter.check_rate_limit(self.request)
+        get_many.assert_called_once()
+        keys = get_many.call_args.args[0]
+        self.assertIn(limiter.block_key("203.0.113.7"), keys)
+        self.assertTrue(any(k.startswith(limiter.counter_key("203.0.113.7") + ":") for k in keys))
+
+    def test_client_ip_is_resolved_once_per_request(self):
+        with patch("core.ratelimit._resolve_client_ip", return_value="203.0.113.7") as resolve:
+            limiter = RateLimiter(key="t_ip_once", rate="5/m")
+            limiter.check_rate_limit(self.request)
+            limiter.is_blocked(self.request)
+            get_client_ip(self.request)
+        resolve.assert_called_once()
+
+    @override_settings(REDIS_URL="", CACHES=LOCMEM_CACHES)
+    def test_fails_open_when_cache_cannot_count(self):
+        # django-redis with IGNORE_EXCEPTIONS returns None from add/incr while Redis is down
+        limiter = RateLimiter(key="t_cache_down", rate="1/m")
+        with (
+            patch.object(cache, "get_many", return_value={}),
+            patch.object(cache, "add", return_value=None),
+            patch.object(cache, "incr", return_value=None),
+            patch.object(cache, "set") as set_block,
+        ):
+            results = [limiter.check_rate_limit(self.request) for _ in range(3)]
+        self.assertEqual([r[:2] for r in results], [(True, 1)] * 3)
+        set_block.assert_not_called()
+
+    def test_redis_error_falls_back_to_cache_backend(self):
+        from redis.exceptions import RedisError
+
+        redis_client = Mock()
+        redis_client.register_script.return_value = Mock(side_effect=RedisError("down"))
+        with patch("django_redis.get_redis_connection", return_value=redis_client):
+            backend = RedisRateLimitBackend()
+        limiter = RateLimiter(key="t_redis_down", rate="2/m")
+        with patch("core.ratelimit.get_backend", return_value=backend):
+            results = [limiter.check_rate_limit(self.request)[:2] for _ in range(3)]
+        self.assertEqual(results, [(True, 1), (True, 0), (False, 0)])
+
+
+class RedisRateLimitBackendTest(TestCase):
+    """Tests for the Lua sliding window; they run only when REDIS_URL is configured."""
+
+    def setUp(self):
+        if not settings.REDIS_URL:
+            self.skipTest("REDIS_URL not configured")
+        self.backend = RedisRateLimitBackend()
+        self.limiter = RateLimiter(key="t_redis", rate="3/m", block_time=120)
+        self.ident = "203.0.113.50"
+        self.addCleanup(self._delete_keys)
+        self._delete_keys()
+
+    def _delete_keys(self):
+        cache.delete_many(
+            [self.limiter.counter_key(self.ident), self.limiter.block_key(self.ident)]
+        )
+
+    def test_allows_up_to_limit_then_blocks(self):
+        results = [self.backend.hit(self.limiter, self.ident) for _ in range(3)]
+        self.assertEqual([r[:2] for r in results], [(True, 1), (True, 2), (True, 3)])
+        self.assertTrue(all(1 <= r[2] <= 60 for r in results))
+
+        self.assertEqual(self.backend.hit(self.limiter, self.ident), (False, 3, 120))
+        allowed, count, reset = self.backend.hit(self.limiter, self.ident)
+        self.assertEqual((allowed, count), (False, -1))
+        self.assertLessEqual(reset, 120)
+
+    def test_window_slides(self):
+        now_ns = time.time_ns()
+        with patch("core.ratelimit.time.time_ns", return_value=now_ns):
+            for _ in range(3):
+                self.backend.hit(self.limiter, self.ident)
+        # A minute later the earlier hits have left the window
+        with patch("core.ratelimit.time.time_ns", return_value=now_ns + 61 * 10**9):
+            self.assertEqual(self.backend.hit(self.limiter, self.ident)[:2], (True, 1))
+
+
+class RateLimitMixinTest(TestCase):
+    """Tests for RateLimitMixin on class-based views."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_limiter_built_once_per_view_class(self):
+        class LimitedView(RateLimitMixin, View):
+            ratelimit_key = "t_mixin"
+            ratelimit_rate = "2/m"
+
+            def get(self, request):
+                return HttpResponse("ok")
+
+        class OtherView(LimitedView):
+            ratelimit_key = "t_mixin_other"
+
+        view = LimitedView.as_view()
+        with patch("core.ratelimit.RateLimiter", wraps=RateLimiter) as factory:
+            for _ in range(2):
+                response = view(RequestFactory().get("/", REMOTE_ADDR="203.0.113.9"))
+                self.assertEqual(response.status_code, 200)
+            self.assertEqual(factory.call_count, 1)
+        self.assertEqual(response["X-RateLimit-Remaining"], "0")
+        self.assertEqual(
+            view(RequestFactory().get("/", REMOTE_ADDR="203.0.113.9")).status_code, 403
+        )
+
+        self.assertIsNot(OtherView.get_ratelimiter(), LimitedView.get_ratelimiter())
+        self.assertEqual(OtherView.get_ratelimiter().key, "t_mixin_other")
+
+
+# ─────────────────────────── Request validation ─────────────────────────────
+
+
+class RequestValidationMiddlewareTest(TestCase):
+    """Tests for the fused-regex RequestValidationMiddleware."""
+
+    def setUp(self):
+        self.middleware = RequestValidationMiddleware(lambda request: HttpResponse("ok"))
+        self.factory = RequestFactory()
+
+    def _verdict(self, path, **extra):
+        response = self.middleware.process_request(self.factory.get(path, **extra))
+        return None if response is None else response.status_code
+
+    def test_clean_requests_pass(self):
+        for path in ("/", "/en/servicos/", "/pacotes/?page=2&ordem=preco", "/api/v1/servicos/1/"):
+            self.assertIsNone(self._verdict(path), path)
+
+    def test_suspicious_paths_blocked(self):
+        for path in (
+            "/static/../settings.py",
+            "/a/%2e%2e%2fetc",
+            "/<SCRIPT>x",
+            "/JavaScript:alert",
+        ):
+            self.assertEqual(self._verdict(path), 403, path)
+
+    def test_sql_injection_in_query_blocked(self):
+        for query in ("q=1'--", "id=1%27%20UNION", "x=a;drop", "q=%23"):
+            self.assertEqual(self._verdict(f"/busca/?{query}"), 403, query)
+
+    def test_apostrophe_in_path_allowed(self):
+        self.assertIsNone(self._verdict("/portfolio/d'avila-store/"))
+
+    def test_long_url_blocked(self):
+        self.assertEqual(self._verdict("/" + "a" * 2100), 403)
+
+    def test_host_header(self):
+        self.assertIsNone(self._verdict("/", HTTP_HOST="ecommdev.com.br:443"))
+        self.assertEqual(self._verdict("/", HTTP_HOST="evil.com/x"), 403)
+        self.assertEqual(self._verdict("/", HTTP_HOST="evil.com\n"), 403)
+
+    def test_fused_patterns_agree_with_individual_patterns(self):
+        samples = [
+            "/",
+            "/../",
+            "/..\\",
+            "/%2E%2E/",
+            "/%00",
+            "/a\x00",
+            "/<script",
+            "/vbscript:",
+            "/DATA:text",
+            "q=1",
+            "q='",
+            "a=1;",
+            "--",
+            "x%3Dfoo%3B",
+            "'or",
+            "%27OR",
+            "'UNION",
+        ]
+        mw = RequestValidationMiddleware
+        for sample in samples:
+            for fused, patterns in (
+                (mw.PATH_PATTERN, mw.SUSPICIOUS_PATTERNS),
+                (mw.QUERY_PATTERN, mw.SQL_PATTERNS),
+            ):
+                expected = any(p.search(sample) for p in patterns)
+                self.assertEqual(bool(fused.search(sample)), expected, sample)
+
+    def test_path_verdicts_are_cached(self):
+        RequestValidationMiddleware.path_is_suspicious.cache_clear()
+        self._verdict("/servicos/")
+        self._verdict("/servicos/?page=2")
+        info = RequestValidationMiddleware.path_is_suspicious.cache_info()
+        self.assertEqual((info.hits, info.misses), (1, 1))
+
+
+# ─────────────────────────── Security headers ───────────────────────────────
+
+
+class SecurityHeadersMiddlewareTest(TestCase):
+    """Tests for the precomputed SecurityHeadersMiddleware header bundle."""
+
+    def setUp(self):
+        self.middleware = SecurityHeadersMiddleware(lambda request: HttpResponse("ok"))
+
+    def _response(self, path="/"):
+        request = RequestFactory().get(path)
+        self.middleware.process_request(request)
+        return request, self.middleware.process_response(request, HttpResponse("ok"))
+
+    @override_settings(DEBUG=False)
+    def test_csp_carries_request_nonce(self):
+        request, response = self._response()
+        expected = "; ".join(DEFAULT_CSP_DIRECTIVES).format(nonce=request.csp_nonce)
+        self.assertEqual(response["Content-Security-Policy"], expected)
+        self.assertNotIn("Content-Security-Policy-Report-Only", response)
+
+    @override_settings(DEBUG=True)
+    def test_debug_uses_report_only(self):
+        _, response = self._response()
+        self.assertIn("Content-Security-Policy-Report-Only", response)
+        self.assertNotIn("Content-Security-Policy", response)
+
+    def test_nonce_differs_per_response(self):
+        first = self._response()[1].headers
+        second = self._response()[1].headers
+        self.assertNotEqual(
+            first.get("Content-Security-Policy-Report-Only", first.get("Content-Security-Policy")),
+            second.get(
+                "Content-Security-Policy-Report-Only", second.get("Content-Security-Policy")
+            ),
+        )
+
+    def test_hardening_headers(self):
+        _, response = self._response()
+        self.assertEqual(response["X-Frame-Options"], "DENY")
+        self.assertEqual(response["X-Content-Type-Options"], "nosniff")
+        self.assertEqual(response["Cross-Origin-Opener-Policy"], "same-origin")
+        self.assertIn("camera=()", response["Permissions-Policy"])
+
+    @override_settings(DEBUG=False, CSP_POLICY="default-src 'none'", PERMISSIONS_POLICY="usb=()")
+    def test_settings_override_rebuilds_bundle(self):
+        _, response = self._response()
+        self.assertEqual(response["Content-Security-Policy"], "default-src 'none'")
+        self.assertEqual(response["Permissions-Policy"], "usb=()")
+
+    @override_settings(PERMISSIONS_POLICY="usb=()\r\nX-Injected: 1")
+    def test_header_values_are_validated(self):
+        with self.assertRaises(BadHeaderError):
+            self._response()
+
+    def test_admin_paths_get_admin_csp(self):
+        _, response = self._response("/gerenciar-ecd/")
+        self.assertEqual(response["Content-Security-Policy"], SecurityHeadersMiddleware.ADMIN_CSP)
+        self.assertEqual(response["X-Frame-Options"], "DENY")
+        self.assertNotIn("Permissions-Policy", response)
+
+    def test_debug_toolbar_is_skipped(self):
+        _, response = self._response("/__debug__/render_panel/")
+        self.assertNotIn("X-Frame-Options", response)
+
+    def test_headers_serialize(self):
+        _, response = self._response()
+        self.assertIn(b"X-Frame-Options: DENY", response.serialize_headers())
+
+
+# ─────────────────────────── Session security ───────────────────────────────
+
+
+# Writes are counted as django_session SQL, so pin the DB engine (CI's REDIS_URL selects the cache)
+@override_settings(
+    SESSION_ENGINE="django.contrib.sessions.backends.db",
+    SESSION_SAVE_EVERY_REQUEST=False,
+    SESSION_COOKIE_AGE=7200,
+)
+class SessionWriteElisionTest(TestCase):
+    """Tests for session write elision and batched SessaoAtiva updates."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="sessao@example.com",
+            password="Senha@123456",
+            nome_completo="Sessao",
+            is_active=True,
+        )
+        self.client.force_login(self.user)
+        self.client.get("/")  # first view: fingerprint + initial rotation are persisted
+
+    def _session_writes(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get("/")
+        return [
+            q["sql"]
+            for q in queries
+            if "django_session" in q["sql"] and not q["sql"].lstrip().upper().startswith("SELECT")
+        ]
+
+    def _set_session(self, **values):
+        session = self.client.session
+        session.update(values)
+        session.save()
+
+    def test_steady_state_page_view_writes_nothing(self):
+        self.assertEqual(self._session_writes(), [])
+
+    def test_session_saved_when_expiry_within_refresh_window(self):
+        self._set_session(_security_refreshed=int(time.time()) - 7000)
+        self.assertEqual(len(self._session_writes()), 1)
+        self.assertEqual(self._session_writes(), [])
+
+    @override_settings(SESSION_SAVE_EVERY_REQUEST=True)
+    def test_save_every_request_still_honoured(self):
+        self.assertEqual(len(self._session_writes()), 1)
+
+    def test_rotation_keeps_sessao_ativa_linked(self):
+        old_key = self.client.session.session_key
+        sessao = SessaoAtiva.objects.get(session_key=old_key)  # created by force_login
+        self._set_session(_security_last_rotation=0)
+        self.client.get("/")
+        new_key = self.client.session.session_key
+        self.assertNotEqual(new_key, old_key)
+        sessao.refresh_from_db()
+        self.assertEqual(sessao.session_key, new_key)
+
+
+class SessionActivityBufferTest(TestCase):
+    """Tests for batched SessaoAtiva.ultimo_acesso updates."""
+
+    def setUp(self):
+        user = User.objects.create_user(
+            email="buffer@example.com", password="Senha@123456", nome_completo="Buffer"
+        )
+        self.sessoes = [
+            SessaoAtiva.objects.create(
+                usuario=user,
+                session_key=f"key{i}",
+                ip_address="127.0.0.1",
+                dispositivo="Desktop",
+                navegador="Firefox",
+            )
+            for i in range(3)
+        ]
+        SessaoAtiva.objects.update(ultimo_acesso=timezone.now() - timedelta(days=1))
+        self.buffer = SessionActivityBuffer()
+
+    @override_settings(SESSION_ACTIVITY_FLUSH_INTERVAL=3600)
+    def test_touches_are_buffered_then_flushed_in_one_update(self):
+        with self.assertNumQueries(0):
+            for sessao in self.sessoes:
+                self.buffer.touch(sessao.session_key)
+                self.buffer.touch(sessao.session_key)
+        with self.assertNumQueries(1):
+            self.buffer.flush()
+        recent = timezone.now() - timedelta(minutes=1)
+        self.assertEqual(SessaoAtiva.objects.filter(ultimo_acesso__gte=recent).count(), 3)
+
+    @override_settings(SESSION_ACTIVITY_FLUSH_INTERVAL=0)
+    def test_flushes_when_interval_elapsed(self):
+        with self.assertNumQueries(1):
+            self.buffer.touch("key0")
+        self.sessoes[0].refresh_from_db()
+        self.assertGreater(self.sessoes[0].ultimo_acesso, timezone.now() - timedelta(minutes=1))
+
+
+# ─────────────────────────── Sequential numbers ─────────────────────────────
+
+
+class SequenceAllocatorTest(TestCase):
+    """Tests for the ContadorNumero-backed numero allocator."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="seq@example.com", password="Senha@123456", nome_completo="Seq", is_active=True
+        )
+
+    def _ticket(self, **kwargs):
+        return Ticket.objects.create(
+            cliente=self.user, assunto="Erro", descricao="Detalhes", categoria="tecnico", **kwargs
+        )
+
+    def test_numbers_are_sequential_per_prefix(self):
+        year = timezone.localdate().year
+        self.assertEqual(allocate_numero(Ticket, "TKT"), f"TKT-{year}-0001")
+        self.assertEqual(allocate_numero(Ticket, "TKT"), f"TKT-{year}-0002")
+        self.assertEqual(allocate_numero(Ticket, "INV"), f"INV-{year}-0001")
+
+    def test_counter_seeded_from_existing_rows(self):
+        year = timezone.localdate().year
+        self._ticket(numero=f"TKT-{year}-9999")
+        self._ticket(numero=f"TKT-{year}-10000")
+        self.assertEqual(self._ticket().numero, f"TKT-{year}-10001")
+
+    def test_allocation_does_not_scan_the_document_table(self):
+        self._ticket()
+        with CaptureQueriesContext(connection) as queries:
+            self._ticket()
+        self.assertFalse(
+            any("SELECT" in q["sql"] and "suporte_ticket" in q["sql"] for q in queries)
+        )
+
+    def test_block_allocation(self):
+        year = timezone.localdate().year
+        numeros = allocate_numeros(Ticket, "TKT", 3, year=2030)
+        self.assertEqual(numeros, ["TKT-2030-0001", "TKT-2030-0002", "TKT-2030-0003"])
+        self.assertEqual(allocate_numero(Ticket, "TKT", year=2030), "TKT-2030-0004")
+        self.assertEqual(allocate_numero(Ticket, "TKT"), f"TKT-{year}-0001")
+
+    def test_failed_insert_does_not_burn_a_number(self):
+        year = timezone.localdate().year
+        ticket = Ticket(cliente=self.user, assunto="Erro", descricao="-", categoria="tecnico")
+        with (
+            patch.object(Ticket, "save_base", side_effect=IntegrityError("insert failed")),
+            self.assertRaises(IntegrityError),
+        ):
+            ticket.save()
+        self.assertEqual(ticket.numero, "")
+        self.assertEqual(self._ticket().numero, f"TKT-{year}-0001")
+
+    def test_rolled_back_allocation_leaves_no_gap(self):
+        year = timezone.localdate().year
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.assertEqual(allocate_numero(Ticket, "TKT"), f"TKT-{year}-0001")
+            raise IntegrityError("document insert failed")
+        self.assertEqual(allocate_numero(Ticket, "TKT"), f"TKT-{year}-0001")
+
+
+class SequenceAllocatorConcurrencyTest(TransactionTestCase):
+    """Parallel inserts must never collide on numero."""
+
+    def test_parallel_inserts_get_unique_numbers(self):
+        user = User.objects.create_user(
+            email="seq-par@example.com", password="Senha@123456", nome_completo="Par"
+        )
+        threads, per_thread = 8, 250
+
+        def create_ticket():
+            # The in-memory SQLite test database reports "table is locked" instead
+            # of waiting for the lock; retry the whole unit (counter + insert)
+            while True:
+                try:
+                    with transaction.atomic():
+                        return Ticket.objects.create(
+                            cliente=user, assunto="Carga", descricao="Paralelo", categoria="tecnico"
+                        )
+                except OperationalError as exc:
+                    if "locked" not in str(exc):
+                        raise
+
+        def create_tickets(_):
+            try:
+                for _ in range(per_thread):
+                    create_ticket()
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(create_tickets, range(threads)))
+
+        numeros = list(Ticket.objects.values_list("numero", flat=True))
+        self.assertEqual(len(numeros), threads * per_thread)
+        self.assertEqual(len(set(numeros)), len(numeros))
+        suffixes = sorted(int(n.rsplit("-", 1)[1]) for n in numeros)
+        self.assertEqual(suffixes, list(range(1, threads * per_thread + 1)))
+
+
+# ─────────────────────────── Deploy webhook ─────────────────────────────────
+
+
+class DeployTestMixin:
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+        log_dir = patch.object(deploys, "DEPLOY_LOG_DIR", self.tmp / "logs")
+        log_dir.start()
+        self.addCleanup(log_dir.stop)
+
+    def make_script(self, body, name="deploy.sh"):
+        script = self.tmp / name
+        script.write_text("#!/bin/sh\n" + body + "\n")
+        script.chmod(0o755)
+        return str(script)
+
+
+class GithubWebhookTest(DeployTestMixin, TestCase):
+    """The webhook queues a DeployJob and answers 202 without running anything."""
+
+    secret = "github-test-secret"
+
+    def setUp(self):
+        super().setUp()
+        self.script = self.make_script("exit 0")
+        env = patch.dict(
+            os.environ, {"GITHUB_WEBHOOK_SECRET": self.secret, "DEPLOY_SCRIPT_PATH": self.script}
+        )
+        env.start()
+        self.addCleanup(env.stop)
+
+    def push(self, commit="a" * 40, secret=None, event="push"):
+        body = json.dumps({"ref": "refs/heads/main", "after": commit}).encode()
+        digest = hmac.new((secret or self.secret).encode(), body, hashlib.sha256).hexdigest()
+        return self.client.post(
+            reverse("github_webhook"),
+            data=body,
+            content_type="application/json",
+            HTTP_X_HUB_SIGNATURE_256=f"sha256={digest}",
+            HTTP_X_GITHUB_EVENT=event,
+        )
+
+    def test_push_returns_202_with_job(self):
+        with patch("subprocess.Popen") as popen, patch("subprocess.run") as run:
+            response = self.push()
+        self.assertEqual(response.status_code, 202)
+        popen.assert_not_called()
+        run.assert_not_called()
+
+        data = response.json()
+        job = DeployJob.objects.get(pk=data["job_id"])
+        self.assertEqual(job.status, "pendente")
+        self.assertEqual((job.ref, job.commit), ("refs/heads/main", "a" * 40))
+        self.assertFalse(data["coalesced"])
+        self.assertEqual(data["status_url"], reverse("deploy_status", args=[job.pk]))
+
+    def test_pushes_coalesce_into_pending_job(self):
+        first = self.push("a" * 40).json()
+        second = self.push("b" * 40).json()
+        self.assertEqual(first["job_id"], second["job_id"])
+        self.assertTrue(second["coalesced"])
+        job = DeployJob.objects.get()
+        self.assertEqual((job.pushes, job.commit), (2, "b" * 40))
+
+    def test_push_during_running_deploy_queues_one_followup(self):
+        running = DeployJob.objects.create(status="executando")
+        first = self.push("c" * 40).json()
+        second = self.push("d" * 40).json()
+        self.assertNotEqual(first["job_id"], running.pk)
+        self.assertEqual(first["job_id"], second["job_id"])
+        self.assertEqual(DeployJob.objects.filter(status="pendente").count(), 1)
+
+    def test_invalid_signature_rejected(self):
+        self.assertEqual(self.push(secret="wrong").status_code, 403)
+        self.assertFalse(DeployJob.objects.exists())
+
+    def test_ping_does_not_queue_deploy(self):
+        self.assertEqual(self.push(event="ping").status_code, 200)
+        self.assertFalse(DeployJob.objects.exists())
+
+    def test_status_endpoint_requires_staff(self):
+        job = DeployJob.objects.create()
+        url = reverse("deploy_status", args=[job.pk])
+        self.assertNotEqual(self.client.get(url).status_code, 200)
+
+        staff = User.objects.create_user(
+            email="ops@example.com",
+            password="Senha@123456",
+            nome_completo="Ops",
+            is_staff=True,
+            is_active=True,
+        )
+        self.client.force_login(staff)
+        data = self.client.get(url).json()
+        self.assertEqual((data["job_id"], data["status"]), (job.pk, "pendente"))
+
+
+class DeployRunnerTest(DeployTestMixin, TestCase):
+    """Tests for core.deploys (the run_deploys worker)."""
+
+    def test_successful_deploy_streams_output_to_log(self):
+        script = self.make_script('echo "deploying $DEPLOY_COMMIT"; echo oops >&2')
+        deploys.enqueue_deploy(commit="abc123")
+        job = deploys.run_job(deploys.claim_next(), script=script)
+
+        self.assertEqual((job.status, job.exit_code), ("sucesso", 0))
+        self.assertIsNotNone(job.finished_at)
+        log = deploys.log_tail(job)
+        self.assertIn("deploying abc123", log)
+        self.assertIn("oops", log)
+
+    def test_failing_deploy_records_exit_code(self):
+        script = self.make_script("exit 3")
+        deploys.enqueue_deploy()
+        job = deploys.run_job(deploys.claim_next(), script=script)
+        self.assertEqual((job.status, job.exit_code), ("falha", 3))
+
+    def test_timeout_kills_script(self):
+        script = self.make_script("sleep 30")
+        deploys.enqueue_deploy()
+        started = time.monotonic()
+        job = deploys.run_job(deploys.claim_next(), script=script, timeout=0.5)
+        self.assertLess(time.monotonic() - started, 10)
+        self.assertEqual(job.status, "falha")
+        self.assertIn("timed out", job.erro)
+
+    def test_only_one_deploy_runs_at_a_time(self):
+        deploys.enqueue_deploy(commit="one")
+        running = deploys.claim_next()
+        deploys.enqueue_deploy(commit="two")
+        self.assertIsNone(deploys.claim_next())
+
+        running.status = "sucesso"
+        running.save()
+        self.assertEqual(deploys.claim_next().commit, "two")
+
+    def test_stale_running_job_is_reaped(self):
+        job = DeployJob.objects.create(
+            status="executando",
+            started_at=timezone.now() - timedelta(seconds=deploys.DEPLOY_TIMEOUT + 3600),
+        )
+        deploys.enqueue_deploy()
+        self.assertIsNotNone(deploys.claim_next())
+        job.refresh_from_db()
+        self.assertEqual(job.status, "falha")
+
+    def test_missing_script_fails_job(self):
+        deploys.enqueue_deploy()
+        job = deploys.run_job(deploys.claim_next(), script=str(self.tmp / "missing.sh"))
+        self.assertEqual(job.status, "falha")
+        self.assertIn("Could not start", job.erro)
+
+
+# ─────────────────────────── Query plans ────────────────────────────────────
+
+
+class QueryPlanAdvisorTest(TestCase):
+    """Tests for core.query_plans (manage.py check_query_plans)."""
+
+    def test_known_queries_use_indexes(self):
+        user = query_plans.seed(users=3, per_user=5)
+        flagged = [r for r in query_plans.check_plans(user) if not r.ok]
+        self.assertEqual(flagged, [])
+
+    def test_unindexed_query_is_flagged(self):
+        from faturas.models import Fatura
+
+        user = query_plans.seed(users=2, per_user=3)
+        (result,) = query_plans.check_plans(
+            user,
+            [("observacoes", lambda u: Fatura.objects.filter(observacoes="x").order_by("numero"))],
+        )
+        self.assertFalse(result.ok)
+
+    def test_sqlite_plan_parsing(self):
+        plan = "4 0 0 SCAN faturas_fatura\n9 0 0 USE TEMP B-TREE FOR ORDER BY"
+        self.assertEqual(
+            query_plans.sqlite_problems(plan),
+            ["full scan of faturas_fatura", "sort not served by an index"],
+        )
+        self.assertEqual(
+            query_plans.sqlite_problems(
+                "3 0 0 SEARCH faturas_fatura USING INDEX faturas_cli_status_idx (cliente_id=?)"
+            ),
+            [],
+        )
+
+    def test_postgres_plan_parsing(self):
+        plan = [
+            {
+                "Plan": {
+                    "Node Type": "Limit",
+                    "Plans": [
+                        {
+                            "Node Type": "Sort",
+                            "Plans": [
+                                {
+                                    "Node Type": "Seq Scan",
+                                    "Relation Name": "suporte_ticket",
+                                    "Filter": "(cliente_id = 1)",
+                                },
+                                {
+                                    "Node Type": "Index Scan",
+                                    "Relation Name": "faturas_fatura",
+                                    "Index Name": "faturas_created_id_idx",
+                                    "Filter": "(cliente_id = 1)",
+                                },
+                                {
+                                    "Node Type": "Index Scan",
+                                    "Relation Name": "projetos_projeto",
+                                    "Index Name": "projetos_cli_status_idx",
+                                    "Index Cond": "(cliente_id = 1)",
+                                    "Filter": "(progresso > 0)",
+                                },
+                            ],
+                        }
+                    ],
+                }
+            }
+        ]
+        self.assertEqual(
+            sorted(query_plans.postgres_problems(plan)),
+            [
+                "full index scan of faturas_fatura",
+                "full scan of suporte_ticket",
+                "sort not served by an index",
+            ],
+        )
+
+    def test_command_rolls_back_seeded_rows(self):
+        out = StringIO()
+        call_command("check_query_plans", "--users", "2", "--per-user", "3", stdout=out)
+        self.assertIn(f"✓ {len(query_plans.KNOWN_QUERIES)} queries use an index", out.getvalue())
+        self.assertFalse(User.objects.filter(email__startswith="advisor-").exists())
+
+    def test_command_fails_on_flagged_query(self):
+        from faturas.models import Fatura
+
+        queries = [("sem índice", lambda u: Fatura.objects.filter(observacoes="x"))]
+        User.objects.create_user(email="plans@example.com", password="x", nome_completo="Plans")
+        with patch.object(query_plans, "KNOWN_QUERIES", queries):
+            with self.assertRaisesMessage(CommandError, "1 of 1 queries need an index"):
+                call_command("check_query_plans", "--no-seed", stdout=StringIO())
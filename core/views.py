@@ -2,19 +2,20 @@
 
 import logging
 
-from django.conf import settings
 from django.contrib import messages
-from django.core.mail import send_mail
 from django.http import HttpResponseRedirect
 from django.urls import reverse_lazy
 from django.utils.translation import gettext_lazy as _
 from django.views.generic import CreateView, TemplateView
 
+from notificacoes.outbox import queue_email
 from pacotes.models import Pacote
 from portfolio.models import Case
 from servicos.models import Servico
 
+from .cache import get_cache_version, versioned_cache_enabled
 from .models import FAQ, Contato, Depoimento
+from .signals import HOME_CACHE_NAMESPACE
 
 logger = logging.getLogger(__name__)
 
@@ -58,14 +59,32 @@ class HoneypotMixin:
 
 
 class HomeView(TemplateView):
-    """Homepage view."""
+    """
+    Homepage view.
+
+    The page body is a per-language template fragment cached under the ``home``
+    cache version, which ``core.signals`` bumps whenever content shown here
+    changes. The querysets below are lazy, so a cache hit runs none of them.
+    The layout around the fragment (user menu, messages, CSP nonce) is still
+    rendered per request. With a process-local cache backend the fragment is
+    rendered every time (timeout 0), since other workers would miss the bump.
+    """
 
     template_name = "core/home.html"
+    cache_timeout = 60 * 60  # 1 hour; invalidation is signal-driven
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        if versioned_cache_enabled():
+            context["home_cache_version"] = get_cache_version(HOME_CACHE_NAMESPACE)
+            context["home_cache_timeout"] = self.cache_timeout
+        else:
+            context["home_cache_version"] = 0
+            context["home_cache_timeout"] = 0  # never stored
         context["servicos"] = Servico.objects.filter(ativo=True, destaque=True)[:4]
-        context["pacotes"] = Pacote.objects.filter(ativo=True).order_by("ordem")
+        context["pacotes"] = (
+            Pacote.objects.filter(ativo=True).order_by("ordem").prefetch_related("recursos")
+        )
         context["cases"] = Case.objects.filter(ativo=True, destaque=True)[:6]
         context["depoimentos"] = Depoimento.objects.filter(ativo=True, destaque=True)[:3]
         return context
@@ -103,7 +122,7 @@ class ContatoView(HoneypotMixin, CreateView):
         return response
 
     def send_notification_email(self, contato):
-        """Send email notification for new contact message."""
+        """Queue email notification for new contact message."""
         try:
             subject = f"Nova Mensagem de Contato: {contato.assunto}"
 
@@ -123,15 +142,10 @@ Mensagem:
 ECOMMDEV - www.ecommdev.com.br
             """
 
-            send_mail(
-                subject=subject,
-                message=message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=["contato@ecommdev.com.br"],
-                fail_silently=True,
-            )
+            # Delivered by the send_queued_emails worker, off the request thread
+            queue_email("contato@ecommdev.com.br", subject, message, tipo="contato_novo")
         except Exception as e:
-            logger.error("Error sending contact notification email: %s", e)
+            logger.error("Error queueing contact notification email: %s", e)
 
     def form_invalid(self, form):
         messages.error(self.request, _("Por favor, corrija os erros abaixo."))
@@ -4,14 +4,20 @@ GitHub Webhook for automatic deployment
 
 import hashlib
 import hmac
+import json
 import logging
 import os
-import subprocess
 
 from decouple import config
-from django.http import HttpResponse, HttpResponseForbidden
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import require_GET, require_POST
+
+from .deploys import deploy_script, enqueue_deploy, log_tail
+from .models import DeployJob
 
 logger = logging.getLogger(__name__)
 
@@ -19,7 +25,12 @@ logger = logging.getLogger(__name__)
 @csrf_exempt
 @require_POST
 def github_webhook(request):
-    """Handle GitHub webhook for auto-deployment with HMAC signature verification."""
+    """
+    Handle GitHub webhook for auto-deployment with HMAC signature verification.
+
+    Verified pushes are queued as a ``DeployJob`` and answered with 202 and the
+    job id; ``manage.py run_deploys`` runs the script outside the web workers.
+    """
 
     # 1. Read secret from environment via decouple
     secret = config("GITHUB_WEBHOOK_SECRET", default=None)
@@ -55,33 +66,65 @@ def github_webhook(request):
         )
         return HttpResponseForbidden("Invalid signature")
 
-    # 5. Signature verified — proceed with deployment
-    deploy_script = config("DEPLOY_SCRIPT_PATH", default="./deploy.sh")
+    # 5. Signature verified — check the script before queueing a deploy
+    script = deploy_script()
 
     # SECURITY (2.5): Validate script path before executing to prevent
     # running against a missing or non-executable file.
-    if not os.path.isfile(deploy_script):
-        logger.error("Deploy script not found: %s", deploy_script)
+    if not os.path.isfile(script):
+        logger.error("Deploy script not found: %s", script)
         return HttpResponse("Deploy script not found", status=500)
-    if not os.access(deploy_script, os.X_OK):
-        logger.error("Deploy script is not executable: %s", deploy_script)
+    if not os.access(script, os.X_OK):
+        logger.error("Deploy script is not executable: %s", script)
         return HttpResponse("Deploy script not executable", status=500)
 
+    if request.headers.get("X-GitHub-Event") == "ping":
+        return HttpResponse("pong", status=200)
+
+    # 6. Queue the deploy; run_deploys executes it outside the web workers
+    payload = _parse_payload(request)
+    job, coalesced = enqueue_deploy(
+        ref=str(payload.get("ref") or "")[:255], commit=str(payload.get("after") or "")[:64]
+    )
+    logger.info("Deploy #%s queued (coalesced=%s, commit=%s)", job.pk, coalesced, job.commit)
+    return JsonResponse(
+        {
+            "job_id": job.pk,
+            "status": job.status,
+            "coalesced": coalesced,
+            "status_url": reverse("deploy_status", args=[job.pk]),
+        },
+        status=202,
+    )
+
+
+def _parse_payload(request):
+    """GitHub sends JSON, or form-encoded with the JSON in ``payload``."""
+    body = request.POST.get("payload")
     try:
-        result = subprocess.run(
-            [deploy_script],
-            capture_output=True,
-            text=True,
-            timeout=120,
-        )
-        logger.info("Deploy completed. stdout: %s", result.stdout)
-        if result.returncode != 0:
-            logger.error("Deploy script error. stderr: %s", result.stderr)
-            return HttpResponse("Deploy error", status=500)
-        return HttpResponse("OK", status=200)
-    except subprocess.TimeoutExpired:
-        logger.error("Deploy script timed out after 120s")
-        return HttpResponse("Deploy timed out", status=500)
-    except Exception as exc:
-        logger.error("Deploy failed: %s", str(exc))
-        return HttpResponse("Error", status=500)
+        payload = json.loads(body if body is not None else request.body)
+    except (ValueError, UnicodeDecodeError):
+        return {}
+    return payload if isinstance(payload, dict) else {}
+
+
+@staff_member_required
+@require_GET
+def deploy_status(request, job_id):
+    """Status and log tail of a deploy job."""
+    job = get_object_or_404(DeployJob, pk=job_id)
+    return JsonResponse(
+        {
+            "job_id": job.pk,
+            "status": job.status,
+            "ref": job.ref,
+            "commit": job.commit,
+            "pushes": job.pushes,
+            "exit_code": job.exit_code,
+            "error": job.erro,
+            "created_at": job.created_at,
+            "started_at": job.started_at,
+            "finished_at": job.finished_at,
+            "log": log_tail(job),
+        }
+    )
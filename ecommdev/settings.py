@@ -145,6 +145,7 @@ TEMPLATES = [
                 "django.contrib.messages.context_processors.messages",
                 "django.template.context_processors.i18n",
                 "core.context_processors.site_settings",
+                "notificacoes.context_processors.nao_lidos",
                 "core.seo.seo_context",  # SEO meta tags for all pages
             ],
             # Template caching: use cached.Loader in production for major speedup
@@ -246,6 +247,13 @@ else:
     }
     # Fall back to DB-backed sessions without Redis
     SESSION_ENGINE = "django.contrib.sessions.backends.db"
+    # LocMem is per process, so a cache version bump (core.cache) never reaches the
+    # other workers: versioned caches are bypassed unless one process serves
+    # everything (runserver). Redis is required to cache them under gunicorn.
+    VERSIONED_CACHE_ALLOW_LOCAL = config("VERSIONED_CACHE_ALLOW_LOCAL", default=DEBUG, cast=bool)
+
+# Live events (SSE under ASGI): Redis pub/sub shares events between processes
+LIVE_EVENTS_REDIS_URL = config("LIVE_EVENTS_REDIS_URL", default=REDIS_URL)
 
 # =============================================================================
 # PASSWORD VALIDATION
@@ -295,6 +303,12 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Rendered invoice PDFs (faturas.pdf). Private: never under MEDIA_ROOT.
+FATURA_PDF_DIR = BASE_DIR / "private" / "faturas"
+# When set (e.g. "/protected/faturas/"), cached PDFs are handed to nginx with
+# X-Accel-Redirect instead of being read by the app server.
+FATURA_PDF_ACCEL_PREFIX = config("FATURA_PDF_ACCEL_PREFIX", default="")
+
 # =============================================================================
 # DEFAULT PRIMARY KEY
 # =============================================================================
@@ -476,7 +490,11 @@ if not DEBUG:
 
     # Session expiration (2 hours of inactivity)
     SESSION_COOKIE_AGE = 7200
-    SESSION_SAVE_EVERY_REQUEST = True  # Reset expiry on each request
+    # Session write elision: SessionSecurityMiddleware saves the session only when
+    # it changed or has less than SESSION_REFRESH_WINDOW seconds left, instead of
+    # writing it on every request
+    SESSION_SAVE_EVERY_REQUEST = False
+    SESSION_REFRESH_WINDOW = 3600  # 1 hour (idle timeout between 1h and 2h)
     SESSION_EXPIRE_AT_BROWSER_CLOSE = False
 
     # Session rotation interval (seconds) - used by SessionSecurityMiddleware
@@ -14,7 +14,7 @@ from django.views.generic import TemplateView
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
 from core.sitemaps import sitemaps
-from core.webhook import github_webhook
+from core.webhook import deploy_status, github_webhook
 from faturas.views import MercadoPagoWebhookView
 
 
@@ -61,6 +61,7 @@ urlpatterns = [
     path("sitemap.xml", sitemap, {"sitemaps": sitemaps}, name="sitemap"),
     # Webhooks (outside i18n prefix)
     path("webhook/github/", github_webhook, name="github_webhook"),
+    path("webhook/github/jobs/<int:job_id>/", deploy_status, name="deploy_status"),
     path("webhook/mercadopago/", MercadoPagoWebhookView.as_view(), name="webhook_mp_global"),
     # Admin logout (custom view for GET support)
     path("gerenciar-ecd/logout/", AdminLogoutView.as_view(), name="admin_logout"),
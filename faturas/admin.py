@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.utils.html import format_html
 
-from .models import Fatura, ItemFatura, Pagamento
+from .models import Assinatura, EventoWebhook, Fatura, ItemFatura, Pagamento, recalcular_totais
 
 
 class ItemFaturaInline(admin.TabularInline):
@@ -31,10 +31,19 @@ class FaturaAdmin(admin.ModelAdmin):
     ]
     list_filter = ["status", "data_vencimento", "data_emissao"]
     search_fields = ["numero", "cliente__email", "cliente__nome_completo", "descricao"]
-    readonly_fields = ["numero", "valor_total", "data_emissao", "created_at", "updated_at"]
+    # subtotal/valor_total follow the items (ItemFatura deltas, "Recalcular totais")
+    readonly_fields = [
+        "numero",
+        "subtotal",
+        "valor_total",
+        "data_emissao",
+        "created_at",
+        "updated_at",
+    ]
     ordering = ["-created_at"]
     date_hierarchy = "data_emissao"
     inlines = [ItemFaturaInline, PagamentoInline]
+    actions = ["recalcular_totais_action"]
 
     fieldsets = (
         ("Identificacao", {"fields": ("numero", "status", "cliente", "projeto")}),
@@ -68,6 +77,11 @@ class FaturaAdmin(admin.ModelAdmin):
 
     status_badge.short_description = "Status"
 
+    @admin.action(description="Recalcular totais a partir dos itens")
+    def recalcular_totais_action(self, request, queryset):
+        updated = recalcular_totais(queryset)
+        self.message_user(request, f"{updated} fatura(s) recalculada(s).")
+
 
 @admin.register(ItemFatura)
 class ItemFaturaAdmin(admin.ModelAdmin):
@@ -110,3 +124,38 @@ class PagamentoAdmin(admin.ModelAdmin):
         return format_html('<span class="badge bg-{}">{}</span>', color, obj.get_status_display())
 
     status_badge.short_description = "Status"
+
+
+@admin.register(Assinatura)
+class AssinaturaAdmin(admin.ModelAdmin):
+    list_display = [
+        "cliente",
+        "nome",
+        "projeto",
+        "preco_mensal",
+        "dia_vencimento",
+        "ativa",
+        "ultimo_ciclo",
+    ]
+    list_filter = ["ativa", "ultimo_ciclo"]
+    search_fields = ["cliente__email", "cliente__nome_completo", "descricao"]
+    list_select_related = ["cliente", "projeto", "servico", "adicional"]
+    readonly_fields = ["ultimo_ciclo", "created_at", "updated_at"]
+    ordering = ["cliente", "id"]
+
+
+@admin.register(EventoWebhook)
+class EventoWebhookAdmin(admin.ModelAdmin):
+    list_display = ["transacao_id", "acao", "status", "tentativas", "created_at", "processado_at"]
+    list_filter = ["status", "acao", "created_at"]
+    search_fields = ["transacao_id"]
+    readonly_fields = [
+        "transacao_id",
+        "acao",
+        "payload",
+        "tentativas",
+        "erro",
+        "processado_at",
+        "created_at",
+    ]
+    ordering = ["-created_at"]
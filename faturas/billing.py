@@ -0,0 +1,165 @@
+"""
+Monthly billing run for ``Assinatura`` (recurring charges).
+
+- Clients with subscriptions due in the cycle are processed in chunks; each
+  chunk is one transaction, and its subscriptions are locked so two runs can
+  never bill the same cycle twice.
+- Subscriptions are grouped into one Fatura per (cliente, projeto). Totals are
+  computed in Python while grouping, so no per-invoice item sum is needed.
+- Invoice numbers for a whole chunk are reserved with a single
+  ``allocate_numeros`` call; Faturas and ItemFaturas are inserted with
+  ``bulk_create`` and the cycle is recorded with one UPDATE.
+"""
+
+import calendar
+import logging
+import time
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+from itertools import groupby, islice
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core.sequences import allocate_numeros
+
+from .models import Assinatura, Fatura, ItemFatura
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BillingResult:
+    faturas: int = 0
+    itens: int = 0
+    skipped: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def rows(self):
+        return self.faturas + self.itens
+
+    @property
+    def rate(self):
+        """Rows inserted per second."""
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+
+def month_start(value):
+    return value.replace(day=1)
+
+
+def month_end(periodo):
+    return periodo.replace(day=calendar.monthrange(periodo.year, periodo.month)[1])
+
+
+def due_subscriptions(periodo):
+    """Active subscriptions covering ``periodo`` that have not been billed for it."""
+    return Assinatura.objects.filter(
+        Q(data_fim__isnull=True) | Q(data_fim__gte=periodo),
+        Q(ultimo_ciclo__isnull=True) | Q(ultimo_ciclo__lt=periodo),
+        ativa=True,
+        data_inicio__lte=month_end(periodo),
+    )
+
+
+def vencimento(periodo, dia):
+    """``dia`` of the cycle's month, clamped to its last day."""
+    return periodo.replace(day=min(dia, month_end(periodo).day))
+
+
+def run_billing(periodo=None, chunk_size=500, progress=None):
+    """
+    Bill every subscription due in the month of ``periodo`` (default: this month).
+
+    ``chunk_size`` is the number of clients per transaction. ``progress`` is
+    called with the running ``BillingResult`` after each chunk.
+    """
+    periodo = month_start(periodo or timezone.localdate())
+    result = BillingResult()
+    start = time.perf_counter()
+    clientes = iter(
+        due_subscriptions(periodo)
+        .order_by("cliente_id")
+        .values_list("cliente_id", flat=True)
+        .distinct()
+    )
+    while chunk := list(islice(clientes, chunk_size)):
+        with transaction.atomic():
+            _bill_chunk(periodo, chunk, result)
+        result.elapsed = time.perf_counter() - start
+        if progress:
+            progress(result)
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def _bill_chunk(periodo, clientes, result):
+    assinaturas = (
+        due_subscriptions(periodo)
+        .filter(cliente_id__in=clientes)
+        .select_related("servico", "adicional")
+        .select_for_update(of=("self",))
+        .order_by("cliente_id", "projeto_id", "id")
+    )
+    label = f"{periodo:%m/%Y}"
+    groups = []
+    for (cliente_id, projeto_id), subs in groupby(
+        assinaturas, key=lambda a: (a.cliente_id, a.projeto_id)
+    ):
+        lines = []
+        for assinatura in subs:
+            preco = assinatura.preco_mensal
+            if preco is None:
+                logger.warning("Assinatura %s has no price; not billed", assinatura.pk)
+                result.skipped += 1
+                continue
+            lines.append((assinatura, preco))
+        if lines:
+            groups.append((cliente_id, projeto_id, lines))
+    if not groups:
+        return
+
+    numeros = allocate_numeros(Fatura, "INV", len(groups))
+    faturas, itens, billed = [], [], []
+    for numero, (cliente_id, projeto_id, lines) in zip(numeros, groups, strict=True):
+        fatura = Fatura(
+            numero=numero,
+            cliente_id=cliente_id,
+            projeto_id=projeto_id,
+            descricao=f"Mensalidade {label}",
+            data_vencimento=vencimento(periodo, min(a.dia_vencimento for a, _ in lines)),
+            status="pendente",
+        )
+        subtotal = Decimal("0.00")
+        for assinatura, preco in lines:
+            item_subtotal = assinatura.quantidade * preco
+            subtotal += item_subtotal
+            itens.append(
+                ItemFatura(
+                    fatura=fatura,
+                    descricao=f"{assinatura.nome} ({label})"[:255],
+                    quantidade=assinatura.quantidade,
+                    valor_unitario=preco,
+                    subtotal=item_subtotal,
+                )
+            )
+            billed.append(assinatura.pk)
+        fatura.subtotal = fatura.valor_total = subtotal
+        faturas.append(fatura)
+
+    # Returns the new pks, which the unsaved ItemFatura.fatura references pick up
+    Fatura.objects.bulk_create(faturas)
+    ItemFatura.objects.bulk_create(itens, batch_size=1000)
+    Assinatura.objects.filter(pk__in=billed).update(ultimo_ciclo=periodo, updated_at=timezone.now())
+
+    result.faturas += len(faturas)
+    result.itens += len(itens)
+
+
+def parse_periodo(value):
+    """``"2026-03"`` -> ``date(2026, 3, 1)``."""
+    year, month = map(int, value.split("-"))
+    return date(year, month, 1)
@@ -0,0 +1,49 @@
+"""
+Management command to move overdue ``pendente`` Faturas to ``vencida``.
+
+Meant to run once a day (cron / systemd timer), shortly after midnight:
+
+Usage:
+    python manage.py mark_overdue_faturas                     # due before today
+    python manage.py mark_overdue_faturas --date 2026-03-10   # due before a given day
+"""
+
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from faturas.overdue import sweep_overdue
+
+
+class Command(BaseCommand):
+    help = "Mark overdue invoices as vencida in bulk and queue the overdue notices"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", help="Treat this day as today, YYYY-MM-DD (default: today)")
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Faturas per transaction (default: 500)",
+        )
+
+    def handle(self, *args, **options):
+        today = None
+        if options["date"]:
+            try:
+                today = date.fromisoformat(options["date"])
+            except ValueError as exc:
+                raise CommandError("--date must look like YYYY-MM-DD") from exc
+
+        self.stdout.write(self.style.MIGRATE_HEADING("=== Overdue sweep ==="))
+        result = sweep_overdue(today, options["chunk_size"], progress=self._progress)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✓ {result.faturas} faturas vencidas, {result.notificacoes} notificações, "
+                f"{result.emails} emails queued in {result.elapsed:.1f}s "
+                f"({result.rate:,.0f} faturas/s)"
+            )
+        )
+
+    def _progress(self, result):
+        self.stdout.write(f"  {result.faturas:>8,} faturas  {result.rate:>10,.0f} faturas/s")
@@ -0,0 +1,69 @@
+"""
+Management command to apply stored Mercado Pago notifications (``EventoWebhook``).
+
+Usage:
+    python manage.py process_payment_events            # drain what is due, then exit
+    python manage.py process_payment_events --loop     # keep polling (worker process)
+"""
+
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from faturas.webhooks import process_batch
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Apply pending Mercado Pago webhook events to Pagamento/Fatura in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Events claimed per batch (default: 100)",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running, polling for new events",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=2.0,
+            help="Seconds to sleep when the queue is empty (with --loop, default: 2)",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        total_done = total_failed = 0
+        try:
+            while True:
+                try:
+                    done, failed = process_batch(batch_size)
+                except Exception:
+                    if not options["loop"]:
+                        raise
+                    # Keep the worker alive through DB hiccups; retry after a pause
+                    logger.exception("Payment event batch failed")
+                    close_old_connections()
+                    time.sleep(options["interval"])
+                    continue
+                total_done += done
+                total_failed += failed
+                if done or failed:
+                    self.stdout.write(f"  batch: {done} processed, {failed} failed")
+                if done + failed < batch_size:
+                    # Queue drained (or only backing-off events left)
+                    if not options["loop"]:
+                        break
+                    time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f"✓ {total_done} processed, {total_failed} failed"))
@@ -0,0 +1,63 @@
+"""
+Management command to pre-render invoice PDFs into the cache (``faturas.pdf``).
+
+Usage:
+    python manage.py render_fatura_pdfs                   # every fatura not cached yet
+    python manage.py render_fatura_pdfs --month 2026-03   # faturas issued in a month
+    python manage.py render_fatura_pdfs --status pendente --status vencida --force
+"""
+
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from faturas import pdf
+from faturas.models import Fatura
+
+
+class Command(BaseCommand):
+    help = "Render invoice PDFs ahead of time (e.g. at month end) so downloads hit the cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--month", help="Only faturas issued in this month (YYYY-MM)")
+        parser.add_argument(
+            "--status",
+            action="append",
+            choices=[value for value, _label in Fatura.STATUS_CHOICES],
+            help="Only faturas with this status (repeatable)",
+        )
+        parser.add_argument(
+            "--force", action="store_true", help="Re-render even if a cached PDF exists"
+        )
+
+    def handle(self, *args, **options):
+        faturas = Fatura.objects.select_related("cliente").prefetch_related("itens", "pagamentos")
+        if options["month"]:
+            try:
+                year, month = map(int, options["month"].split("-"))
+                start = date(year, month, 1)
+            except ValueError as exc:
+                raise CommandError("--month must look like YYYY-MM") from exc
+            end = date(year + month // 12, month % 12 + 1, 1)
+            faturas = faturas.filter(data_emissao__gte=start, data_emissao__lt=end)
+        if options["status"]:
+            faturas = faturas.filter(status__in=options["status"])
+
+        rendered = skipped = 0
+        started = time.perf_counter()
+        for fatura in faturas.order_by("id").iterator(chunk_size=200):
+            if not options["force"] and pdf.cache_path(fatura).exists():
+                skipped += 1
+                continue
+            pdf.render_to_cache(fatura, force=True)
+            rendered += 1
+        elapsed = time.perf_counter() - started
+
+        rate = rendered / elapsed if elapsed else 0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✓ {rendered} rendered, {skipped} already cached "
+                f"in {elapsed:.1f}s ({rate:.0f} PDFs/s)"
+            )
+        )
@@ -0,0 +1,48 @@
+"""
+Management command to run the monthly billing cycle for ``Assinatura`` rows.
+
+Usage:
+    python manage.py run_billing                    # bill the current month
+    python manage.py run_billing --periodo 2026-03  # bill a given month
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from faturas.billing import parse_periodo, run_billing
+
+
+class Command(BaseCommand):
+    help = "Create the month's recurring invoices in bulk (reports rows/sec)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--periodo", help="Month to bill, YYYY-MM (default: current month)")
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Clients per transaction (default: 500)",
+        )
+
+    def handle(self, *args, **options):
+        periodo = None
+        if options["periodo"]:
+            try:
+                periodo = parse_periodo(options["periodo"])
+            except ValueError as exc:
+                raise CommandError("--periodo must look like YYYY-MM") from exc
+
+        self.stdout.write(self.style.MIGRATE_HEADING("=== Billing run ==="))
+        result = run_billing(periodo, options["chunk_size"], progress=self._progress)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✓ {result.faturas} faturas, {result.itens} itens in {result.elapsed:.1f}s "
+                f"({result.rate:,.0f} rows/s)"
+            )
+        )
+        if result.skipped:
+            self.stdout.write(
+                self.style.WARNING(f"  {result.skipped} assinaturas skipped (no price)")
+            )
+
+    def _progress(self, result):
+        self.stdout.write(f"  {result.faturas:>8,} faturas  {result.rate:>10,.0f} rows/s")
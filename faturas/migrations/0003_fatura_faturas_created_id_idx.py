@@ -0,0 +1,16 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("faturas", "0002_alter_fatura_cliente_alter_pagamento_fatura"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="fatura",
+            index=models.Index(fields=["-created_at", "-id"], name="faturas_created_id_idx"),
+        ),
+    ]
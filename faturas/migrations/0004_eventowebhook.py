@@ -0,0 +1,67 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("faturas", "0003_fatura_faturas_created_id_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EventoWebhook",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("transacao_id", models.CharField(max_length=100, verbose_name="ID da Transação")),
+                ("acao", models.CharField(max_length=50, verbose_name="Ação")),
+                ("payload", models.JSONField(blank=True, default=dict, verbose_name="Payload")),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pendente", "Pendente"),
+                            ("processado", "Processado"),
+                            ("ignorado", "Ignorado"),
+                            ("falha", "Falha"),
+                        ],
+                        default="pendente",
+                        max_length=20,
+                        verbose_name="Status",
+                    ),
+                ),
+                ("tentativas", models.PositiveIntegerField(default=0, verbose_name="Tentativas")),
+                ("erro", models.TextField(blank=True, verbose_name="Erro")),
+                (
+                    "proxima_tentativa",
+                    models.DateTimeField(blank=True, null=True, verbose_name="Próxima Tentativa"),
+                ),
+                (
+                    "processado_at",
+                    models.DateTimeField(blank=True, null=True, verbose_name="Processado em"),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True, verbose_name="Recebido em")),
+            ],
+            options={
+                "verbose_name": "Evento de Webhook",
+                "verbose_name_plural": "Eventos de Webhook",
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["status", "proxima_tentativa"], name="faturas_evento_fila_idx"
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="eventowebhook",
+            constraint=models.UniqueConstraint(
+                fields=("transacao_id", "acao"), name="faturas_evento_transacao_acao"
+            ),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:14
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("faturas", "0004_eventowebhook"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="itemfatura",
+            options={
+                "ordering": ["id"],
+                "verbose_name": "Item da Fatura",
+                "verbose_name_plural": "Itens da Fatura",
+            },
+        ),
+    ]
@@ -0,0 +1,128 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:17
+
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("pacotes", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("projetos", "0004_projeto_projetos_created_id_idx"),
+        ("servicos", "0003_alter_servico_imagem"),
+        ("faturas", "0005_itemfatura_ordering"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Assinatura",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                (
+                    "descricao",
+                    models.CharField(
+                        blank=True,
+                        help_text="Texto do item na fatura. Vazio: nome do serviço/adicional.",
+                        max_length=255,
+                        verbose_name="Descrição",
+                    ),
+                ),
+                (
+                    "valor",
+                    models.DecimalField(
+                        blank=True,
+                        decimal_places=2,
+                        help_text="Vazio: preço atual do serviço/adicional.",
+                        max_digits=10,
+                        null=True,
+                        verbose_name="Valor Mensal",
+                    ),
+                ),
+                ("quantidade", models.PositiveIntegerField(default=1, verbose_name="Quantidade")),
+                (
+                    "dia_vencimento",
+                    models.PositiveSmallIntegerField(
+                        default=10,
+                        validators=[
+                            django.core.validators.MinValueValidator(1),
+                            django.core.validators.MaxValueValidator(31),
+                        ],
+                        verbose_name="Dia de Vencimento",
+                    ),
+                ),
+                ("data_inicio", models.DateField(verbose_name="Início")),
+                ("data_fim", models.DateField(blank=True, null=True, verbose_name="Fim")),
+                ("ativa", models.BooleanField(default=True, verbose_name="Ativa")),
+                (
+                    "ultimo_ciclo",
+                    models.DateField(
+                        blank=True,
+                        help_text="Primeiro dia do último mês faturado.",
+                        null=True,
+                        verbose_name="Último Ciclo Faturado",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True, verbose_name="Criado em")),
+                ("updated_at", models.DateTimeField(auto_now=True, verbose_name="Atualizado em")),
+                (
+                    "adicional",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="assinaturas",
+                        to="pacotes.adicional",
+                        verbose_name="Adicional",
+                    ),
+                ),
+                (
+                    "cliente",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="assinaturas",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Cliente",
+                    ),
+                ),
+                (
+                    "projeto",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="assinaturas",
+                        to="projetos.projeto",
+                        verbose_name="Projeto",
+                    ),
+                ),
+                (
+                    "servico",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="assinaturas",
+                        to="servicos.servico",
+                        verbose_name="Serviço",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Assinatura",
+                "verbose_name_plural": "Assinaturas",
+                "ordering": ["cliente", "id"],
+                "indexes": [
+                    models.Index(
+                        fields=["ativa", "ultimo_ciclo"], name="faturas_assinatura_ciclo_idx"
+                    )
+                ],
+            },
+        ),
+    ]
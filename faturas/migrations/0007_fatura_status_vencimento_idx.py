@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("faturas", "0006_assinatura"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="fatura",
+            index=models.Index(
+                fields=["status", "data_vencimento"], name="faturas_status_venc_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("faturas", "0007_fatura_status_vencimento_idx"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="fatura",
+            index=models.Index(
+                fields=["cliente", "-created_at", "-id"], name="faturas_cli_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="fatura",
+            index=models.Index(
+                fields=["cliente", "status", "-created_at"], name="faturas_cli_status_idx"
+            ),
+        ),
+    ]
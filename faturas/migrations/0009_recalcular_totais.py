@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-17 12:00
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def recalcular_totais(apps, schema_editor):
+    # Totals now follow the items through deltas: start every fatura with items from
+    # the sum of its items. Faturas without items keep their hand-entered values.
+    Fatura = apps.get_model("faturas", "Fatura")
+    ItemFatura = apps.get_model("faturas", "ItemFatura")
+    item_total = Coalesce(
+        Subquery(
+            ItemFatura.objects.filter(fatura=OuterRef("pk"))
+            .order_by()
+            .values("fatura")
+            .annotate(total=Sum("subtotal"))
+            .values("total")
+        ),
+        Decimal("0.00"),
+        output_field=models.DecimalField(max_digits=10, decimal_places=2),
+    )
+    Fatura.objects.filter(pk__in=ItemFatura.objects.values("fatura")).update(
+        subtotal=item_total,
+        valor_total=item_total - F("desconto") + F("impostos"),
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("faturas", "0008_owner_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(recalcular_totais, migrations.RunPython.noop),
+    ]
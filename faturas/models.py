@@ -6,11 +6,19 @@ from decimal import Decimal
 
 from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.core.validators import MaxValueValidator, MinValueValidator
+from django.db import connections, models, transaction
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+from core.state_machine import StateMachineMixin
 
-class Fatura(models.Model):
+_MONEY = DecimalField(max_digits=10, decimal_places=2)
+
+
+class Fatura(StateMachineMixin, models.Model):
     """Invoice."""
 
     STATUS_CHOICES = [
@@ -75,6 +83,17 @@ class Fatura(models.Model):
         verbose_name = _("Fatura")
         verbose_name_plural = _("Faturas")
         ordering = ["-created_at"]
+        indexes = [
+            # Keyset pagination (api.pagination.KeysetCursorPagination)
+            models.Index(fields=["-created_at", "-id"], name="faturas_created_id_idx"),
+            # Client area: own invoices, newest first / filtered by status
+            models.Index(fields=["cliente", "-created_at", "-id"], name="faturas_cli_created_idx"),
+            models.Index(
+                fields=["cliente", "status", "-created_at"], name="faturas_cli_status_idx"
+            ),
+            # Overdue sweep (faturas.overdue.overdue_faturas)
+            models.Index(fields=["status", "data_vencimento"], name="faturas_status_venc_idx"),
+        ]
 
     # Valid status transitions: current_status -> set of allowed next statuses
     VALID_TRANSITIONS = {
@@ -86,32 +105,6 @@ class Fatura(models.Model):
         "reembolsada": set(),
     }
 
-    def clean(self):
-        """Enforce valid state-machine transitions on Fatura status."""
-        super().clean()
-        if not self.pk:
-            # New instance — allow any initial status (defaults to 'pendente')
-            return
-        try:
-            original = Fatura.objects.get(pk=self.pk)
-        except Fatura.DoesNotExist:
-            return
-        if original.status == self.status:
-            return  # No change — always valid
-        allowed = self.VALID_TRANSITIONS.get(original.status, set())
-        if self.status not in allowed:
-            raise ValidationError(
-                _(
-                    'Transição de status inválida: "%(from)s" → "%(to)s". '
-                    "Transições permitidas: %(allowed)s"
-                ),
-                params={
-                    "from": original.status,
-                    "to": self.status,
-                    "allowed": ", ".join(sorted(allowed)) if allowed else _("nenhuma"),
-                },
-            )
-
     @property
     def status_color(self):
         colors = {
@@ -127,31 +120,171 @@ class Fatura(models.Model):
     def __str__(self):
         return f"{self.numero} - R$ {self.valor_total:,.2f}"
 
+    # Kept up to date in the database by ItemFatura (F() deltas, recalcular_totais)
+    TOTAL_FIELDS = {"subtotal", "valor_total"}
+    # Fields whose last stored value is remembered (see _remember_valores)
+    TRACKED_FIELDS = ("subtotal", "desconto", "impostos", "valor_total")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_valores()
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        self._remember_valores(self.TRACKED_FIELDS if fields is None else fields)
+
+    def _remember_valores(self, fields=TRACKED_FIELDS):
+        # Values as stored in the database; deferred fields stay unknown
+        loaded = self.__dict__.setdefault("_loaded_valores", {})
+        for name in set(fields) & set(self.TRACKED_FIELDS):
+            if name in self.__dict__:
+                loaded[name] = self.__dict__[name]
+
+    def _changed(self, *fields):
+        loaded = self.__dict__.get("_loaded_valores", {})
+        return [
+            name for name in fields if loaded.get(name, getattr(self, name)) != getattr(self, name)
+        ]
+
     def save(self, *args, **kwargs):
-        if not self.numero:
-            from datetime import datetime
-
-            from django.db.models import Max
-
-            year = datetime.now().year
-            prefix = f"INV-{year}-"
-            last = Fatura.objects.filter(numero__startswith=prefix).aggregate(
-                max_num=Max("numero")
-            )["max_num"]
-            if last:
-                count = int(last.split("-")[-1]) + 1
-            else:
-                count = 1
-            self.numero = f"{prefix}{count:04d}"
-        # Calculate total
-        self.valor_total = self.subtotal - self.desconto + self.impostos
+        """
+        Save; on updates ``subtotal``/``valor_total`` are only written when named in
+        ``update_fields``, so a stale copy never overwrites the item deltas. A full
+        save of a changed total raises ``ValueError`` instead of dropping it.
+        """
+        if self.numero:
+            return self._save_totais(*args, **kwargs)
+        from core.sequences import allocate_numero
+
+        # One transaction, so a failed INSERT also rolls the counter back (no gaps)
+        try:
+            with transaction.atomic():
+                self.numero = allocate_numero(Fatura, "INV")
+                self._save_totais(*args, **kwargs)
+        except BaseException:
+            self.numero = ""
+            raise
+
+    def _save_totais(self, *args, **kwargs):
+        if self._state.adding or kwargs.get("force_insert"):
+            self.valor_total = self.subtotal - self.desconto + self.impostos
+            super().save(*args, **kwargs)
+            self._remember_valores()
+            return
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None:
+            if changed := self._changed(*self.TOTAL_FIELDS):
+                raise ValueError(
+                    f"Fatura {self.numero}: {', '.join(sorted(changed))} follow the items; "
+                    "use calcular_total() or save(update_fields=[...]) to set them"
+                )
+            deferred = self.get_deferred_fields()
+            update_fields = [
+                f.name
+                for f in self._meta.concrete_fields
+                if not f.primary_key
+                and f.attname not in deferred
+                and f.name not in self.TOTAL_FIELDS
+            ]
+        update_fields = set(update_fields)
+        refresh = False
+        if update_fields & self.TOTAL_FIELDS:
+            # Set explicitly by the caller
+            self.valor_total = self.subtotal - self.desconto + self.impostos
+            update_fields.add("valor_total")
+        elif update_fields & {"desconto", "impostos"} and self._changed("desconto", "impostos"):
+            self.valor_total = F("subtotal") - self.desconto + self.impostos
+            update_fields.add("valor_total")
+            refresh = True
+        kwargs["update_fields"] = update_fields
         super().save(*args, **kwargs)
+        if refresh:
+            self.refresh_from_db(fields=["subtotal", "valor_total"])
+        self._remember_valores(update_fields)
+
+    @classmethod
+    def touch(cls, *pks):
+        """Bump ``updated_at`` so cached renderings (``faturas.pdf``) are refreshed."""
+        cls.objects.filter(pk__in=pks).update(updated_at=timezone.now())
+
+    @classmethod
+    def ajustar_total(cls, pk, delta):
+        """Add ``delta`` to subtotal and valor_total in the database (no read, no full save)."""
+        cls.objects.filter(pk=pk).update(
+            subtotal=F("subtotal") + delta,
+            valor_total=F("valor_total") + delta,
+            updated_at=timezone.now(),
+        )
 
     def calcular_total(self):
-        """Recalculate from items."""
-        self.subtotal = sum(item.subtotal for item in self.itens.all())
-        self.valor_total = self.subtotal - self.desconto + self.impostos
-        self.save()
+        """Recalculate subtotal and valor_total from the items, inside the database."""
+        recalcular_totais(Fatura.objects.filter(pk=self.pk))
+        self.refresh_from_db(fields=["subtotal", "valor_total", "updated_at"])
+
+
+def recalcular_totais(queryset):
+    """
+    Recompute subtotal/valor_total of every Fatura in ``queryset`` from its items.
+
+    One ``UPDATE ... FROM (SELECT id, SUM(subtotal) ... GROUP BY id)`` for the whole
+    queryset; use it after writes that bypass ``ItemFatura.save`` (``bulk_create``,
+    queryset ``update``/``delete``). Returns the number of rows updated.
+    """
+    totals = (
+        Fatura.objects.filter(pk__in=queryset.order_by().values("pk"))
+        .order_by()
+        .annotate(total=Coalesce(Sum("itens__subtotal"), Decimal("0.00"), output_field=_MONEY))
+        .values("pk", "total")
+    )
+    connection = connections[queryset.db]
+    now = timezone.now()
+    if connection.vendor == "sqlite" and connection.Database.sqlite_version_info < (3, 33):
+        # No UPDATE ... FROM before SQLite 3.33: fall back to a correlated subquery
+        item_total = Coalesce(
+            Subquery(
+                ItemFatura.objects.filter(fatura=OuterRef("pk"))
+                .order_by()
+                .values("fatura")
+                .annotate(total=Sum("subtotal"))
+                .values("total")
+            ),
+            Decimal("0.00"),
+            output_field=_MONEY,
+        )
+        return Fatura.objects.filter(pk__in=totals.values("pk")).update(
+            subtotal=item_total,
+            valor_total=item_total - F("desconto") + F("impostos"),
+            updated_at=now,
+        )
+
+    inner, params = totals.query.sql_with_params()
+    qn = connection.ops.quote_name
+    table = qn(Fatura._meta.db_table)
+    sql = (
+        f"UPDATE {table} SET {qn('subtotal')} = totais.{qn('total')}, "
+        f"{qn('valor_total')} = totais.{qn('total')} - {table}.{qn('desconto')}"
+        f" + {table}.{qn('impostos')}, {qn('updated_at')} = %s "
+        f"FROM ({inner}) AS totais WHERE {table}.{qn('id')} = totais.{qn('id')}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [connection.ops.adapt_datetimefield_value(now), *params])
+        return cursor.rowcount
+
+
+class ItemFaturaQuerySet(models.QuerySet):
+    def delete(self):
+        """Delete, then recompute the totals of the affected faturas (skips ItemFatura.delete)."""
+        with transaction.atomic():
+            fatura_ids = set(self.order_by().values_list("fatura_id", flat=True).distinct())
+            result = super().delete()
+            recalcular_totais(Fatura.objects.filter(pk__in=fatura_ids))
+        return result
+
+    delete.alters_data = True
+    delete.queryset_only = True
 
 
 class ItemFatura(models.Model):
@@ -165,16 +298,73 @@ class ItemFatura(models.Model):
     valor_unitario = models.DecimalField(_("Valor Unitário"), max_digits=10, decimal_places=2)
     subtotal = models.DecimalField(_("Subtotal"), max_digits=10, decimal_places=2, editable=False)
 
+    objects = ItemFaturaQuerySet.as_manager()
+
     class Meta:
         verbose_name = _("Item da Fatura")
         verbose_name_plural = _("Itens da Fatura")
+        ordering = ["id"]
 
     def __str__(self):
         return f"{self.descricao} - R$ {self.subtotal:,.2f}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # What the parent Fatura's totals currently include for this row
+        instance._loaded = (instance.__dict__.get("fatura_id"), instance.__dict__.get("subtotal"))
+        return instance
+
     def save(self, *args, **kwargs):
+        """Save and move the parent's totals by the change in ``subtotal``."""
         self.subtotal = self.quantidade * self.valor_unitario
-        super().save(*args, **kwargs)
+        adding = self._state.adding
+        old_fatura_id, old_subtotal = getattr(self, "_loaded", (None, None))
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                self._ajustar(self.fatura_id, self.subtotal)
+            elif old_subtotal is None:
+                # Previous value unknown (not loaded from the database): recompute
+                recalcular_totais(Fatura.objects.filter(pk__in={self.fatura_id, old_fatura_id}))
+            elif old_fatura_id != self.fatura_id:
+                self._ajustar(old_fatura_id, -old_subtotal)
+                self._ajustar(self.fatura_id, self.subtotal)
+            else:
+                self._ajustar(self.fatura_id, self.subtotal - old_subtotal)
+        self._loaded = (self.fatura_id, self.subtotal)
+
+    def delete(self, *args, **kwargs):
+        fatura_id, subtotal = getattr(self, "_loaded", (None, None))
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            if subtotal is None:
+                recalcular_totais(Fatura.objects.filter(pk=self.fatura_id))
+            else:
+                self._ajustar(fatura_id, -subtotal)
+        return result
+
+    def _ajustar(self, fatura_id, delta):
+        Fatura.ajustar_total(fatura_id, delta)
+        # Keep a loaded parent's totals in step with the database
+        fatura = self._state.fields_cache.get("fatura")
+        if fatura is not None and fatura.pk == fatura_id:
+            fatura.subtotal += delta
+            fatura.valor_total += delta
+            fatura._remember_valores(Fatura.TOTAL_FIELDS)
+
+
+class PagamentoQuerySet(models.QuerySet):
+    def delete(self):
+        """Delete, then bump the affected faturas' ``updated_at`` (skips Pagamento.delete)."""
+        with transaction.atomic():
+            fatura_ids = set(self.order_by().values_list("fatura_id", flat=True).distinct())
+            result = super().delete()
+            Fatura.touch(*fatura_ids)
+        return result
+
+    delete.alters_data = True
+    delete.queryset_only = True
 
 
 class Pagamento(models.Model):
@@ -216,6 +406,8 @@ class Pagamento(models.Model):
     created_at = models.DateTimeField(_("Criado em"), auto_now_add=True)
     updated_at = models.DateTimeField(_("Atualizado em"), auto_now=True)
 
+    objects = PagamentoQuerySet.as_manager()
+
     class Meta:
         verbose_name = _("Pagamento")
         verbose_name_plural = _("Pagamentos")
@@ -223,3 +415,169 @@ class Pagamento(models.Model):
 
     def __str__(self):
         return f"{self.fatura.numero} - {self.metodo} - R$ {self.valor:,.2f}"
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        Fatura.touch(self.fatura_id)
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        Fatura.touch(self.fatura_id)
+        return result
+
+
+class Assinatura(models.Model):
+    """
+    Recurring monthly charge (a "mensal" Servico or Adicional, or a custom line).
+
+    ``manage.py run_billing`` turns every subscription due in a month into
+    ``ItemFatura`` rows, one Fatura per (cliente, projeto), and records the month
+    in ``ultimo_ciclo`` so a cycle is never billed twice.
+    """
+
+    cliente = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.PROTECT,
+        related_name="assinaturas",
+        verbose_name=_("Cliente"),
+    )
+    projeto = models.ForeignKey(
+        "projetos.Projeto",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="assinaturas",
+        verbose_name=_("Projeto"),
+    )
+    servico = models.ForeignKey(
+        "servicos.Servico",
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name="assinaturas",
+        verbose_name=_("Serviço"),
+    )
+    adicional = models.ForeignKey(
+        "pacotes.Adicional",
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name="assinaturas",
+        verbose_name=_("Adicional"),
+    )
+    descricao = models.CharField(
+        _("Descrição"),
+        max_length=255,
+        blank=True,
+        help_text=_("Texto do item na fatura. Vazio: nome do serviço/adicional."),
+    )
+    valor = models.DecimalField(
+        _("Valor Mensal"),
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        help_text=_("Vazio: preço atual do serviço/adicional."),
+    )
+    quantidade = models.PositiveIntegerField(_("Quantidade"), default=1)
+    dia_vencimento = models.PositiveSmallIntegerField(
+        _("Dia de Vencimento"),
+        default=10,
+        validators=[MinValueValidator(1), MaxValueValidator(31)],
+    )
+    data_inicio = models.DateField(_("Início"))
+    data_fim = models.DateField(_("Fim"), null=True, blank=True)
+    ativa = models.BooleanField(_("Ativa"), default=True)
+    ultimo_ciclo = models.DateField(
+        _("Último Ciclo Faturado"),
+        null=True,
+        blank=True,
+        help_text=_("Primeiro dia do último mês faturado."),
+    )
+
+    created_at = models.DateTimeField(_("Criado em"), auto_now_add=True)
+    updated_at = models.DateTimeField(_("Atualizado em"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("Assinatura")
+        verbose_name_plural = _("Assinaturas")
+        ordering = ["cliente", "id"]
+        indexes = [
+            # Billing run: active subscriptions not yet billed for the cycle
+            models.Index(fields=["ativa", "ultimo_ciclo"], name="faturas_assinatura_ciclo_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.cliente} - {self.nome}"
+
+    def clean(self):
+        super().clean()
+        if not (self.servico_id or self.adicional_id or self.descricao):
+            raise ValidationError(_("Informe um serviço, um adicional ou uma descrição."))
+        if self.preco_mensal is None:
+            raise ValidationError({"valor": _("Informe o valor mensal.")})
+
+    @property
+    def nome(self):
+        if self.descricao:
+            return self.descricao
+        if self.servico_id:
+            return self.servico.nome_pt
+        if self.adicional_id:
+            return self.adicional.nome_pt
+        return ""
+
+    @property
+    def preco_mensal(self):
+        """Price billed per cycle: the override, else the catalog price."""
+        if self.valor is not None:
+            return self.valor
+        if self.servico_id:
+            return self.servico.preco
+        if self.adicional_id:
+            return self.adicional.preco
+        return None
+
+
+class EventoWebhook(models.Model):
+    """
+    Raw Mercado Pago notification, stored by the webhook and processed later.
+
+    The unique constraint on (transacao_id, acao) makes redelivered notifications
+    a no-op INSERT; ``faturas.webhooks.process_batch`` applies the events.
+    """
+
+    STATUS_CHOICES = [
+        ("pendente", _("Pendente")),
+        ("processado", _("Processado")),
+        ("ignorado", _("Ignorado")),
+        ("falha", _("Falha")),
+    ]
+
+    transacao_id = models.CharField(_("ID da Transação"), max_length=100)
+    acao = models.CharField(_("Ação"), max_length=50)
+    payload = models.JSONField(_("Payload"), default=dict, blank=True)
+    status = models.CharField(
+        _("Status"), max_length=20, choices=STATUS_CHOICES, default="pendente"
+    )
+    tentativas = models.PositiveIntegerField(_("Tentativas"), default=0)
+    erro = models.TextField(_("Erro"), blank=True)
+    proxima_tentativa = models.DateTimeField(_("Próxima Tentativa"), null=True, blank=True)
+    processado_at = models.DateTimeField(_("Processado em"), null=True, blank=True)
+    created_at = models.DateTimeField(_("Recebido em"), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("Evento de Webhook")
+        verbose_name_plural = _("Eventos de Webhook")
+        ordering = ["-created_at"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["transacao_id", "acao"], name="faturas_evento_transacao_acao"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["status", "proxima_tentativa"], name="faturas_evento_fila_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.acao} {self.transacao_id} ({self.status})"
@@ -0,0 +1,144 @@
+"""
+Overdue sweep: move unpaid Faturas past ``data_vencimento`` to ``vencida``.
+
+- Faturas are handled in chunks; each chunk is one transaction that locks its
+  rows (``SKIP LOCKED``, so a concurrent payment or second sweep is never
+  blocked) and moves them with a single UPDATE, guarded by the statuses
+  ``Fatura.VALID_TRANSITIONS`` allows to become ``vencida``.
+- Each chunk adds one ``Notificacao`` per invoice with ``bulk_create``, bumps
+  the unread counters with one UPDATE and queues the ``fatura_vencimento``
+  overdue emails in ``LogEmail`` for the outbox worker (``send_queued_emails``),
+  rendered once per language. The notifications reach open live streams once
+  the chunk commits.
+"""
+
+import time
+from dataclasses import dataclass
+from functools import partial
+
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone, translation
+from django.utils.formats import date_format
+from django.utils.translation import gettext as _
+
+from notificacoes import live, unread
+from notificacoes.bulk import FaturaVencidaCampaign, queue_campaign
+from notificacoes.models import Notificacao
+
+from .models import Fatura
+
+
+@dataclass
+class SweepResult:
+    faturas: int = 0
+    notificacoes: int = 0
+    emails: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def rate(self):
+        """Faturas moved per second."""
+        return self.faturas / self.elapsed if self.elapsed else 0.0
+
+
+def overdue_faturas(today=None):
+    """Faturas that may become ``vencida`` and were due before ``today``."""
+    return Fatura.objects.filter(
+        status__in=Fatura.statuses_allowing("vencida"),
+        data_vencimento__lt=today or timezone.localdate(),
+    )
+
+
+def sweep_overdue(today=None, chunk_size=500, progress=None):
+    """
+    Mark every overdue Fatura as ``vencida`` and notify its client.
+
+    ``progress`` is called with the running ``SweepResult`` after each chunk.
+    """
+    today = today or timezone.localdate()
+    result = SweepResult()
+    rendered = {}
+    start = time.perf_counter()
+    while True:
+        with transaction.atomic():
+            moved = _sweep_chunk(today, chunk_size, rendered, result)
+        result.elapsed = time.perf_counter() - start
+        if not moved:
+            break
+        if progress:
+            progress(result)
+    return result
+
+
+def _sweep_chunk(today, chunk_size, rendered, result):
+    rows = list(
+        overdue_faturas(today)
+        .select_for_update(skip_locked=True, of=("self",))
+        .order_by("data_vencimento")
+        .values_list(
+            "id",
+            "numero",
+            "valor_total",
+            "data_vencimento",
+            "cliente_id",
+            "cliente__email",
+            "cliente__idioma_preferido",
+            "cliente__nome_completo",
+            "cliente__is_active",
+            "cliente__notificacoes_email",
+        )[:chunk_size]
+    )
+    if not rows:
+        return 0
+
+    now = timezone.now()
+    # Re-checks the source status, so the locked rows can only move along a valid edge
+    moved = (
+        overdue_faturas(today)
+        .filter(pk__in=[row[0] for row in rows])
+        .update(status="vencida", updated_at=now)
+    )
+
+    notificacoes, recipients = [], []
+    for (
+        _pk,
+        numero,
+        valor,
+        vencimento,
+        cliente_id,
+        email,
+        language,
+        nome,
+        is_active,
+        wants_email,
+    ) in rows:
+        with translation.override(language):
+            notificacoes.append(
+                Notificacao(
+                    usuario_id=cliente_id,
+                    tipo="aviso",
+                    categoria="fatura",
+                    titulo=_("Fatura %(numero)s vencida") % {"numero": numero},
+                    mensagem=_(
+                        "A fatura %(numero)s venceu em %(vencimento)s e ainda não consta como paga."
+                    )
+                    % {
+                        "numero": numero,
+                        "vencimento": date_format(vencimento, "SHORT_DATE_FORMAT"),
+                    },
+                    url=reverse("faturas:detalhe", args=[numero]),
+                )
+            )
+        if is_active and wants_email:
+            recipients.append((email, language, nome, numero, valor, vencimento))
+
+    Notificacao.objects.bulk_create(notificacoes)
+    unread.notificacoes_criadas(notificacoes)
+    transaction.on_commit(partial(live.notificacoes_criadas, notificacoes))
+    emails = queue_campaign(FaturaVencidaCampaign(recipients), rendered)
+
+    result.faturas += moved
+    result.notificacoes += len(notificacoes)
+    result.emails += len(emails)
+    return moved
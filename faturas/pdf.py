@@ -0,0 +1,361 @@
+"""
+Invoice PDF rendering and on-disk cache.
+
+``render_fatura`` builds a small self-contained PDF (built-in Helvetica, one
+Flate-compressed content stream per page) and yields it object by object, so
+the response starts before the document is finished and nothing holds the
+whole file in memory. Labels follow the active language. Rendered files are
+kept under ``FATURA_PDF_DIR``, one per (numero, language, updated_at): any change
+to the fatura, its items or its payments bumps ``Fatura.updated_at`` and so
+produces a new file.
+"""
+
+import os
+import tempfile
+import textwrap
+import zlib
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone, translation
+from django.utils.translation import gettext, gettext_lazy
+
+PDF_DIR = Path(getattr(settings, "FATURA_PDF_DIR", settings.BASE_DIR / "private" / "faturas"))
+
+# A4 in points
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842
+MARGIN = 50
+ROW_HEIGHT = 16
+BOTTOM = 90
+
+# Helvetica advance widths (1/1000 em) for the characters used in amounts; other
+# characters fall back to DEFAULT_WIDTH, which is only used for right alignment.
+HELVETICA_WIDTHS = {
+    **dict.fromkeys("0123456789$", 556),
+    **dict.fromkeys(".,: ", 278),
+    "-": 333,
+    "R": 722,
+    "%": 889,
+}
+DEFAULT_WIDTH = 556
+
+# Column x positions: description, quantity (right edge), unit price and subtotal (right edges)
+COL_DESC, COL_QTD, COL_UNIT, COL_TOTAL = MARGIN, 360, 460, PAGE_WIDTH - MARGIN
+COL_METODO, COL_STATUS = 150, 300
+
+# (x, label, align) per table column
+ITEM_COLUMNS = [
+    (COL_DESC + 4, gettext_lazy("Descrição"), "left"),
+    (COL_QTD, gettext_lazy("Qtd"), "right"),
+    (COL_UNIT, gettext_lazy("Valor Unit."), "right"),
+    (COL_TOTAL - 4, gettext_lazy("Subtotal"), "right"),
+]
+PAGAMENTO_COLUMNS = [
+    (COL_DESC + 4, gettext_lazy("Data"), "left"),
+    (COL_METODO, gettext_lazy("Método"), "left"),
+    (COL_STATUS, gettext_lazy("Status"), "left"),
+    (COL_TOTAL - 4, gettext_lazy("Valor"), "right"),
+]
+
+
+def money(valor):
+    return f"R$ {valor:,.2f}"
+
+
+def _escape(text):
+    data = str(text).encode("cp1252", errors="replace")
+    return data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def _width(text, size):
+    return sum(HELVETICA_WIDTHS.get(c, DEFAULT_WIDTH) for c in str(text)) * size / 1000
+
+
+class _Page:
+    """Content stream operators for one page."""
+
+    def __init__(self):
+        self.ops = []
+
+    def text(self, x, y, text, size=10, bold=False, align="left"):
+        if align == "right":
+            x -= _width(text, size)
+        font = b"/F2" if bold else b"/F1"
+        self.ops.append(b"BT %s %d Tf %.2f %.2f Td (%s) Tj ET" % (font, size, x, y, _escape(text)))
+
+    def line(self, x1, y1, x2, y2, width=0.5):
+        self.ops.append(b"%.2f w %.2f %.2f m %.2f %.2f l S" % (width, x1, y1, x2, y2))
+
+    def band(self, x, y, w, h, gray=0.93):
+        self.ops.append(b"%.2f g %.2f %.2f %.2f %.2f re f 0 g" % (gray, x, y, w, h))
+
+    def content(self):
+        return b"\n".join(self.ops)
+
+
+class _Writer:
+    """Serializes PDF objects, tracking byte offsets for the xref table."""
+
+    def __init__(self):
+        self.offset = 0
+        self.offsets = {}
+
+    def emit(self, data):
+        self.offset += len(data)
+        return data
+
+    def obj(self, num, body):
+        self.offsets[num] = self.offset
+        return self.emit(b"%d 0 obj\n%s\nendobj\n" % (num, body))
+
+    def stream(self, num, content):
+        data = zlib.compress(content)
+        return self.obj(
+            num,
+            b"<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream" % (len(data), data),
+        )
+
+    def trailer(self, root):
+        size = max(self.offsets) + 1
+        xref_at = self.offset
+        rows = [b"0000000000 65535 f \n"]
+        rows += [b"%010d 00000 n \n" % self.offsets[n] for n in range(1, size)]
+        return self.emit(
+            b"xref\n0 %d\n%s" % (size, b"".join(rows))
+            + b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+            % (size, root, xref_at)
+        )
+
+
+# Fixed object numbers; pages take 5, 6, 7, ... (content stream, page) in pairs
+CATALOG, PAGES, FONT_REGULAR, FONT_BOLD = 1, 2, 3, 4
+
+
+def render_fatura(fatura):
+    """Yield the invoice PDF for ``fatura`` in chunks (one per page, roughly)."""
+    writer = _Writer()
+    yield writer.emit(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    page_ids = []
+    for page in _layout(fatura):
+        content_id = PAGES + 3 + 2 * len(page_ids)
+        page_id = content_id + 1
+        page_ids.append(page_id)
+        yield writer.stream(content_id, page.content()) + writer.obj(
+            page_id,
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] "
+            b"/Resources << /Font << /F1 %d 0 R /F2 %d 0 R >> >> /Contents %d 0 R >>"
+            % (PAGES, PAGE_WIDTH, PAGE_HEIGHT, FONT_REGULAR, FONT_BOLD, content_id),
+        )
+
+    font = b"<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>"
+    kids = b" ".join(b"%d 0 R" % n for n in page_ids)
+    yield (
+        writer.obj(FONT_REGULAR, font % b"Helvetica")
+        + writer.obj(FONT_BOLD, font % b"Helvetica-Bold")
+        + writer.obj(PAGES, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids)))
+        + writer.obj(CATALOG, b"<< /Type /Catalog /Pages %d 0 R >>" % PAGES)
+        + writer.trailer(CATALOG)
+    )
+
+
+def _layout(fatura):
+    """Lay the invoice out, yielding each ``_Page`` as soon as it is full."""
+    right = PAGE_WIDTH - MARGIN
+    number = 1
+    page = _Page()
+    y = _header(page, fatura)
+
+    def new_page():
+        nonlocal page, y, number
+        _footer(page, fatura, number)
+        finished = page
+        number += 1
+        page = _Page()
+        page.text(
+            MARGIN,
+            PAGE_HEIGHT - MARGIN,
+            gettext("Fatura %(numero)s (continuação)") % {"numero": fatura.numero},
+            9,
+        )
+        y = PAGE_HEIGHT - MARGIN - 30
+        return finished
+
+    # Items
+    y = _table_header(page, y, ITEM_COLUMNS)
+    for item in fatura.itens.all():
+        lines = textwrap.wrap(item.descricao, 55) or [""]
+        if y - ROW_HEIGHT * len(lines) < BOTTOM:
+            yield new_page()
+            y = _table_header(page, y, ITEM_COLUMNS)
+        page.text(COL_DESC, y, lines[0])
+        page.text(COL_QTD, y, str(item.quantidade), align="right")
+        page.text(COL_UNIT, y, money(item.valor_unitario), align="right")
+        page.text(COL_TOTAL, y, money(item.subtotal), align="right")
+        for extra in lines[1:]:
+            y -= ROW_HEIGHT - 4
+            page.text(COL_DESC, y, extra)
+        y -= ROW_HEIGHT
+    page.line(MARGIN, y + ROW_HEIGHT - 4, right, y + ROW_HEIGHT - 4)
+
+    # Totals
+    if y - 4 * ROW_HEIGHT < BOTTOM:
+        yield new_page()
+    y -= 4
+    for label, valor, bold in (
+        (gettext("Subtotal"), fatura.subtotal, False),
+        (gettext("Desconto"), -fatura.desconto, False),
+        (gettext("Impostos"), fatura.impostos, False),
+        (gettext("Total"), fatura.valor_total, True),
+    ):
+        page.text(COL_UNIT, y, label, bold=bold, align="right")
+        page.text(COL_TOTAL, y, money(valor), bold=bold, align="right")
+        y -= ROW_HEIGHT
+
+    # Payments
+    pagamentos = list(fatura.pagamentos.all())
+    if pagamentos:
+        if y - 3 * ROW_HEIGHT < BOTTOM:
+            yield new_page()
+        y -= ROW_HEIGHT
+        page.text(MARGIN, y, gettext("Pagamentos"), 11, bold=True)
+        y = _table_header(page, y - ROW_HEIGHT, PAGAMENTO_COLUMNS)
+        for pagamento in pagamentos:
+            if y - ROW_HEIGHT < BOTTOM:
+                yield new_page()
+                y = _table_header(page, y, PAGAMENTO_COLUMNS)
+            data = pagamento.data_pagamento or pagamento.created_at
+            page.text(COL_DESC, y, timezone.localtime(data).strftime("%d/%m/%Y") if data else "-")
+            page.text(COL_METODO, y, pagamento.get_metodo_display())
+            page.text(COL_STATUS, y, pagamento.get_status_display())
+            page.text(COL_TOTAL, y, money(pagamento.valor), align="right")
+            y -= ROW_HEIGHT
+
+    # Notes
+    if fatura.observacoes:
+        lines = [ln for para in fatura.observacoes.splitlines() for ln in textwrap.wrap(para, 95)]
+        y -= ROW_HEIGHT
+        page.text(MARGIN, y, gettext("Observações"), 11, bold=True)
+        y -= ROW_HEIGHT
+        for line in lines:
+            if y < BOTTOM:
+                yield new_page()
+            page.text(MARGIN, y, line, 9)
+            y -= ROW_HEIGHT - 4
+
+    _footer(page, fatura, number)
+    yield page
+
+
+def _header(page, fatura):
+    top = PAGE_HEIGHT - MARGIN
+    right = PAGE_WIDTH - MARGIN
+    page.text(MARGIN, top - 10, settings.SITE_NAME, 18, bold=True)
+    page.text(MARGIN, top - 26, settings.SITE_URL, 9)
+    page.text(right, top - 10, gettext("FATURA"), 16, bold=True, align="right")
+    page.text(right, top - 26, fatura.numero, 11, align="right")
+    page.line(MARGIN, top - 40, right, top - 40)
+
+    y = top - 62
+    cliente = fatura.cliente
+    page.text(MARGIN, y, gettext("Cliente"), 9, bold=True)
+    page.text(MARGIN, y - 14, cliente.nome_completo or cliente.email)
+    page.text(MARGIN, y - 28, cliente.email, 9)
+
+    rows = [
+        (
+            gettext("Emissão"),
+            fatura.data_emissao.strftime("%d/%m/%Y") if fatura.data_emissao else "-",
+        ),
+        (gettext("Vencimento"), fatura.data_vencimento.strftime("%d/%m/%Y")),
+        (gettext("Status"), fatura.get_status_display()),
+    ]
+    if fatura.data_pagamento:
+        rows.append((gettext("Pagamento"), fatura.data_pagamento.strftime("%d/%m/%Y")))
+    for i, (label, value) in enumerate(rows):
+        page.text(400, y - 14 * i, f"{label}:", 9, bold=True)
+        page.text(right, y - 14 * i, value, 9, align="right")
+
+    y -= 14 * max(len(rows), 3) + 10
+    if fatura.descricao:
+        for line in textwrap.wrap(fatura.descricao, 95)[:4]:
+            page.text(MARGIN, y, line, 9)
+            y -= 12
+    return y - 14
+
+
+def _table_header(page, y, columns):
+    page.band(MARGIN, y - 5, PAGE_WIDTH - 2 * MARGIN, ROW_HEIGHT + 2)
+    for x, label, align in columns:
+        page.text(x, y, label, 9, bold=True, align=align)
+    return y - ROW_HEIGHT - 4
+
+
+def _footer(page, fatura, number):
+    page.line(MARGIN, 60, PAGE_WIDTH - MARGIN, 60)
+    footer = gettext("Fatura %(numero)s") % {"numero": fatura.numero}
+    page.text(MARGIN, 45, f"{settings.SITE_NAME} - {footer}", 8)
+    page.text(
+        PAGE_WIDTH - MARGIN,
+        45,
+        gettext("Página %(numero)s") % {"numero": number},
+        8,
+        align="right",
+    )
+
+
+# ─────────────────────────── Cache ──────────────────────────────────────────
+
+
+def _language():
+    return translation.get_language() or settings.LANGUAGE_CODE
+
+
+def cache_path(fatura):
+    """Where this version of ``fatura`` in the active language lives (may not exist yet)."""
+    stamp = int(fatura.updated_at.timestamp() * 1_000_000)
+    return PDF_DIR / f"{fatura.numero}-{_language()}-{stamp}.pdf"
+
+
+def stream_to_cache(fatura):
+    """
+    Return an iterator over the rendered PDF that writes it to the cache.
+
+    The file is written under a temporary name and moved into place only once
+    complete, so a client that disconnects never leaves a truncated PDF behind.
+    The active language is captured now: a streaming response is consumed after
+    the view (and ``LocaleMiddleware``) has returned.
+    """
+    return _stream_to_cache(fatura, cache_path(fatura), _language())
+
+
+def _stream_to_cache(fatura, path, language):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = tempfile.NamedTemporaryFile(dir=path.parent, suffix=".tmp", delete=False)
+    try:
+        with tmp, translation.override(language):
+            for chunk in render_fatura(fatura):
+                tmp.write(chunk)
+                yield chunk
+        os.replace(tmp.name, path)
+    finally:
+        if os.path.exists(tmp.name):
+            os.unlink(tmp.name)
+    _prune(fatura, keep=path)
+
+
+def render_to_cache(fatura, force=False):
+    """Render ``fatura`` into the cache unless it is already there. Returns the path."""
+    path = cache_path(fatura)
+    if force or not path.exists():
+        for _chunk in stream_to_cache(fatura):
+            pass
+    return path
+
+
+def _prune(fatura, keep):
+    """Drop PDFs rendered for older versions of ``fatura`` in the same language."""
+    prefix = keep.name.rsplit("-", 1)[0]  # "<numero>-<language>"
+    for old in PDF_DIR.glob(f"{prefix}-*.pdf"):
+        if old != keep:
+            old.unlink(missing_ok=True)
@@ -2,12 +2,41 @@
 Faturas App Tests - Fatura, ItemFatura, Pagamento
 """
 
+import datetime
+import hashlib
+import hmac
+import json
+import re
+import tempfile
+import zlib
 from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
-
-from faturas.models import Fatura, ItemFatura, Pagamento
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection
+from django.http import FileResponse
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone, translation
+
+from faturas import billing, overdue, pdf, webhooks
+from faturas.admin import FaturaAdmin
+from faturas.models import (
+    Assinatura,
+    EventoWebhook,
+    Fatura,
+    ItemFatura,
+    Pagamento,
+    recalcular_totais,
+)
+from notificacoes.models import LogEmail, Notificacao
+from pacotes.models import Adicional
+from servicos.models import Servico
 
 User = get_user_model()
 
@@ -113,6 +142,15 @@ class FaturaModelTest(TestCase):
     def test_observacoes_internas_default_blank(self):
         self.assertEqual(self.fatura.observacoes_internas, "")
 
+    def test_clean_validates_transition_without_query(self):
+        fatura = Fatura.objects.get(pk=self.fatura.pk)
+        fatura.status = "paga"
+        with self.assertNumQueries(0):
+            fatura.clean()
+        fatura.status = "reembolsada"
+        with self.assertNumQueries(0), self.assertRaises(ValidationError):
+            fatura.clean()
+
 
 # ─────────────────────────── ItemFatura ─────────────────────────────────────
 
@@ -170,6 +208,165 @@ class ItemFaturaModelTest(TestCase):
         self.assertEqual(self.fatura.itens.count(), 2)
 
 
+class FaturaTotaisTest(TestCase):
+    """Totals follow ItemFatura writes through F() deltas and DB-side sums."""
+
+    def setUp(self):
+        self.user = make_user("totais@example.com", "Totais User")
+        self.fatura = Fatura.objects.create(
+            cliente=self.user,
+            data_vencimento=datetime.date.today(),
+            desconto=Decimal("100.00"),
+            impostos=Decimal("50.00"),
+        )
+
+    def add(self, fatura=None, valor="100.00", quantidade=1):
+        return ItemFatura.objects.create(
+            fatura=fatura or self.fatura,
+            descricao="Item",
+            quantidade=quantidade,
+            valor_unitario=Decimal(valor),
+        )
+
+    def totals(self, fatura=None):
+        fatura = fatura or self.fatura
+        fatura.refresh_from_db()
+        return fatura.subtotal, fatura.valor_total
+
+    def test_adding_items_moves_totals(self):
+        self.add(valor="1000.00")
+        self.add(valor="250.00", quantidade=2)
+        self.assertEqual(self.totals(), (Decimal("1500.00"), Decimal("1450.00")))
+
+    def test_item_save_does_not_read_other_items(self):
+        self.add()
+        # savepoint, INSERT, UPDATE fatura (delta), release
+        with self.assertNumQueries(4):
+            self.add()
+
+    def test_changing_item_applies_difference(self):
+        item = self.add(valor="100.00")
+        item = ItemFatura.objects.get(pk=item.pk)
+        item.quantidade = 3
+        item.save()
+        self.assertEqual(self.totals()[0], Decimal("300.00"))
+
+    def test_moving_item_between_faturas(self):
+        other = Fatura.objects.create(cliente=self.user, data_vencimento=datetime.date.today())
+        item = self.add(valor="80.00")
+        item = ItemFatura.objects.get(pk=item.pk)
+        item.fatura = other
+        item.save()
+        self.assertEqual(self.totals()[0], Decimal("0.00"))
+        self.assertEqual(self.totals(other)[0], Decimal("80.00"))
+
+    def test_delete_subtracts(self):
+        keep = self.add(valor="40.00")
+        ItemFatura.objects.get(pk=self.add(valor="60.00").pk).delete()
+        self.assertEqual(self.totals()[0], keep.subtotal)
+
+    def test_loaded_parent_kept_in_step(self):
+        item = self.add(valor="70.00")
+        # The in-memory fatura saw the delta, so a full save does not undo it
+        item.fatura.observacoes = "Atualizada"
+        item.fatura.save()
+        self.assertEqual(self.totals()[0], Decimal("70.00"))
+
+    def test_stale_full_save_keeps_item_totals(self):
+        stale = Fatura.objects.get(pk=self.fatura.pk)
+        self.add(valor="70.00")
+        stale.observacoes = "Atualizada"
+        stale.status = "paga"
+        stale.save()
+        self.assertEqual(self.totals(), (Decimal("70.00"), Decimal("20.00")))
+        self.assertEqual(self.fatura.status, "paga")
+
+    def test_desconto_change_recomputes_from_stored_subtotal(self):
+        stale = Fatura.objects.get(pk=self.fatura.pk)
+        self.add(valor="100.00")
+        stale.desconto = Decimal("0.00")
+        stale.save()
+        self.assertEqual(
+            (stale.subtotal, stale.valor_total), (Decimal("100.00"), Decimal("150.00"))
+        )
+        self.assertEqual(self.totals(), (Decimal("100.00"), Decimal("150.00")))
+
+    def test_totals_written_when_named_in_update_fields(self):
+        self.add(valor="100.00")
+        self.fatura.subtotal = Decimal("10.00")
+        self.fatura.save(update_fields=["subtotal"])
+        self.assertEqual(self.totals(), (Decimal("10.00"), Decimal("-40.00")))
+
+    def test_full_save_with_changed_total_raises(self):
+        self.fatura.subtotal = Decimal("999.00")
+        with self.assertRaises(ValueError):
+            self.fatura.save()
+        self.assertEqual(self.totals()[0], Decimal("0.00"))
+
+    def test_queryset_delete_recomputes_totals(self):
+        self.add(valor="40.00")
+        self.add(valor="60.00")
+        other = Fatura.objects.create(cliente=self.user, data_vencimento=datetime.date.today())
+        self.add(fatura=other, valor="10.00")
+        self.fatura.itens.filter(subtotal=Decimal("60.00")).delete()
+        self.assertEqual(self.totals(), (Decimal("40.00"), Decimal("-10.00")))
+        ItemFatura.objects.all().delete()
+        self.assertEqual(self.totals()[0], Decimal("0.00"))
+        self.assertEqual(self.totals(other)[0], Decimal("0.00"))
+
+    def test_totals_are_read_only_in_admin(self):
+        self.assertTrue({"subtotal", "valor_total"} <= set(FaturaAdmin.readonly_fields))
+
+    def test_calcular_total_fixes_drift(self):
+        self.add(valor="100.00")
+        Fatura.objects.filter(pk=self.fatura.pk).update(subtotal=0, valor_total=0)
+        self.fatura.calcular_total()
+        self.assertEqual(self.fatura.subtotal, Decimal("100.00"))
+        self.assertEqual(self.fatura.valor_total, Decimal("50.00"))
+
+    def _drifted(self, count):
+        faturas = Fatura.objects.bulk_create(
+            Fatura(
+                numero=f"TOT-{i}",
+                cliente=self.user,
+                data_vencimento=datetime.date.today(),
+                impostos=Decimal("1.00"),
+            )
+            for i in range(count)
+        )
+        # bulk_create bypasses ItemFatura.save, leaving totals at zero
+        ItemFatura.objects.bulk_create(
+            ItemFatura(fatura=f, descricao="x", valor_unitario=Decimal(i), subtotal=Decimal(i))
+            for i, f in enumerate(faturas, start=1)
+        )
+        return faturas
+
+    def test_recalcular_totais_bulk_single_query(self):
+        faturas = self._drifted(50)
+        untouched = self.add(valor="5.00").fatura
+        Fatura.objects.filter(pk=untouched.pk).update(subtotal=999)
+
+        with self.assertNumQueries(1):
+            updated = recalcular_totais(Fatura.objects.filter(numero__startswith="TOT-"))
+        self.assertEqual(updated, 50)
+        for i, fatura in enumerate(faturas, start=1):
+            self.assertEqual(self.totals(fatura), (Decimal(i), Decimal(i + 1)))
+        self.assertEqual(self.totals(untouched)[0], Decimal("999.00"))
+
+    def test_recalcular_totais_without_items_is_zero(self):
+        Fatura.objects.filter(pk=self.fatura.pk).update(subtotal=10)
+        recalcular_totais(Fatura.objects.filter(pk=self.fatura.pk))
+        self.assertEqual(self.totals(), (Decimal("0.00"), Decimal("-50.00")))
+
+    def test_recalcular_totais_fallback_for_old_sqlite(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("SQLite-only fallback")
+        faturas = self._drifted(5)
+        with patch.object(connection.Database, "sqlite_version_info", (3, 32, 0)):
+            self.assertEqual(recalcular_totais(Fatura.objects.filter(numero__startswith="TOT-")), 5)
+        self.assertEqual(self.totals(faturas[-1]), (Decimal("5.00"), Decimal("6.00")))
+
+
 # ─────────────────────────── Pagamento ──────────────────────────────────────
 
 
@@ -250,3 +447,601 @@ class PagamentoModelTest(TestCase):
 
     def test_created_at_auto_set(self):
         self.assertIsNotNone(self.pagamento.created_at)
+
+
+# ─────────────────────────── Mercado Pago webhook ───────────────────────────
+
+WEBHOOK_SECRET = "test-webhook-secret"
+
+
+@override_settings(MERCADOPAGO_WEBHOOK_SECRET=WEBHOOK_SECRET)
+class MercadoPagoWebhookTest(TestCase):
+    """The webhook only verifies, stores and acknowledges notifications."""
+
+    url = "/webhook/mercadopago/"
+
+    def post(self, payload, request_id="req-1", secret=WEBHOOK_SECRET):
+        ts = "1700000000"
+        manifest = f"id={payload['data']['id']};request-id={request_id};ts={ts};"
+        digest = hmac.new(secret.encode(), manifest.encode(), hashlib.sha256).hexdigest()
+        return self.client.post(
+            self.url,
+            data=json.dumps(payload),
+            content_type="application/json",
+            HTTP_X_SIGNATURE=f"ts={ts},v1={digest}",
+            HTTP_X_REQUEST_ID=request_id,
+        )
+
+    def test_valid_notification_is_stored(self):
+        response = self.post({"action": "payment.created", "data": {"id": "123"}})
+        self.assertEqual(response.status_code, 200)
+        evento = EventoWebhook.objects.get()
+        self.assertEqual((evento.transacao_id, evento.acao), ("123", "payment.created"))
+        self.assertEqual(evento.status, "pendente")
+
+    def test_duplicate_delivery_keeps_one_row(self):
+        payload = {"action": "payment.created", "data": {"id": "123"}}
+        self.post(payload)
+        self.assertEqual(self.post(payload, request_id="req-2").status_code, 200)
+        self.assertEqual(EventoWebhook.objects.count(), 1)
+
+    def test_distinct_actions_are_separate_events(self):
+        self.post({"action": "payment.created", "data": {"id": "123"}})
+        self.post({"action": "payment.updated", "data": {"id": "123"}})
+        self.assertEqual(EventoWebhook.objects.count(), 2)
+
+    def test_invalid_signature_rejected(self):
+        response = self.post({"action": "payment.created", "data": {"id": "1"}}, secret="wrong")
+        self.assertEqual(response.status_code, 401)
+        self.assertFalse(EventoWebhook.objects.exists())
+
+    def test_handler_does_no_payment_work(self):
+        # One INSERT (upsert) for the event, no Pagamento lookups
+        with self.assertNumQueries(1):
+            self.post({"action": "payment.updated", "data": {"id": "77"}})
+
+
+class PaymentEventProcessingTest(TestCase):
+    """Tests for faturas.webhooks.process_batch (the event worker)."""
+
+    def setUp(self):
+        self.user = make_user("mp_user@example.com", "MP User")
+        self.fatura = Fatura.objects.create(
+            cliente=self.user,
+            data_vencimento=datetime.date.today(),
+            subtotal=Decimal("300.00"),
+        )
+        self.fetched = []
+        self.payments = {}
+
+    def fetch(self, payment_id):
+        self.fetched.append(payment_id)
+        payment = self.payments[payment_id]
+        if isinstance(payment, Exception):
+            raise payment
+        return payment
+
+    def payment(self, payment_id, status="approved", **extra):
+        self.payments[payment_id] = {
+            "id": int(payment_id),
+            "status": status,
+            "transaction_amount": 300.0,
+            "payment_method_id": "pix",
+            "payment_type_id": "bank_transfer",
+            "external_reference": self.fatura.numero,
+            "date_approved": "2026-03-01T10:00:00.000-03:00",
+            **extra,
+        }
+
+    def notify(self, payment_id, action="payment.updated"):
+        webhooks.record_event({"action": action, "data": {"id": payment_id}})
+
+    def test_approved_payment_creates_pagamento_and_pays_fatura(self):
+        self.payment("500")
+        self.notify("500", "payment.created")
+        self.assertEqual(webhooks.process_batch(fetch=self.fetch), (1, 0))
+
+        pagamento = Pagamento.objects.get(transacao_id="500")
+        self.assertEqual(pagamento.status, "aprovado")
+        self.assertEqual(pagamento.metodo, "pix")
+        self.assertEqual(pagamento.valor, Decimal("300.00"))
+        self.assertIsNotNone(pagamento.data_pagamento)
+        self.fatura.refresh_from_db()
+        self.assertEqual(self.fatura.status, "paga")
+        self.assertEqual(EventoWebhook.objects.get().status, "processado")
+
+    def test_events_for_one_payment_share_a_fetch(self):
+        self.payment("501")
+        self.notify("501", "payment.created")
+        self.notify("501", "payment.updated")
+        self.assertEqual(webhooks.process_batch(fetch=self.fetch), (2, 0))
+        self.assertEqual(self.fetched, ["501"])
+        self.assertEqual(Pagamento.objects.filter(transacao_id="501").count(), 1)
+
+    def test_status_update_reuses_existing_pagamento(self):
+        self.payment("502", status="pending")
+        self.notify("502")
+        webhooks.process_batch(fetch=self.fetch)
+        self.assertEqual(Pagamento.objects.get(transacao_id="502").status, "pendente")
+
+        # A later payment.updated redelivers the same key and re-queues the row
+        self.payment("502", status="approved")
+        self.notify("502")
+        self.assertEqual(EventoWebhook.objects.get().status, "pendente")
+        webhooks.process_batch(fetch=self.fetch)
+
+        self.assertEqual(Pagamento.objects.get(transacao_id="502").status, "aprovado")
+        self.fatura.refresh_from_db()
+        self.assertEqual(self.fatura.status, "paga")
+
+    def test_partial_payment_does_not_settle_fatura(self):
+        self.payment("510", transaction_amount=100.0)
+        self.notify("510")
+        with self.assertLogs("faturas.webhooks", "WARNING"):
+            self.assertEqual(webhooks.process_batch(fetch=self.fetch), (1, 0))
+        self.fatura.refresh_from_db()
+        self.assertEqual((self.fatura.status, self.fatura.data_pagamento), ("pendente", None))
+        self.assertEqual(Pagamento.objects.get(transacao_id="510").status, "aprovado")
+
+        # A second approved payment covers the rest
+        self.payment("511", transaction_amount=200.0)
+        self.notify("511")
+        webhooks.process_batch(fetch=self.fetch)
+        self.fatura.refresh_from_db()
+        self.assertEqual(self.fatura.status, "paga")
+
+    def test_redelivery_keeps_attempt_history(self):
+        self.payments["512"] = ConnectionError("gateway down")
+        self.notify("512")
+        EventoWebhook.objects.update(tentativas=webhooks.MAX_ATTEMPTS - 1, proxima_tentativa=None)
+        self.notify("512")
+        evento = EventoWebhook.objects.get()
+        self.assertEqual(evento.tentativas, webhooks.MAX_ATTEMPTS - 1)
+        webhooks.process_batch(fetch=self.fetch)
+        self.assertEqual(EventoWebhook.objects.get().status, "falha")
+
+    def test_refund_moves_paid_fatura_to_reembolsada(self):
+        Fatura.objects.filter(pk=self.fatura.pk).update(status="paga")
+        self.payment("503", status="refunded")
+        self.notify("503")
+        webhooks.process_batch(fetch=self.fetch)
+        self.fatura.refresh_from_db()
+        self.assertEqual(self.fatura.status, "reembolsada")
+
+    def test_invalid_transition_leaves_fatura_alone(self):
+        Fatura.objects.filter(pk=self.fatura.pk).update(status="cancelada")
+        self.payment("504")
+        self.notify("504")
+        webhooks.process_batch(fetch=self.fetch)
+        self.fatura.refresh_from_db()
+        self.assertEqual(self.fatura.status, "cancelada")
+        self.assertEqual(Pagamento.objects.get(transacao_id="504").status, "aprovado")
+
+    def test_fetch_failure_backs_off_then_gives_up(self):
+        self.payments["505"] = ConnectionError("gateway down")
+        self.notify("505")
+        self.assertEqual(webhooks.process_batch(fetch=self.fetch), (0, 1))
+
+        evento = EventoWebhook.objects.get()
+        self.assertEqual((evento.status, evento.tentativas), ("pendente", 1))
+        self.assertIn("gateway down", evento.erro)
+        self.assertGreater(evento.proxima_tentativa, timezone.now())
+        # Not due yet
+        self.assertEqual(webhooks.process_batch(fetch=self.fetch), (0, 0))
+
+        EventoWebhook.objects.update(tentativas=webhooks.MAX_ATTEMPTS - 1, proxima_tentativa=None)
+        webhooks.process_batch(fetch=self.fetch)
+        self.assertEqual(EventoWebhook.objects.get().status, "falha")
+
+    def test_unknown_fatura_is_ignored_without_retry(self):
+        self.payment("506", external_reference="INV-0000-9999")
+        self.notify("506")
+        webhooks.process_batch(fetch=self.fetch)
+        evento = EventoWebhook.objects.get()
+        self.assertEqual(evento.status, "ignorado")
+        self.assertFalse(Pagamento.objects.exists())
+
+    def test_non_payment_actions_are_ignored_without_fetch(self):
+        self.notify("507", action="merchant_order.updated")
+        self.assertEqual(webhooks.process_batch(fetch=self.fetch), (1, 0))
+        self.assertEqual(EventoWebhook.objects.get().status, "ignorado")
+        self.assertEqual(self.fetched, [])
+
+    def test_redelivery_during_processing_is_not_lost(self):
+        self.payment("508", status="pending")
+        self.notify("508")
+
+        def fetch_and_redeliver(payment_id):
+            payment = self.fetch(payment_id)
+            self.notify(payment_id)
+            return payment
+
+        webhooks.process_batch(fetch=fetch_and_redeliver)
+        self.assertEqual(EventoWebhook.objects.get().status, "pendente")
+
+    def test_batch_query_count_is_independent_of_size(self):
+        for i in range(20):
+            fatura = Fatura.objects.create(cliente=self.user, data_vencimento=datetime.date.today())
+            self.payment(str(600 + i), external_reference=fatura.numero)
+            self.notify(str(600 + i))
+        # claim (select + lease) + faturas + pagamentos + insert + paid sums
+        # + fatura touch + fatura update + finish, inside savepoints
+        with self.assertNumQueries(13):
+            self.assertEqual(webhooks.process_batch(fetch=self.fetch), (20, 0))
+        self.assertEqual(Fatura.objects.filter(status="paga").count(), 20)
+
+
+# ─────────────────────────── Invoice PDF ────────────────────────────────────
+
+
+def pdf_text(data):
+    """Decoded text operands of every content stream in ``data``."""
+    streams = re.findall(rb"stream\n(.*?)\nendstream", data, re.S)
+    content = b"".join(zlib.decompress(s) for s in streams)
+    return b" ".join(re.findall(rb"\((.*?)\) Tj", content)).decode("cp1252")
+
+
+class FaturaPDFTest(TestCase):
+    """Tests for faturas.pdf and FaturaPDFView."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        pdf_dir = patch.object(pdf, "PDF_DIR", Path(tmp.name))
+        pdf_dir.start()
+        self.addCleanup(pdf_dir.stop)
+
+        self.user = make_user("pdf_user@example.com", "Cliente PDF")
+        self.fatura = Fatura.objects.create(
+            cliente=self.user,
+            data_vencimento=datetime.date.today(),
+            subtotal=Decimal("1500.00"),
+            desconto=Decimal("100.00"),
+            descricao="Desenvolvimento de site (fase 1)",
+        )
+        ItemFatura.objects.create(
+            fatura=self.fatura, descricao="Criação de layout", valor_unitario=Decimal("1000.00")
+        )
+        ItemFatura.objects.create(
+            fatura=self.fatura,
+            descricao="Hospedagem",
+            quantidade=2,
+            valor_unitario=Decimal("250.00"),
+        )
+        Pagamento.objects.create(
+            fatura=self.fatura, metodo="pix", valor=Decimal("1400.00"), status="aprovado"
+        )
+        self.fatura.refresh_from_db()
+        self.url = reverse("faturas:pdf", args=[self.fatura.numero])
+
+    def render(self, fatura=None):
+        return b"".join(pdf.render_fatura(fatura or self.fatura))
+
+    def test_renders_valid_pdf_structure(self):
+        data = self.render()
+        self.assertTrue(data.startswith(b"%PDF-1.4"))
+        self.assertTrue(data.endswith(b"%%EOF\n"))
+        # Every xref entry points at the start of its object
+        xref_at = int(re.search(rb"startxref\n(\d+)", data).group(1))
+        self.assertTrue(data[xref_at:].startswith(b"xref"))
+        entries = re.findall(rb"(\d{10}) 00000 n", data[xref_at:])
+        for num, offset in enumerate(entries, start=1):
+            self.assertTrue(data[int(offset) :].startswith(b"%d 0 obj" % num))
+
+    def test_content_includes_items_totals_and_payments(self):
+        text = pdf_text(self.render())
+        for expected in (
+            self.fatura.numero,
+            "Cliente PDF",
+            "Criação de layout",
+            "Hospedagem",
+            "R$ 1,000.00",
+            "R$ 1,400.00",
+            "PIX",
+            "Desenvolvimento de site \\(fase 1\\)",
+        ):
+            self.assertIn(expected, text)
+
+    def test_long_invoice_spans_pages(self):
+        ItemFatura.objects.bulk_create(
+            ItemFatura(fatura=self.fatura, descricao=f"Item {i}", valor_unitario=1, subtotal=1)
+            for i in range(120)
+        )
+        data = self.render()
+        count = int(re.search(rb"/Type /Pages /Kids \[.*?\] /Count (\d+)", data).group(1))
+        self.assertGreater(count, 2)
+        self.assertIn("Item 119", pdf_text(data))
+
+    def test_first_download_streams_and_caches(self):
+        self.client.force_login(self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertNotIsInstance(response, FileResponse)
+        body = b"".join(response.streaming_content)
+        self.assertTrue(body.startswith(b"%PDF"))
+        self.assertIn(self.fatura.numero, response["Content-Disposition"])
+
+        path = pdf.cache_path(self.fatura)
+        self.assertEqual(path.read_bytes(), body)
+
+        cached = self.client.get(self.url)
+        self.assertIsInstance(cached, FileResponse)
+        self.assertEqual(b"".join(cached.streaming_content), body)
+
+    @override_settings(FATURA_PDF_ACCEL_PREFIX="/protected/faturas/")
+    def test_cached_pdf_handed_to_nginx(self):
+        pdf.render_to_cache(self.fatura)
+        self.client.force_login(self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(
+            response["X-Accel-Redirect"], f"/protected/faturas/{pdf.cache_path(self.fatura).name}"
+        )
+        self.assertEqual(response.content, b"")
+
+    def test_change_invalidates_and_prunes_old_version(self):
+        old = pdf.render_to_cache(self.fatura)
+        ItemFatura.objects.create(
+            fatura=self.fatura, descricao="Extra", valor_unitario=Decimal("10.00")
+        )
+        self.fatura.refresh_from_db()
+        new = pdf.render_to_cache(self.fatura)
+        self.assertNotEqual(old, new)
+        self.assertFalse(old.exists())
+        self.assertIn("Extra", pdf_text(new.read_bytes()))
+
+    def test_cache_is_per_language(self):
+        with translation.override("pt-br"):
+            pt = pdf.render_to_cache(self.fatura)
+        with translation.override("en"):
+            en = pdf.render_to_cache(self.fatura)
+        self.assertNotEqual(pt, en)
+        # Rendering one language does not prune the other
+        self.assertTrue(pt.exists())
+
+    def test_stream_keeps_language_of_the_request(self):
+        with translation.override("en"):
+            stream = pdf.stream_to_cache(self.fatura)
+            path = pdf.cache_path(self.fatura)
+        with translation.override("pt-br"):
+            b"".join(stream)
+        self.assertTrue(path.exists())
+
+    def test_payment_delete_invalidates(self):
+        before = self.fatura.updated_at
+        self.fatura.pagamentos.get().delete()
+        self.fatura.refresh_from_db()
+        self.assertGreater(self.fatura.updated_at, before)
+
+    def test_payment_queryset_delete_invalidates(self):
+        before = self.fatura.updated_at
+        Pagamento.objects.filter(fatura=self.fatura).delete()
+        self.fatura.refresh_from_db()
+        self.assertGreater(self.fatura.updated_at, before)
+
+    def test_abandoned_stream_leaves_no_file(self):
+        stream = pdf.stream_to_cache(self.fatura)
+        next(stream)
+        stream.close()
+        self.assertEqual(list(pdf.PDF_DIR.iterdir()), [])
+
+    def test_other_clients_cannot_download(self):
+        self.client.force_login(make_user("outro_pdf@example.com", "Outro"))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_prerender_command(self):
+        other = Fatura.objects.create(cliente=self.user, data_vencimento=datetime.date.today())
+        out = StringIO()
+        call_command("render_fatura_pdfs", stdout=out)
+        self.assertIn("2 rendered", out.getvalue())
+        self.assertTrue(pdf.cache_path(other).exists())
+
+        out = StringIO()
+        call_command("render_fatura_pdfs", "--status", "pendente", stdout=out)
+        self.assertIn("0 rendered, 2 already cached", out.getvalue())
+
+
+# ─────────────────────────── Recurring billing ──────────────────────────────
+
+
+class BillingRunTest(TestCase):
+    """Tests for faturas.billing.run_billing (manage.py run_billing)."""
+
+    periodo = datetime.date(2026, 2, 1)
+
+    def setUp(self):
+        self.servico = Servico.objects.create(
+            nome_pt="Manutenção Mensal",
+            slug="manutencao-mensal",
+            preco=Decimal("300.00"),
+            tipo_preco="mensal",
+        )
+        self.adicional = Adicional.objects.create(
+            nome_pt="Backup", preco=Decimal("50.00"), tipo_cobranca="mensal"
+        )
+        self.user = make_user("billing@example.com", "Cliente Mensal")
+
+    def subscribe(self, user=None, **kwargs):
+        kwargs.setdefault("data_inicio", datetime.date(2026, 1, 1))
+        return Assinatura.objects.create(cliente=user or self.user, **kwargs)
+
+    def test_groups_subscriptions_into_one_fatura_per_client(self):
+        self.subscribe(servico=self.servico, dia_vencimento=15)
+        self.subscribe(adicional=self.adicional, quantidade=2, dia_vencimento=31)
+        self.subscribe(descricao="Suporte dedicado", valor=Decimal("99.90"))
+
+        result = billing.run_billing(self.periodo)
+        self.assertEqual((result.faturas, result.itens), (1, 3))
+
+        fatura = Fatura.objects.get()
+        self.assertEqual(fatura.subtotal, Decimal("499.90"))
+        self.assertEqual(fatura.valor_total, Decimal("499.90"))
+        self.assertEqual(fatura.status, "pendente")
+        self.assertEqual(fatura.data_vencimento, datetime.date(2026, 2, 10))
+        self.assertRegex(fatura.numero, r"^INV-\d{4}-\d{4}$")
+        self.assertIsNotNone(fatura.data_emissao)
+        itens = {i.descricao: (i.quantidade, i.subtotal) for i in fatura.itens.all()}
+        self.assertEqual(itens["Backup (02/2026)"], (2, Decimal("100.00")))
+        self.assertEqual(itens["Manutenção Mensal (02/2026)"], (1, Decimal("300.00")))
+
+    def test_due_date_clamped_to_month_end(self):
+        self.subscribe(servico=self.servico, dia_vencimento=31)
+        billing.run_billing(self.periodo)
+        self.assertEqual(Fatura.objects.get().data_vencimento, datetime.date(2026, 2, 28))
+
+    def test_separate_fatura_per_project(self):
+        from projetos.models import Projeto
+
+        projeto = Projeto.objects.create(cliente=self.user, nome="Loja", slug="loja-billing")
+        self.subscribe(servico=self.servico)
+        self.subscribe(servico=self.servico, projeto=projeto)
+        self.assertEqual(billing.run_billing(self.periodo).faturas, 2)
+        self.assertEqual(Fatura.objects.filter(projeto=projeto).count(), 1)
+
+    def test_cycle_is_billed_once(self):
+        assinatura = self.subscribe(servico=self.servico)
+        billing.run_billing(self.periodo)
+        self.assertEqual(billing.run_billing(self.periodo).faturas, 0)
+        assinatura.refresh_from_db()
+        self.assertEqual(assinatura.ultimo_ciclo, self.periodo)
+        # The next month is due again
+        self.assertEqual(billing.run_billing(datetime.date(2026, 3, 5)).faturas, 1)
+
+    def test_respects_active_window(self):
+        self.subscribe(servico=self.servico, ativa=False)
+        self.subscribe(servico=self.servico, data_inicio=datetime.date(2026, 3, 1))
+        self.subscribe(servico=self.servico, data_fim=datetime.date(2026, 1, 31))
+        self.assertEqual(billing.run_billing(self.periodo).faturas, 0)
+
+    def test_numbers_are_unique_and_consecutive_across_chunks(self):
+        users = [make_user(f"billing{i}@example.com", f"Cliente {i}") for i in range(7)]
+        Assinatura.objects.bulk_create(
+            Assinatura(cliente=u, servico=self.servico, data_inicio=datetime.date(2026, 1, 1))
+            for u in users
+        )
+        result = billing.run_billing(self.periodo, chunk_size=3)
+        self.assertEqual(result.faturas, 7)
+        suffixes = sorted(
+            int(n.rsplit("-", 1)[1]) for n in Fatura.objects.values_list("numero", flat=True)
+        )
+        self.assertEqual(suffixes, list(range(suffixes[0], suffixes[0] + 7)))
+
+    def billing_queries(self, clientes):
+        """Subscribe ``clientes`` new clients (two lines each) and count run_billing's queries."""
+        start = User.objects.count()
+        users = [
+            make_user(f"bulkq{start + i}@example.com", f"Cliente {i}") for i in range(clientes)
+        ]
+        Assinatura.objects.bulk_create(
+            Assinatura(cliente=u, servico=self.servico, data_inicio=datetime.date(2026, 1, 1))
+            for u in users
+            for _ in range(2)
+        )
+        with CaptureQueriesContext(connection) as queries:
+            result = billing.run_billing(self.periodo)
+        self.assertEqual((result.faturas, result.itens), (clientes, 2 * clientes))
+        return len(queries)
+
+    def test_queries_per_chunk_do_not_grow_with_invoices(self):
+        billing.allocate_numeros(Fatura, "INV", 1)  # seed the counter row
+        # Compared with a small run instead of a literal, so the count does not
+        # depend on the environment (session engine, cache backend)
+        self.assertEqual(self.billing_queries(30), self.billing_queries(3))
+
+    def test_command_reports_rate(self):
+        self.subscribe(servico=self.servico)
+        out = StringIO()
+        call_command("run_billing", "--periodo", "2026-02", stdout=out)
+        self.assertIn("1 faturas, 1 itens", out.getvalue())
+        self.assertIn("rows/s", out.getvalue())
+
+
+# ─────────────────────────── Overdue sweep ──────────────────────────────────
+
+
+class OverdueSweepTest(TestCase):
+    """Tests for faturas.overdue.sweep_overdue (manage.py mark_overdue_faturas)."""
+
+    today = datetime.date(2026, 3, 10)
+
+    def setUp(self):
+        self.user = make_user("overdue@example.com", "Cliente Atrasado")
+
+    def fatura(self, numero, vencimento, status="pendente", user=None):
+        return Fatura.objects.create(
+            numero=numero,
+            cliente=user or self.user,
+            data_vencimento=vencimento,
+            status=status,
+            subtotal=Decimal("1234.50"),
+        )
+
+    def test_moves_only_overdue_pendentes(self):
+        late = self.fatura("INV-2026-0101", datetime.date(2026, 3, 9))
+        due_today = self.fatura("INV-2026-0102", self.today)
+        paid = self.fatura("INV-2026-0103", datetime.date(2026, 2, 1), status="paga")
+        draft = self.fatura("INV-2026-0104", datetime.date(2026, 2, 1), status="rascunho")
+
+        result = overdue.sweep_overdue(self.today)
+        self.assertEqual(result.faturas, 1)
+        statuses = dict(Fatura.objects.values_list("pk", "status"))
+        self.assertEqual(statuses[late.pk], "vencida")
+        self.assertEqual(statuses[due_today.pk], "pendente")
+        self.assertEqual(statuses[paid.pk], "paga")
+        self.assertEqual(statuses[draft.pk], "rascunho")
+
+        late_updated = Fatura.objects.get(pk=late.pk).updated_at
+        self.assertGreater(late_updated, late.updated_at)
+
+    def test_creates_notification_and_queues_email(self):
+        self.fatura("INV-2026-0201", datetime.date(2026, 3, 1))
+        result = overdue.sweep_overdue(self.today)
+        self.assertEqual((result.notificacoes, result.emails), (1, 1))
+
+        notificacao = Notificacao.objects.get()
+        self.assertEqual(notificacao.usuario, self.user)
+        self.assertEqual((notificacao.tipo, notificacao.categoria), ("aviso", "fatura"))
+        self.assertIn("INV-2026-0201", notificacao.titulo)
+        self.assertIn("01/03/2026", notificacao.mensagem)
+        self.assertEqual(notificacao.url, reverse("faturas:detalhe", args=["INV-2026-0201"]))
+
+        email = LogEmail.objects.get()
+        self.assertEqual(email.destinatario, "overdue@example.com")
+        self.assertEqual((email.tipo, email.status), ("fatura_vencimento", "pendente"))
+        self.assertIsNone(email.proxima_tentativa)
+        self.assertIn("INV-2026-0201", email.assunto)
+        self.assertIn("venceu", email.conteudo)
+        self.assertIn("R$ 1.234,50", email.conteudo)
+        self.assertIn("Cliente Atrasado", email.conteudo_html)
+
+    def test_email_respects_client_preferences(self):
+        User.objects.filter(pk=self.user.pk).update(notificacoes_email=False)
+        self.fatura("INV-2026-0301", datetime.date(2026, 3, 1))
+        result = overdue.sweep_overdue(self.today)
+        self.assertEqual((result.faturas, result.notificacoes, result.emails), (1, 1, 0))
+        self.assertFalse(LogEmail.objects.exists())
+
+    def test_second_sweep_is_a_no_op(self):
+        self.fatura("INV-2026-0401", datetime.date(2026, 3, 1))
+        overdue.sweep_overdue(self.today)
+        result = overdue.sweep_overdue(self.today)
+        self.assertEqual((result.faturas, result.notificacoes, result.emails), (0, 0, 0))
+        self.assertEqual(Notificacao.objects.count(), 1)
+
+    def test_queries_per_chunk_do_not_grow_with_invoices(self):
+        users = [make_user(f"overdue{i}@example.com", f"Cliente {i}") for i in range(20)]
+        for i, user in enumerate(users):
+            self.fatura(f"INV-2026-{i + 500:04d}", datetime.date(2026, 2, 1), user=user)
+        # chunks of 10: (select, update, notificacao insert, counter update, email
+        # insert) x 2 plus the empty select, each inside a savepoint
+        with self.assertNumQueries(17):
+            result = overdue.sweep_overdue(self.today, chunk_size=10)
+        self.assertEqual((result.faturas, result.emails), (20, 20))
+        self.assertEqual(Fatura.objects.filter(status="vencida").count(), 20)
+
+    def test_command_reports_counts(self):
+        self.fatura("INV-2026-0601", datetime.date(2026, 3, 1))
+        out = StringIO()
+        call_command("mark_overdue_faturas", "--date", "2026-03-10", stdout=out)
+        self.assertIn("1 faturas vencidas, 1 notificações, 1 emails queued", out.getvalue())
+        self.assertEqual(Fatura.objects.get().status, "vencida")
@@ -7,13 +7,15 @@ import logging
 
 from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.http import HttpResponse, JsonResponse
+from django.http import FileResponse, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 from django.views.generic import DetailView, ListView, TemplateView, View
 
-from .models import Fatura, Pagamento
+from . import pdf
+from .models import Fatura
+from .webhooks import record_event
 
 logger = logging.getLogger(__name__)
 
@@ -56,12 +58,37 @@ class FaturaPagarView(LoginRequiredMixin, TemplateView):
 
 
 class FaturaPDFView(LoginRequiredMixin, View):
-    """Generate PDF for invoice."""
+    """
+    Invoice PDF download.
+
+    The first request for a version of the fatura streams the PDF while writing
+    it to the cache (``faturas.pdf``); later requests send the cached file with
+    ``FileResponse``, or hand it to nginx with ``X-Accel-Redirect`` when
+    ``FATURA_PDF_ACCEL_PREFIX`` is set.
+    """
 
     def get(self, request, numero):
-        fatura = get_object_or_404(Fatura, numero=numero, cliente=request.user)
-        response = HttpResponse(content_type="application/pdf")
+        fatura = get_object_or_404(
+            Fatura.objects.select_related("cliente"), numero=numero, cliente=request.user
+        )
+        path = pdf.cache_path(fatura)
+        accel_prefix = getattr(settings, "FATURA_PDF_ACCEL_PREFIX", "")
+        response = None
+        if path.exists():
+            if accel_prefix:
+                response = HttpResponse(content_type="application/pdf")
+                response["X-Accel-Redirect"] = f"{accel_prefix}{path.name}"
+            else:
+                try:
+                    response = FileResponse(path.open("rb"), content_type="application/pdf")
+                except FileNotFoundError:
+                    pass  # Pruned by a newer rendering in the meantime
+        if response is None:
+            response = StreamingHttpResponse(
+                pdf.stream_to_cache(fatura), content_type="application/pdf"
+            )
         response["Content-Disposition"] = f'attachment; filename="{fatura.numero}.pdf"'
+        response["Cache-Control"] = "private, no-cache"
         return response
 
 
@@ -75,6 +102,9 @@ class MercadoPagoWebhookView(View):
     - v1: HMAC-SHA256 signature
 
     The signature is computed over: id={data.id};request-id={x-request-id};ts={ts};
+
+    Verified notifications are stored as ``EventoWebhook`` rows and acknowledged
+    immediately; ``manage.py process_payment_events`` applies them.
     """
 
     def _parse_signature_header(self, signature_header):
@@ -143,23 +173,9 @@ class MercadoPagoWebhookView(View):
                 )
                 return JsonResponse({"error": "Invalid signature"}, status=401)
 
-            action = data.get("action")
-            payment_id = data.get("data", {}).get("id")
-
-            if action == "payment.created" and payment_id:
-                # Security (4.1): Idempotency check — reject duplicate webhooks
-                # for the same transaction ID to prevent replay attacks.
-                transacao_id = str(payment_id)
-                if Pagamento.objects.filter(transacao_id=transacao_id).exists():
-                    logger.info(
-                        f"Duplicate webhook ignored (already processed): "
-                        f"transacao_id={transacao_id}"
-                    )
-                    return JsonResponse({"status": "already processed"})
-
-                logger.info(f"Processing payment notification: {payment_id}")
-                # TODO: Implement payment processing logic
-                # self._process_payment(payment_id)
+            # Persist and acknowledge; faturas.webhooks.process_batch does the work.
+            # The unique (transacao_id, acao) constraint absorbs duplicate deliveries.
+            record_event(data)
 
             return JsonResponse({"status": "ok"})
 
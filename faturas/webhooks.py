@@ -0,0 +1,298 @@
+"""
+Mercado Pago notification pipeline.
+
+``MercadoPagoWebhookView`` only verifies the signature and calls ``record_event``
+(a single upsert on ``EventoWebhook``), so the webhook answers in constant time
+however busy the gateway is. ``process_batch`` — run by the
+``process_payment_events`` management command — claims due events, fetches each
+payment once from the Mercado Pago API and applies the results to
+``Pagamento``/``Fatura`` in bulk, retrying failures with exponential backoff.
+"""
+
+import logging
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import EventoWebhook, Fatura, Pagamento
+
+logger = logging.getLogger(__name__)
+
+# Attempts before an event is marked "falha" for good
+MAX_ATTEMPTS = getattr(settings, "MERCADOPAGO_EVENT_MAX_ATTEMPTS", 8)
+
+# Delay before retry N is BACKOFF_BASE * 2 ** (N - 1) seconds, capped at BACKOFF_MAX
+BACKOFF_BASE = getattr(settings, "MERCADOPAGO_EVENT_BACKOFF_BASE", 30)
+BACKOFF_MAX = getattr(settings, "MERCADOPAGO_EVENT_BACKOFF_MAX", 60 * 60)
+
+# How long a claimed event stays invisible to other workers. A worker that dies
+# mid-batch simply lets the lease expire and the events become due again.
+CLAIM_LEASE = timedelta(minutes=5)
+
+PAYMENT_ACTIONS = {"payment.created", "payment.updated"}
+
+# Mercado Pago payment status -> Pagamento.status
+STATUS_MAP = {
+    "approved": "aprovado",
+    "authorized": "processando",
+    "in_process": "processando",
+    "in_mediation": "processando",
+    "pending": "pendente",
+    "rejected": "recusado",
+    "cancelled": "cancelado",
+    "refunded": "reembolsado",
+    "charged_back": "reembolsado",
+}
+
+# Mercado Pago payment_type_id -> Pagamento.metodo
+METODO_MAP = {
+    "credit_card": "cartao_credito",
+    "debit_card": "cartao_debito",
+    "prepaid_card": "cartao_debito",
+    "ticket": "boleto",
+    "bank_transfer": "transferencia",
+    "account_money": "transferencia",
+}
+
+# Pagamento.status -> Fatura.status it drives (subject to Fatura.VALID_TRANSITIONS)
+FATURA_STATUS = {"aprovado": "paga", "reembolsado": "reembolsada"}
+
+
+class UnmatchedPaymentError(Exception):
+    """The payment has no matching Fatura; retrying will not help."""
+
+
+def record_event(payload):
+    """
+    Store a verified notification for the worker. Returns False if it carries no id.
+
+    Redeliveries of the same (transacao_id, acao) collapse onto one row and put it
+    back in the queue, so a ``payment.updated`` that arrives after the previous one
+    was processed is still picked up. The attempt count and last error are kept, so
+    an event that keeps failing still reaches ``MAX_ATTEMPTS``.
+    """
+    data_id = (payload.get("data") or {}).get("id")
+    if not data_id:
+        return False
+    EventoWebhook.objects.bulk_create(
+        [
+            EventoWebhook(
+                transacao_id=str(data_id)[:100],
+                acao=str(payload.get("action") or payload.get("type") or "")[:50],
+                payload=payload,
+                status="pendente",
+            )
+        ],
+        update_conflicts=True,
+        unique_fields=["transacao_id", "acao"],
+        update_fields=["payload", "status", "proxima_tentativa"],
+    )
+    return True
+
+
+def pending_events(now=None):
+    """Pending events whose next attempt (or expired claim) is due, oldest first."""
+    now = now or timezone.now()
+    return EventoWebhook.objects.filter(
+        Q(proxima_tentativa__isnull=True) | Q(proxima_tentativa__lte=now), status="pendente"
+    ).order_by("created_at", "id")
+
+
+def backoff_delay(tentativas):
+    return timedelta(seconds=min(BACKOFF_BASE * 2 ** max(tentativas - 1, 0), BACKOFF_MAX))
+
+
+def fetch_payment(payment_id):
+    """Fetch a payment from the Mercado Pago API (``GET /v1/payments/<id>``)."""
+    access_token = getattr(settings, "MERCADOPAGO_ACCESS_TOKEN", "")
+    if not access_token:
+        raise ImproperlyConfigured("MERCADOPAGO_ACCESS_TOKEN is not configured")
+    import mercadopago
+
+    result = mercadopago.SDK(access_token).payment().get(payment_id)
+    if result.get("status") != 200:
+        raise RuntimeError(
+            f"Mercado Pago returned {result.get('status')}: {result.get('response')}"
+        )
+    return result["response"]
+
+
+def process_batch(batch_size=100, fetch=fetch_payment):
+    """
+    Claim and apply up to ``batch_size`` due events.
+
+    Events are claimed with ``SELECT ... FOR UPDATE SKIP LOCKED`` and leased for
+    ``CLAIM_LEASE``; the API calls happen outside any transaction. Several events
+    for the same payment cost one fetch. Returns ``(processed, failed)`` counts.
+    """
+    now = timezone.now()
+    lease = now + CLAIM_LEASE
+    with transaction.atomic():
+        events = list(pending_events(now).select_for_update(skip_locked=True)[:batch_size])
+        if not events:
+            return 0, 0
+        EventoWebhook.objects.filter(pk__in=[e.pk for e in events]).update(proxima_tentativa=lease)
+
+    ignored = [e for e in events if e.acao not in PAYMENT_ACTIONS]
+    by_payment = {}
+    for event in events:
+        if event.acao in PAYMENT_ACTIONS:
+            by_payment.setdefault(event.transacao_id, []).append(event)
+
+    payments, errors = {}, {}
+    for transacao_id in by_payment:
+        try:
+            payments[transacao_id] = fetch(transacao_id)
+        except Exception as exc:
+            errors[transacao_id] = exc
+
+    if payments:
+        try:
+            errors.update(apply_payments(payments, now))
+        except Exception as exc:
+            logger.exception("Applying Mercado Pago payments failed")
+            errors.update(dict.fromkeys(payments, exc))
+
+    done = [e for tid, evts in by_payment.items() if tid not in errors for e in evts]
+    failed = [e for tid, evts in by_payment.items() if tid in errors for e in evts]
+
+    # Only finish rows still holding our lease; a redelivery that arrived while we
+    # were working reset proxima_tentativa and must be processed again.
+    finished_at = timezone.now()
+    _finish(done, lease, status="processado", processado_at=finished_at, erro="")
+    _finish(ignored, lease, status="ignorado", processado_at=finished_at, erro="")
+    for event in failed:
+        exc = errors[event.transacao_id]
+        if isinstance(exc, UnmatchedPaymentError):
+            _finish([event], lease, status="ignorado", processado_at=finished_at, erro=str(exc))
+        else:
+            record_failure(event, exc, lease, finished_at)
+    return len(done) + len(ignored), len(failed)
+
+
+def _finish(events, lease, **fields):
+    if events:
+        EventoWebhook.objects.filter(pk__in=[e.pk for e in events], proxima_tentativa=lease).update(
+            proxima_tentativa=None, **fields
+        )
+
+
+def record_failure(event, exc, lease, now):
+    """Store the error and schedule a retry, or give up after ``MAX_ATTEMPTS``."""
+    tentativas = event.tentativas + 1
+    fields = {"tentativas": tentativas, "erro": f"{type(exc).__name__}: {exc}"[:2000]}
+    if tentativas >= MAX_ATTEMPTS:
+        fields.update(status="falha", proxima_tentativa=None)
+    else:
+        fields["proxima_tentativa"] = now + backoff_delay(tentativas)
+    EventoWebhook.objects.filter(pk=event.pk, proxima_tentativa=lease).update(**fields)
+    logger.warning("Mercado Pago event %s (%s) failed: %s", event.pk, event.transacao_id, exc)
+
+
+def apply_payments(payments, now=None):
+    """
+    Upsert ``Pagamento`` rows and advance their Faturas for ``{transacao_id: payment}``.
+
+    Uses a fixed number of queries per batch. A Fatura only becomes ``paga`` once
+    its approved payments add up to ``valor_total``. Returns
+    ``{transacao_id: exception}`` for payments that could not be applied.
+    """
+    now = now or timezone.now()
+    errors = {}
+    numeros = {str(p.get("external_reference") or "") for p in payments.values()}
+    with transaction.atomic():
+        # Locked so valor_total cannot move while the paid amount is compared with it
+        faturas = Fatura.objects.select_for_update().in_bulk(numeros - {""}, field_name="numero")
+        existing = {}
+        for pagamento in Pagamento.objects.filter(
+            gateway="mercadopago", transacao_id__in=list(payments)
+        ).order_by("id"):
+            existing.setdefault(pagamento.transacao_id, pagamento)
+
+        to_create, to_update = [], []
+        fatura_status = {}
+        for transacao_id, payment in payments.items():
+            fatura = faturas.get(str(payment.get("external_reference") or ""))
+            if fatura is None:
+                errors[transacao_id] = UnmatchedPaymentError(
+                    f"No fatura for external_reference={payment.get('external_reference')!r}"
+                )
+                continue
+            try:
+                valor = Decimal(str(payment.get("transaction_amount")))
+            except InvalidOperation:
+                errors[transacao_id] = ValueError("Invalid transaction_amount")
+                continue
+
+            status = STATUS_MAP.get(payment.get("status"), "pendente")
+            pagamento = existing.get(transacao_id) or Pagamento(
+                fatura=fatura, transacao_id=transacao_id, gateway="mercadopago"
+            )
+            pagamento.status = status
+            pagamento.valor = valor
+            pagamento.metodo = _metodo(payment)
+            pagamento.dados_gateway = payment
+            if status == "aprovado":
+                pagamento.data_pagamento = parse_datetime(payment.get("date_approved") or "") or now
+            pagamento.updated_at = now
+            (to_update if pagamento.pk else to_create).append(pagamento)
+            if status in FATURA_STATUS:
+                fatura_status[pagamento.fatura_id] = FATURA_STATUS[status]
+
+        Pagamento.objects.bulk_create(to_create)
+        Pagamento.objects.bulk_update(
+            to_update,
+            ["status", "valor", "metodo", "dados_gateway", "data_pagamento", "updated_at"],
+        )
+
+        _hold_underpaid(faturas, fatura_status)
+
+        # Payments show on the invoice PDF; refresh its cache key
+        Fatura.objects.filter(pk__in={p.fatura_id for p in to_create + to_update}).update(
+            updated_at=now
+        )
+        for target in set(fatura_status.values()):
+            ids = [pk for pk, s in fatura_status.items() if s == target]
+            extra = {"data_pagamento": timezone.localdate(now)} if target == "paga" else {}
+            Fatura.objects.filter(pk__in=ids, status__in=Fatura.statuses_allowing(target)).update(
+                status=target, updated_at=now, **extra
+            )
+    return errors
+
+
+def _hold_underpaid(faturas, fatura_status):
+    """Drop the ``paga`` target of faturas whose approved payments fall short of the total."""
+    paid_ids = {pk for pk, target in fatura_status.items() if target == "paga"}
+    if not paid_ids:
+        return
+    pagos = dict(
+        Pagamento.objects.filter(fatura_id__in=paid_ids, status="aprovado")
+        .order_by()
+        .values("fatura_id")
+        .annotate(total=Sum("valor"))
+        .values_list("fatura_id", "total")
+    )
+    for fatura in faturas.values():
+        if fatura.pk not in paid_ids:
+            continue
+        pago = pagos.get(fatura.pk) or Decimal("0.00")
+        if pago < fatura.valor_total:
+            del fatura_status[fatura.pk]
+            logger.warning(
+                "Fatura %s not marked paga: approved payments %s < valor_total %s",
+                fatura.numero,
+                pago,
+                fatura.valor_total,
+            )
+
+
+def _metodo(payment):
+    if payment.get("payment_method_id") == "pix":
+        return "pix"
+    return METODO_MAP.get(payment.get("payment_type_id"), "pix")
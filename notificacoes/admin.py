@@ -1,7 +1,8 @@
 from django.contrib import admin
 from django.utils.html import format_html
 
-from .models import ConfiguracaoNotificacao, LogEmail, Notificacao
+from . import unread
+from .models import ConfiguracaoNotificacao, ContadorNaoLidos, LogEmail, Notificacao
 
 
 @admin.register(Notificacao)
@@ -36,9 +37,11 @@ class LogEmailAdmin(admin.ModelAdmin):
         "tipo",
         "assunto",
         "conteudo",
+        "conteudo_html",
         "status",
         "erro",
         "tentativas",
+        "proxima_tentativa",
         "enviado_at",
         "created_at",
     ]
@@ -91,3 +94,20 @@ class ConfiguracaoNotificacaoAdmin(admin.ModelAdmin):
             {"fields": ("push_atualizacao_projeto", "push_nova_fatura", "push_resposta_ticket")},
         ),
     )
+
+
+@admin.register(ContadorNaoLidos)
+class ContadorNaoLidosAdmin(admin.ModelAdmin):
+    list_display = ["usuario", "notificacoes", "mensagens", "updated_at"]
+    search_fields = ["usuario__email", "usuario__nome_completo"]
+    readonly_fields = ["usuario", "notificacoes", "mensagens", "updated_at"]
+    actions = ["recalcular_action"]
+
+    @admin.action(description="Recalcular a partir das notificações e mensagens")
+    def recalcular_action(self, request, queryset):
+        usuarios = list(queryset.values_list("usuario_id", flat=True))
+        unread.recalcular(usuarios)
+        self.message_user(request, f"{len(usuarios)} contador(es) recalculado(s).")
+
+    def has_add_permission(self, request):
+        return False
@@ -6,3 +6,6 @@ class NotificacoesConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "notificacoes"
     verbose_name = _("Notificações")
+
+    def ready(self):
+        from . import signals  # noqa: F401
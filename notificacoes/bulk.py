@@ -0,0 +1,326 @@
+"""
+Bulk email engine for campaigns (newsletter, invoice due-date reminders).
+
+- Recipients are streamed with ``.iterator()`` and handled in fixed-size chunks,
+  so memory stays bounded whatever the audience size.
+- Each template is rendered once per language with ``${field}`` placeholders;
+  per-recipient values are spliced in (HTML-escaped in the HTML part).
+- One SMTP connection is opened for the whole run and reused for every message.
+- Every message gets a ``LogEmail`` row: a chunk is inserted with
+  ``bulk_create`` before sending and finalized with ``bulk_update`` afterwards.
+  Failures stay ``pendente`` with a backoff, so the outbox worker
+  (``send_queued_emails``) retries them.
+"""
+
+import html
+import logging
+import re
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.template.loader import render_to_string
+from django.utils import dateformat, formats, numberformat, timezone, translation
+from django.utils.html import strip_tags
+from django.utils.translation import gettext_lazy as _
+
+from .models import ConfiguracaoNotificacao, LogEmail
+from .outbox import record_failure
+
+logger = logging.getLogger(__name__)
+
+# Rows of an in-flight chunk are leased for this long so the outbox worker
+# does not pick them up before the bulk sender finalizes them
+CHUNK_LEASE = timedelta(minutes=10)
+
+
+@dataclass
+class BulkResult:
+    total: int = 0
+    sent: int = 0
+    failed: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def rate(self):
+        """Messages handled per second."""
+        return self.total / self.elapsed if self.elapsed else 0.0
+
+
+class Placeholders:
+    """
+    Text with ``${field}`` markers, pre-split so filling it is a single join.
+
+    Only the given field names are recognised; any other ``$`` in the text
+    (prices, newsletter copy) is left untouched.
+    """
+
+    def __init__(self, text, names):
+        if names:
+            pattern = "|".join(re.escape(name) for name in names)
+            self.parts = re.split(rf"\$\{{({pattern})\}}", text)
+        else:
+            self.parts = [text]
+
+    def fill(self, values):
+        parts = self.parts[:]
+        # re.split puts captured field names at odd indexes
+        for i in range(1, len(parts), 2):
+            parts[i] = values[parts[i]]
+        return "".join(parts)
+
+
+@dataclass
+class RenderedTemplate:
+    """Subject/text/HTML for one language, with per-recipient placeholders left in."""
+
+    subject: Placeholders
+    text: Placeholders
+    html: Placeholders
+
+    def render(self, fields):
+        fields = {key: str(value) for key, value in fields.items()}
+        escaped = {key: html.escape(value) for key, value in fields.items()}
+        return self.subject.fill(fields), self.text.fill(fields), self.html.fill(escaped)
+
+
+class Campaign:
+    """
+    A bulk mailing: who receives it and what they get.
+
+    Subclasses provide ``tipo``, ``template_name``, ``subject`` (translatable),
+    ``placeholders`` (per-recipient field names) and ``recipients()``, which must
+    yield ``(email, language, fields)`` tuples lazily.
+    """
+
+    tipo = None
+    template_name = None
+    subject = ""
+    placeholders = ()
+
+    def recipients(self):
+        raise NotImplementedError
+
+    def context(self):
+        """Extra context shared by every recipient."""
+        return {}
+
+    def render(self, language):
+        """Render subject and body once for ``language``."""
+        markers = {name: f"${{{name}}}" for name in self.placeholders}
+        with translation.override(language):
+            body = render_to_string(
+                self.template_name, {**self.context(), **markers, "LANGUAGE_CODE": language}
+            )
+            subject = str(self.subject)
+        names = self.placeholders
+        return RenderedTemplate(
+            Placeholders(subject, names),
+            Placeholders(html.unescape(strip_tags(body)).strip(), names),
+            Placeholders(body, names),
+        )
+
+
+class NewsletterCampaign(Campaign):
+    """Newsletter to everyone with ``ConfiguracaoNotificacao.email_newsletter`` on."""
+
+    tipo = "newsletter"
+    placeholders = ("nome",)
+
+    def __init__(self, subject, template_name="emails/newsletter.html", **context):
+        self.subject = subject
+        self.template_name = template_name
+        self.extra_context = context
+
+    def context(self):
+        return self.extra_context
+
+    def recipients(self):
+        rows = (
+            ConfiguracaoNotificacao.objects.filter(email_newsletter=True, usuario__is_active=True)
+            .order_by("pk")
+            .values_list("usuario__email", "usuario__idioma_preferido", "usuario__nome_completo")
+        )
+        for email, language, nome in rows.iterator(chunk_size=2000):
+            yield email, language, {"nome": nome}
+
+
+class FaturaVencimentoCampaign(Campaign):
+    """Reminder for pending invoices due exactly ``dias`` days from today."""
+
+    tipo = "fatura_vencimento"
+    template_name = "emails/fatura_vencimento.html"
+    subject = _("Sua fatura ${numero} vence em ${vencimento}")
+    placeholders = ("nome", "numero", "valor", "vencimento")
+
+    def __init__(self, dias=3):
+        self.due_date = timezone.localdate() + timedelta(days=dias)
+        self._formats = {}
+
+    def recipients(self):
+        from faturas.models import Fatura
+
+        rows = (
+            Fatura.objects.filter(
+                status="pendente",
+                data_vencimento=self.due_date,
+                cliente__is_active=True,
+                cliente__notificacoes_email=True,
+            )
+            .order_by("pk")
+            .values_list(
+                "cliente__email",
+                "cliente__idioma_preferido",
+                "cliente__nome_completo",
+                "numero",
+                "valor_total",
+                "data_vencimento",
+            )
+        )
+        for row in rows.iterator(chunk_size=2000):
+            yield self._recipient(*row)
+
+    def _recipient(self, email, language, nome, numero, valor, vencimento):
+        date_format, decimal_sep, thousand_sep = self._language_formats(language)
+        return (
+            email,
+            language,
+            {
+                "nome": nome,
+                "numero": numero,
+                "valor": "R$ "
+                + numberformat.format(valor, decimal_sep, 2, 3, thousand_sep, force_grouping=True),
+                "vencimento": dateformat.format(vencimento, date_format),
+            },
+        )
+
+    def _language_formats(self, language):
+        if language not in self._formats:
+            self._formats[language] = (
+                formats.get_format("SHORT_DATE_FORMAT", lang=language),
+                formats.get_format("DECIMAL_SEPARATOR", lang=language),
+                formats.get_format("THOUSAND_SEPARATOR", lang=language),
+            )
+        return self._formats[language]
+
+
+class FaturaVencidaCampaign(FaturaVencimentoCampaign):
+    """
+    Overdue notice for invoices the sweeper just moved to ``vencida``.
+
+    ``rows`` are ``(email, language, nome, numero, valor, vencimento)`` tuples.
+    """
+
+    subject = _("Sua fatura ${numero} venceu em ${vencimento}")
+
+    def __init__(self, rows=()):
+        self.rows = rows
+        self._formats = {}
+
+    def context(self):
+        return {"vencida": True}
+
+    def recipients(self):
+        for row in self.rows:
+            yield self._recipient(*row)
+
+
+def campaign_logs(campaign, recipients, rendered, **fields):
+    """
+    ``LogEmail`` instances (unsaved) for ``recipients`` of ``campaign``.
+
+    ``rendered`` caches the per-language templates across calls; ``fields`` are
+    extra model fields set on every row.
+    """
+    logs = []
+    for email, language, values in recipients:
+        language = language or settings.LANGUAGE_CODE
+        if language not in rendered:
+            rendered[language] = campaign.render(language)
+        subject, text, body = rendered[language].render(values)
+        logs.append(
+            LogEmail(
+                destinatario=email,
+                tipo=campaign.tipo,
+                assunto=subject[:255],
+                conteudo=text,
+                conteudo_html=body,
+                status="pendente",
+                **fields,
+            )
+        )
+    return logs
+
+
+def queue_campaign(campaign, rendered=None):
+    """Queue ``campaign`` for the outbox worker in one ``bulk_create``; returns the rows."""
+    logs = campaign_logs(campaign, campaign.recipients(), {} if rendered is None else rendered)
+    return LogEmail.objects.bulk_create(logs)
+
+
+def send_campaign(campaign, chunk_size=500, connection=None, progress=None):
+    """
+    Send ``campaign`` to all its recipients and return a ``BulkResult``.
+
+    ``progress`` is called with the running ``BulkResult`` after each chunk.
+    """
+    result = BulkResult()
+    rendered = {}
+    recipients = campaign.recipients()
+    connection = connection or get_connection(fail_silently=False)
+    start = time.perf_counter()
+    connection.open()
+    try:
+        while chunk := list(islice(recipients, chunk_size)):
+            logs = campaign_logs(
+                campaign, chunk, rendered, proxima_tentativa=timezone.now() + CHUNK_LEASE
+            )
+            LogEmail.objects.bulk_create(logs)
+            try:
+                _send_chunk(connection, logs, result)
+            finally:
+                # Rows never attempted (e.g. SMTP went away) stay leased "pendente"
+                # and are delivered by the outbox worker once the lease expires
+                LogEmail.objects.bulk_update(
+                    logs, ["status", "erro", "tentativas", "proxima_tentativa", "enviado_at"]
+                )
+            result.elapsed = time.perf_counter() - start
+            if progress:
+                progress(result)
+    finally:
+        connection.close()
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def _send_chunk(connection, logs, result):
+    now = timezone.now()
+    for log in logs:
+        log.tentativas = 1
+        result.total += 1
+        message = EmailMultiAlternatives(
+            subject=log.assunto,
+            body=log.conteudo,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[log.destinatario],
+            connection=connection,
+        )
+        message.attach_alternative(log.conteudo_html, "text/html")
+        try:
+            # One message per call so a failure is attributed to the right row;
+            # the SMTP session stays open across calls
+            connection.send_messages([message])
+        except Exception as exc:
+            result.failed += 1
+            record_failure(log, exc, now)
+            # The session may be broken; reconnect for the rest of the run
+            connection.close()
+            connection.open()
+        else:
+            result.sent += 1
+            log.status = "enviado"
+            log.enviado_at = now
+            log.proxima_tentativa = None
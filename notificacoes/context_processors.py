@@ -0,0 +1,15 @@
+"""
+Notificacoes context processors.
+"""
+
+from django.utils.functional import SimpleLazyObject
+
+
+def nao_lidos(request):
+    """Unread badge counts; looked up only when a template uses them."""
+    user = getattr(request, "user", None)
+    if user is None or not user.is_authenticated:
+        return {}
+    from . import unread
+
+    return {"nao_lidos": SimpleLazyObject(lambda: unread.get_counts(user.pk))}
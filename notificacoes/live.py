@@ -0,0 +1,260 @@
+"""
+Live events for the client area, streamed as Server-Sent Events.
+
+- ``publish`` hands a new ``Notificacao``, ``TimelineEvento`` or
+  ``RespostaTicket`` to the users who should see it; ``notificacoes.signals``
+  calls it once the creating transaction commits. The SSE frame is encoded once
+  per event, however many connections receive it.
+- The broker keeps one bounded ``asyncio.Queue`` per open stream, keyed by
+  user. An idle connection is a suspended coroutine: no thread and no database
+  connection is held while it waits.
+- With ``LIVE_EVENTS_REDIS_URL`` set (defaults to ``REDIS_URL``) events go
+  through a Redis pub/sub channel, so publishers in other processes (WSGI
+  workers, management commands) reach streams served by any ASGI worker.
+  Pub/sub does not buffer, so a stream only starts once the channel
+  subscription is confirmed (or ``LIVE_EVENTS_SUBSCRIBE_TIMEOUT`` passes).
+  Without it, only streams in the publishing process are reached.
+- A stream ends after ``LIVE_EVENTS_MAX_AGE`` seconds, or when its queue
+  overflows; ``EventSource`` reconnects by itself. Django 4.2 does not notice a
+  client disconnect while streaming, so the age limit is what bounds
+  abandoned streams.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+try:
+    import redis
+    import redis.asyncio
+except ImportError:  # pragma: no cover - redis is optional for live events
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+REDIS_CHANNEL = "ecommdev:live"
+
+
+def frame(evento, dados):
+    """Encode one SSE message."""
+    data = json.dumps(dados, cls=DjangoJSONEncoder, separators=(",", ":"))
+    return f"event: {evento}\ndata: {data}\n\n".encode()
+
+
+class Subscription:
+    """One open stream: a bounded queue owned by the event loop serving it."""
+
+    def __init__(self, usuario_id, loop, maxsize):
+        self.usuario_id = usuario_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize)
+
+    def put(self, message):
+        """Queue ``message`` from any thread."""
+        self.loop.call_soon_threadsafe(self._put, message)
+
+    def _put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Too far behind: end the stream (None) so the client reconnects
+            self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class Broker:
+    """In-process fan-out from publishers to the streams of this process."""
+
+    def __init__(self):
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    async def subscribe(self, usuario_id):
+        return self._add(usuario_id)
+
+    def _add(self, usuario_id):
+        maxsize = getattr(settings, "LIVE_EVENTS_QUEUE_SIZE", 100)
+        subscription = Subscription(usuario_id, asyncio.get_running_loop(), maxsize)
+        with self._lock:
+            self._subscriptions[usuario_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.usuario_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.usuario_id]
+
+    def subscribers(self, usuario_id):
+        """Open streams of ``usuario_id`` in this process."""
+        with self._lock:
+            return len(self._subscriptions.get(usuario_id, ()))
+
+    def publish(self, usuario_ids, message):
+        self.deliver(usuario_ids, message)
+
+    def deliver(self, usuario_ids, message):
+        with self._lock:
+            targets = [s for pk in set(usuario_ids) for s in self._subscriptions.get(pk, ())]
+        for subscription in targets:
+            try:
+                subscription.put(message)
+            except RuntimeError:
+                # Its event loop is gone; the stream will never read again
+                self.unsubscribe(subscription)
+
+
+class RedisBroker(Broker):
+    """
+    Broker that relays every event through a Redis channel.
+
+    Each event loop serving streams runs one listener task that delivers what
+    arrives on the channel to its local subscriptions.
+    """
+
+    def __init__(self, url, channel=REDIS_CHANNEL):
+        super().__init__()
+        self.url = url
+        self.channel = channel
+        self._client = redis.Redis.from_url(url)
+        # Event loop -> (listener task, asyncio.Event set once the channel is subscribed)
+        self._listeners = {}
+
+    async def subscribe(self, usuario_id):
+        subscription = self._add(usuario_id)
+        ready = self._listener(subscription.loop)
+        try:
+            await asyncio.wait_for(
+                ready.wait(), getattr(settings, "LIVE_EVENTS_SUBSCRIBE_TIMEOUT", 5)
+            )
+        except TimeoutError:
+            logger.warning("Live events: Redis subscription not ready, events may be missed")
+        except BaseException:
+            self.unsubscribe(subscription)
+            raise
+        return subscription
+
+    def _listener(self, loop):
+        """Start ``loop``'s listener task if needed and return its readiness event."""
+        with self._lock:
+            # Loops that served streams earlier (e.g. one per request) may be closed now
+            for closed in [other for other in self._listeners if other.is_closed()]:
+                del self._listeners[closed]
+            listener = self._listeners.get(loop)
+            if listener is None or listener[0].done():
+                ready = asyncio.Event()
+                listener = (loop.create_task(self._listen(ready)), ready)
+                self._listeners[loop] = listener
+            return listener[1]
+
+    def publish(self, usuario_ids, message):
+        payload = json.dumps({"usuarios": sorted(set(usuario_ids)), "frame": message.decode()})
+        try:
+            self._client.publish(self.channel, payload)
+        except redis.RedisError:
+            logger.warning("Live events: Redis publish failed, delivering locally only")
+            self.deliver(usuario_ids, message)
+
+    async def _listen(self, ready):
+        client = redis.asyncio.Redis.from_url(self.url)
+        while True:
+            try:
+                async with client.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    async for item in pubsub.listen():
+                        if item["type"] == "subscribe":
+                            # Confirmed by the server: every later publish reaches us
+                            ready.set()
+                        elif item["type"] == "message":
+                            payload = json.loads(item["data"])
+                            self.deliver(payload["usuarios"], payload["frame"].encode())
+            except redis.RedisError:
+                ready.clear()
+                logger.warning("Live events: Redis subscription lost, retrying")
+                await asyncio.sleep(1)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """The process-wide broker, built from settings on first use."""
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            url = getattr(settings, "LIVE_EVENTS_REDIS_URL", "")
+            if url and redis is not None:
+                _broker = RedisBroker(url)
+            else:
+                _broker = Broker()
+        return _broker
+
+
+@receiver(setting_changed)
+def _reset_broker(setting, **kwargs):
+    global _broker
+    if setting == "LIVE_EVENTS_REDIS_URL":
+        with _broker_lock:
+            _broker = None
+
+
+def publish(usuario_ids, evento, dados):
+    """Send event ``evento`` with JSON-able ``dados`` to every stream of ``usuario_ids``."""
+    if usuario_ids:
+        get_broker().publish(usuario_ids, frame(evento, dados))
+
+
+def notificacao_dados(notificacao):
+    """Payload of a ``notificacao`` event (same fields as the API list)."""
+    return {
+        "id": notificacao.pk,
+        "tipo": notificacao.tipo,
+        "categoria": notificacao.categoria,
+        "titulo": notificacao.titulo,
+        "mensagem": notificacao.mensagem,
+        "url": notificacao.url,
+        "lida": notificacao.lida,
+        "created_at": notificacao.created_at,
+    }
+
+
+def notificacoes_criadas(notificacoes):
+    """Publish notifications inserted with ``bulk_create``."""
+    for notificacao in notificacoes:
+        publish([notificacao.usuario_id], "notificacao", notificacao_dados(notificacao))
+
+
+async def stream(usuario_id):
+    """Async iterator of SSE bytes for one connection of ``usuario_id``."""
+    heartbeat = getattr(settings, "LIVE_EVENTS_HEARTBEAT", 15)
+    deadline = time.monotonic() + getattr(settings, "LIVE_EVENTS_MAX_AGE", 300)
+    broker = get_broker()
+    subscription = await broker.subscribe(usuario_id)
+    try:
+        # Reconnection delay for EventSource, in milliseconds
+        yield b"retry: 3000\n\n"
+        while (remaining := deadline - time.monotonic()) > 0:
+            try:
+                message = await asyncio.wait_for(
+                    subscription.queue.get(), min(heartbeat, remaining)
+                )
+            except TimeoutError:
+                # Comment line: keeps proxies from timing out an idle stream
+                yield b": keep-alive\n\n"
+                continue
+            if message is None:
+                break
+            yield message
+    finally:
+        broker.unsubscribe(subscription)
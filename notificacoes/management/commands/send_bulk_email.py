@@ -0,0 +1,65 @@
+"""
+Management command to send a bulk email campaign.
+
+Usage:
+    python manage.py send_bulk_email newsletter --subject "Novidades" --body-file novidades.txt
+    python manage.py send_bulk_email fatura_vencimento --dias 3
+"""
+
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from notificacoes.bulk import FaturaVencimentoCampaign, NewsletterCampaign, send_campaign
+
+
+class Command(BaseCommand):
+    help = "Send a bulk email campaign over one SMTP connection (reports messages/sec)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("campaign", choices=["newsletter", "fatura_vencimento"])
+        parser.add_argument("--subject", help="Newsletter subject")
+        parser.add_argument("--title", default="", help="Newsletter heading")
+        parser.add_argument("--body-file", help="Plain-text file with the newsletter body")
+        parser.add_argument(
+            "--template",
+            default="emails/newsletter.html",
+            help="Newsletter template (default: emails/newsletter.html)",
+        )
+        parser.add_argument(
+            "--dias",
+            type=int,
+            default=3,
+            help="Remind invoices due in this many days (default: 3)",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Recipients per database/SMTP batch (default: 500)",
+        )
+
+    def handle(self, *args, **options):
+        if options["campaign"] == "newsletter":
+            if not options["subject"] or not options["body_file"]:
+                raise CommandError("newsletter requires --subject and --body-file")
+            campaign = NewsletterCampaign(
+                options["subject"],
+                template_name=options["template"],
+                titulo=options["title"],
+                conteudo=Path(options["body_file"]).read_text(encoding="utf-8"),
+            )
+        else:
+            campaign = FaturaVencimentoCampaign(dias=options["dias"])
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f"=== Sending {campaign.tipo} ==="))
+        result = send_campaign(campaign, options["chunk_size"], progress=self._progress)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✓ {result.sent} sent, {result.failed} failed in {result.elapsed:.1f}s "
+                f"({result.rate:,.0f} msg/s)"
+            )
+        )
+
+    def _progress(self, result):
+        self.stdout.write(f"  {result.total:>8,} processed  {result.rate:>10,.0f} msg/s")
@@ -0,0 +1,69 @@
+"""
+Management command to deliver the email outbox (pending ``LogEmail`` rows).
+
+Usage:
+    python manage.py send_queued_emails            # drain what is due, then exit
+    python manage.py send_queued_emails --loop     # keep polling (worker process)
+"""
+
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from notificacoes.outbox import send_batch
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Send pending emails from the outbox in batches over one SMTP connection"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=50,
+            help="Emails per SMTP connection (default: 50)",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running, polling for new emails",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5.0,
+            help="Seconds to sleep when the outbox is empty (with --loop, default: 5)",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        total_sent = total_failed = 0
+        try:
+            while True:
+                try:
+                    sent, failed = send_batch(batch_size)
+                except Exception:
+                    if not options["loop"]:
+                        raise
+                    # Keep the worker alive through DB hiccups; retry after a pause
+                    logger.exception("Outbox batch failed")
+                    close_old_connections()
+                    time.sleep(options["interval"])
+                    continue
+                total_sent += sent
+                total_failed += failed
+                if sent or failed:
+                    self.stdout.write(f"  batch: {sent} sent, {failed} failed")
+                if sent + failed < batch_size:
+                    # Outbox drained (or only backing-off rows left)
+                    if not options["loop"]:
+                        break
+                    time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f"✓ {total_sent} sent, {total_failed} failed"))
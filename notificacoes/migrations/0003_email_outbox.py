@@ -0,0 +1,52 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notificacoes", "0002_notificacao_notificacoes_created_id_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="logemail",
+            name="conteudo_html",
+            field=models.TextField(blank=True, verbose_name="Conteúdo HTML"),
+        ),
+        migrations.AddField(
+            model_name="logemail",
+            name="proxima_tentativa",
+            field=models.DateTimeField(blank=True, null=True, verbose_name="Próxima Tentativa"),
+        ),
+        migrations.AlterField(
+            model_name="logemail",
+            name="tipo",
+            field=models.CharField(
+                choices=[
+                    ("orcamento_confirmacao", "Confirmação de Orçamento"),
+                    ("orcamento_aprovado", "Orçamento Aprovado"),
+                    ("projeto_atualizacao", "Atualização de Projeto"),
+                    ("fatura_nova", "Nova Fatura"),
+                    ("fatura_vencimento", "Lembrete de Vencimento"),
+                    ("pagamento_confirmado", "Pagamento Confirmado"),
+                    ("ticket_criado", "Ticket Criado"),
+                    ("ticket_resposta", "Resposta ao Ticket"),
+                    ("boas_vindas", "Boas-vindas"),
+                    ("reset_senha", "Reset de Senha"),
+                    ("newsletter", "Newsletter"),
+                    ("contato_novo", "Nova Mensagem de Contato"),
+                    ("orcamento_novo", "Novo Orçamento"),
+                    ("verificacao_email", "Verificação de Email"),
+                ],
+                max_length=50,
+                verbose_name="Tipo",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="logemail",
+            index=models.Index(
+                fields=["status", "proxima_tentativa"], name="notif_logemail_outbox_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notificacoes", "0003_email_outbox"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="notificacao",
+            index=models.Index(
+                fields=["usuario", "-created_at", "-id"], name="notif_usuario_created_idx"
+            ),
+        ),
+    ]
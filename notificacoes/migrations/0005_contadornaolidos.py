@@ -0,0 +1,44 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:40
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("clientes", "0004_usuario_email_verification_token_created_at"),
+        ("notificacoes", "0004_owner_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ContadorNaoLidos",
+            fields=[
+                (
+                    "usuario",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="contador_nao_lidos",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Usuário",
+                    ),
+                ),
+                (
+                    "notificacoes",
+                    models.PositiveIntegerField(default=0, verbose_name="Notificações não lidas"),
+                ),
+                (
+                    "mensagens",
+                    models.PositiveIntegerField(default=0, verbose_name="Mensagens não lidas"),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True, verbose_name="Atualizado em")),
+            ],
+            options={
+                "verbose_name": "Contador de Não Lidos",
+                "verbose_name_plural": "Contadores de Não Lidos",
+            },
+        ),
+    ]
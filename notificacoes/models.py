@@ -3,7 +3,7 @@ Notificacoes App Models - Notifications system
 """
 
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
 from django.utils.translation import gettext_lazy as _
 
 
@@ -41,15 +41,91 @@ class Notificacao(models.Model):
     url = models.CharField(_("URL"), max_length=255, blank=True)
     lida = models.BooleanField(_("Lida"), default=False)
     created_at = models.DateTimeField(_("Criado em"), auto_now_add=True)
+    updated_at = models.DateTimeField(_("Atualizado em"), auto_now=True)
 
     class Meta:
         verbose_name = _("Notificação")
         verbose_name_plural = _("Notificações")
         ordering = ["-created_at"]
+        indexes = [
+            # Keyset pagination (api.pagination.KeysetCursorPagination)
+            models.Index(fields=["-created_at", "-id"], name="notificacoes_created_id_idx"),
+            # A user's notifications, newest first
+            models.Index(
+                fields=["usuario", "-created_at", "-id"], name="notif_usuario_created_idx"
+            ),
+            # Delta sync (api.sync): a user's changes since a watermark
+            models.Index(fields=["usuario", "updated_at", "id"], name="notif_usuario_updated_idx"),
+        ]
 
     def __str__(self):
         return f"{self.usuario} - {self.titulo}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # What ContadorNaoLidos currently counts for this row
+        instance._loaded = cls._counted(instance.__dict__)
+        return instance
+
+    @staticmethod
+    def _counted(values):
+        """``(usuario_id, nao_lida)``, or None if either field was not loaded."""
+        if "usuario_id" not in values or "lida" not in values:
+            return None
+        return (values["usuario_id"], not values["lida"])
+
+    def save(self, *args, **kwargs):
+        """Save and move the owner's unread counter by the change in ``lida``."""
+        from . import unread
+
+        # An explicit pk may point at an existing row: treat it as unknown
+        adding = self._state.adding and self.pk is None
+        antes = getattr(self, "_loaded", None)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            depois = self._counted(self.__dict__)
+            if adding or antes is not None:
+                unread.ajustar_mudanca("notificacoes", None if adding else antes, depois)
+            else:
+                # Previous state unknown (not loaded from the database): recount
+                unread.recalcular([self.usuario_id])
+        self._loaded = depois
+
+    def delete(self, *args, **kwargs):
+        from . import unread
+
+        antes = getattr(self, "_loaded", None)
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            if antes is None:
+                unread.recalcular([self.usuario_id])
+            else:
+                unread.ajustar_mudanca("notificacoes", antes, None)
+        return result
+
+
+class ContadorNaoLidos(models.Model):
+    """Per-user unread counters for the badges (see ``notificacoes.unread``)."""
+
+    usuario = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="contador_nao_lidos",
+        verbose_name=_("Usuário"),
+    )
+    notificacoes = models.PositiveIntegerField(_("Notificações não lidas"), default=0)
+    mensagens = models.PositiveIntegerField(_("Mensagens não lidas"), default=0)
+    updated_at = models.DateTimeField(_("Atualizado em"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("Contador de Não Lidos")
+        verbose_name_plural = _("Contadores de Não Lidos")
+
+    def __str__(self):
+        return f"{self.usuario} - {self.notificacoes}/{self.mensagens}"
+
 
 class LogEmail(models.Model):
     """Email log."""
@@ -72,17 +148,22 @@ class LogEmail(models.Model):
         ("boas_vindas", _("Boas-vindas")),
         ("reset_senha", _("Reset de Senha")),
         ("newsletter", _("Newsletter")),
+        ("contato_novo", _("Nova Mensagem de Contato")),
+        ("orcamento_novo", _("Novo Orçamento")),
+        ("verificacao_email", _("Verificação de Email")),
     ]
 
     destinatario = models.EmailField(_("Destinatário"))
     tipo = models.CharField(_("Tipo"), max_length=50, choices=TIPO_CHOICES)
     assunto = models.CharField(_("Assunto"), max_length=255)
     conteudo = models.TextField(_("Conteúdo"), blank=True)
+    conteudo_html = models.TextField(_("Conteúdo HTML"), blank=True)
     status = models.CharField(
         _("Status"), max_length=20, choices=STATUS_CHOICES, default="pendente"
     )
     erro = models.TextField(_("Erro"), blank=True)
     tentativas = models.PositiveSmallIntegerField(_("Tentativas"), default=0)
+    proxima_tentativa = models.DateTimeField(_("Próxima Tentativa"), null=True, blank=True)
     enviado_at = models.DateTimeField(_("Enviado em"), null=True, blank=True)
     created_at = models.DateTimeField(_("Criado em"), auto_now_add=True)
 
@@ -90,6 +171,10 @@ class LogEmail(models.Model):
         verbose_name = _("Log de Email")
         verbose_name_plural = _("Logs de Email")
         ordering = ["-created_at"]
+        indexes = [
+            # Outbox polling (notificacoes.outbox.pending_emails)
+            models.Index(fields=["status", "proxima_tentativa"], name="notif_logemail_outbox_idx"),
+        ]
 
     def __str__(self):
         return f"{self.tipo} - {self.destinatario}"
@@ -0,0 +1,120 @@
+"""
+Durable outbox for outbound email, stored in ``LogEmail``.
+
+Views call ``queue_email`` (one INSERT) instead of talking to the SMTP server;
+the ``send_queued_emails`` management command delivers pending rows in batches
+over a single SMTP connection, retrying failures with exponential backoff.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import LogEmail
+
+logger = logging.getLogger(__name__)
+
+# Attempts before a message is marked "falha" for good
+MAX_ATTEMPTS = getattr(settings, "EMAIL_OUTBOX_MAX_ATTEMPTS", 5)
+
+# Delay before retry N is BACKOFF_BASE * 2 ** (N - 1) seconds, capped at BACKOFF_MAX
+BACKOFF_BASE = getattr(settings, "EMAIL_OUTBOX_BACKOFF_BASE", 60)
+BACKOFF_MAX = getattr(settings, "EMAIL_OUTBOX_BACKOFF_MAX", 6 * 60 * 60)
+
+
+def queue_email(destinatario, assunto, conteudo, tipo, conteudo_html=""):
+    """Store an email for background delivery and return the ``LogEmail`` row."""
+    return LogEmail.objects.create(
+        destinatario=destinatario,
+        assunto=str(assunto)[:255],
+        conteudo=conteudo,
+        conteudo_html=conteudo_html,
+        tipo=tipo,
+        status="pendente",
+    )
+
+
+def pending_emails(now=None):
+    """Pending rows whose next attempt is due, oldest first."""
+    now = now or timezone.now()
+    return LogEmail.objects.filter(
+        Q(proxima_tentativa__isnull=True) | Q(proxima_tentativa__lte=now), status="pendente"
+    ).order_by("created_at", "id")
+
+
+def backoff_delay(tentativas):
+    return timedelta(seconds=min(BACKOFF_BASE * 2 ** max(tentativas - 1, 0), BACKOFF_MAX))
+
+
+def build_message(log, connection=None):
+    message = EmailMultiAlternatives(
+        subject=log.assunto,
+        body=log.conteudo,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[log.destinatario],
+        connection=connection,
+    )
+    if log.conteudo_html:
+        message.attach_alternative(log.conteudo_html, "text/html")
+    return message
+
+
+def send_batch(batch_size=50, connection=None):
+    """
+    Deliver up to ``batch_size`` due emails over one SMTP connection.
+
+    Rows are claimed with ``SELECT ... FOR UPDATE SKIP LOCKED`` so several workers
+    can run side by side. Returns ``(sent, failed)`` counts for this batch.
+    """
+    sent = failed = 0
+    with transaction.atomic():
+        logs = list(pending_emails().select_for_update(skip_locked=True)[:batch_size])
+        if not logs:
+            return sent, failed
+
+        connection = connection or get_connection(fail_silently=False)
+        now = timezone.now()
+        connected = False
+        try:
+            for log in logs:
+                log.tentativas += 1
+                try:
+                    if not connected:
+                        connection.open()
+                        connected = True
+                    connection.send_messages([build_message(log, connection)])
+                except Exception as exc:
+                    failed += 1
+                    record_failure(log, exc, now)
+                    # The SMTP session may be broken; reconnect for the next message
+                    connection.close()
+                    connected = False
+                else:
+                    sent += 1
+                    log.status = "enviado"
+                    log.erro = ""
+                    log.enviado_at = timezone.now()
+                    log.proxima_tentativa = None
+        finally:
+            connection.close()
+
+        LogEmail.objects.bulk_update(
+            logs, ["status", "erro", "tentativas", "proxima_tentativa", "enviado_at"]
+        )
+    return sent, failed
+
+
+def record_failure(log, exc, now):
+    """Store the error and schedule a retry, or give up after ``MAX_ATTEMPTS``."""
+    log.erro = f"{type(exc).__name__}: {exc}"[:2000]
+    if log.tentativas >= MAX_ATTEMPTS:
+        log.status = "falha"
+        log.proxima_tentativa = None
+    else:
+        log.proxima_tentativa = now + backoff_delay(log.tentativas)
+    logger.warning("Email %s to %s failed: %s", log.pk, log.destinatario, exc)
@@ -0,0 +1,73 @@
+"""
+Live event publishing (see ``notificacoes.live``).
+
+New notifications, project timeline entries and public ticket replies are
+published to their client's open streams once the creating transaction
+commits, so a rolled-back row is never announced.
+"""
+
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_save
+
+from projetos.models import TimelineEvento
+from suporte.models import RespostaTicket
+
+from . import live
+from .models import Notificacao
+
+
+def publish_notificacao(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(
+            partial(
+                live.publish,
+                [instance.usuario_id],
+                "notificacao",
+                live.notificacao_dados(instance),
+            )
+        )
+
+
+def publish_timeline(sender, instance, created, **kwargs):
+    if created:
+        projeto = instance.projeto
+        transaction.on_commit(
+            partial(
+                live.publish,
+                [projeto.cliente_id],
+                "timeline",
+                {
+                    "id": instance.pk,
+                    "projeto": projeto.slug,
+                    "tipo": instance.tipo,
+                    "titulo": instance.titulo,
+                    "descricao": instance.descricao,
+                    "created_at": instance.created_at,
+                },
+            )
+        )
+
+
+def publish_resposta(sender, instance, created, **kwargs):
+    if created and not instance.interno:
+        ticket = instance.ticket
+        transaction.on_commit(
+            partial(
+                live.publish,
+                [ticket.cliente_id],
+                "resposta_ticket",
+                {
+                    "id": instance.pk,
+                    "ticket": ticket.numero,
+                    "conteudo": instance.conteudo,
+                    "created_at": instance.created_at,
+                },
+            )
+        )
+
+
+post_save.connect(publish_notificacao, sender=Notificacao, dispatch_uid="live_notificacao")
+post_save.connect(publish_timeline, sender=TimelineEvento, dispatch_uid="live_timeline")
+post_save.connect(publish_resposta, sender=RespostaTicket, dispatch_uid="live_resposta")
@@ -1,12 +1,37 @@
 """
-Notificacoes App Tests - Notificacao, LogEmail, ConfiguracaoNotificacao
+Notificacoes App Tests - Notificacao, LogEmail, ConfiguracaoNotificacao, email outbox, bulk email
 """
 
+import asyncio
+import os
+import smtplib
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.mail.backends import locmem
+from django.core.management import call_command
 from django.db import IntegrityError
-from django.test import TestCase
-
-from notificacoes.models import ConfiguracaoNotificacao, LogEmail, Notificacao
+from django.template.loader import render_to_string
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from notificacoes import live, unread
+from notificacoes.bulk import FaturaVencimentoCampaign, NewsletterCampaign, send_campaign
+from notificacoes.models import ConfiguracaoNotificacao, ContadorNaoLidos, LogEmail, Notificacao
+from notificacoes.outbox import (
+    BACKOFF_BASE,
+    MAX_ATTEMPTS,
+    backoff_delay,
+    queue_email,
+    send_batch,
+)
 
 User = get_user_model()
 
@@ -278,3 +303,365 @@ class ConfiguracaoNotificacaoModelTest(TestCase):
     def test_only_one_config_per_user(self):
         with self.assertRaises(IntegrityError):
             ConfiguracaoNotificacao.objects.create(usuario=self.user)
+
+
+# ─────────────────────────── Email outbox ───────────────────────────────────
+
+
+class FailingBackend(locmem.EmailBackend):
+    """locmem backend that refuses mail for addresses starting with "fail"."""
+
+    opened = 0
+
+    def open(self):
+        FailingBackend.opened += 1
+        return super().open()
+
+    def send_messages(self, messages):
+        if any(to.startswith("fail") for m in messages for to in m.to):
+            raise smtplib.SMTPRecipientsRefused({})
+        return super().send_messages(messages)
+
+
+class EmailOutboxTest(TestCase):
+    """Tests for the LogEmail-backed outbox and the send_queued_emails worker."""
+
+    def test_queue_email_does_not_send(self):
+        log = queue_email("cliente@example.com", "Olá", "Corpo", tipo="contato_novo")
+        self.assertEqual(log.status, "pendente")
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_send_batch_delivers_pending_emails(self):
+        queue_email("a@example.com", "Texto", "Corpo", tipo="contato_novo")
+        queue_email(
+            "b@example.com",
+            "HTML",
+            "<p>Oi</p>",
+            tipo="verificacao_email",
+            conteudo_html="<p>Oi</p>",
+        )
+
+        self.assertEqual(send_batch(), (2, 0))
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(mail.outbox[1].alternatives, [("<p>Oi</p>", "text/html")])
+        self.assertFalse(LogEmail.objects.exclude(status="enviado").exists())
+        self.assertFalse(LogEmail.objects.filter(enviado_at__isnull=True).exists())
+
+    @override_settings(EMAIL_BACKEND="notificacoes.tests.FailingBackend")
+    def test_batch_reuses_one_connection(self):
+        FailingBackend.opened = 0
+        for i in range(5):
+            queue_email(f"user{i}@example.com", "Lote", "Corpo", tipo="newsletter")
+        self.assertEqual(send_batch(), (5, 0))
+        self.assertEqual(FailingBackend.opened, 1)
+
+    @override_settings(EMAIL_BACKEND="notificacoes.tests.FailingBackend")
+    def test_failure_is_retried_with_backoff(self):
+        log = queue_email("fail@example.com", "Falha", "Corpo", tipo="contato_novo")
+        queue_email("ok@example.com", "Ok", "Corpo", tipo="contato_novo")
+
+        self.assertEqual(send_batch(), (1, 1))
+        log.refresh_from_db()
+        self.assertEqual((log.status, log.tentativas), ("pendente", 1))
+        self.assertIn("SMTPRecipientsRefused", log.erro)
+        self.assertGreater(log.proxima_tentativa, timezone.now())
+        # Not due yet
+        self.assertEqual(send_batch(), (0, 0))
+
+    @override_settings(EMAIL_BACKEND="notificacoes.tests.FailingBackend")
+    def test_gives_up_after_max_attempts(self):
+        log = queue_email("fail@example.com", "Falha", "Corpo", tipo="contato_novo")
+        for _ in range(MAX_ATTEMPTS):
+            LogEmail.objects.filter(pk=log.pk).update(proxima_tentativa=None)
+            send_batch()
+        log.refresh_from_db()
+        self.assertEqual((log.status, log.tentativas), ("falha", MAX_ATTEMPTS))
+
+    def test_backoff_grows_exponentially(self):
+        self.assertEqual(backoff_delay(1).total_seconds(), BACKOFF_BASE)
+        self.assertEqual(backoff_delay(3).total_seconds(), BACKOFF_BASE * 4)
+
+    def test_command_drains_outbox(self):
+        for i in range(3):
+            queue_email(f"cmd{i}@example.com", "Cmd", "Corpo", tipo="newsletter")
+        out = StringIO()
+        call_command("send_queued_emails", "--batch-size", "2", stdout=out)
+        self.assertIn("3 sent", out.getvalue())
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_contact_form_queues_instead_of_sending(self):
+        response = self.client.post(
+            reverse("core:contato"),
+            {
+                "nome": "Fulano",
+                "email": "fulano@example.com",
+                "assunto": "Orçamento",
+                "mensagem": "Gostaria de um site.",
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(mail.outbox), 0)
+        log = LogEmail.objects.get(tipo="contato_novo")
+        self.assertIn("Fulano", log.conteudo)
+
+
+# ─────────────────────────── Bulk email ─────────────────────────────────────
+
+
+class BulkEmailTest(TestCase):
+    """Tests for bulk campaigns (newsletter, invoice reminders) on the locmem backend."""
+
+    def _subscriber(self, i, idioma="pt-br", newsletter=True, **kwargs):
+        user = User.objects.create_user(
+            email=f"news{i}@example.com",
+            password="Senha@123456",
+            nome_completo=kwargs.pop("nome", f"Assinante {i}"),
+            idioma_preferido=idioma,
+            is_active=kwargs.pop("is_active", True),
+        )
+        ConfiguracaoNotificacao.objects.create(usuario=user, email_newsletter=newsletter)
+        return user
+
+    def _newsletter(self, conteudo="Novidades de R$ 5 e $$ promo $nome"):
+        return NewsletterCampaign("Novidades ${nome}", titulo="Edição 1", conteudo=conteudo)
+
+    def test_newsletter_reaches_only_subscribers(self):
+        for i in range(3):
+            self._subscriber(i)
+        self._subscriber(10, newsletter=False)
+        self._subscriber(11, is_active=False)
+
+        result = send_campaign(self._newsletter(), chunk_size=2)
+
+        self.assertEqual((result.total, result.sent, result.failed), (3, 3, 0))
+        self.assertEqual(
+            sorted(m.to[0] for m in mail.outbox), [f"news{i}@example.com" for i in range(3)]
+        )
+        self.assertEqual(LogEmail.objects.filter(tipo="newsletter", status="enviado").count(), 3)
+        self.assertFalse(LogEmail.objects.filter(proxima_tentativa__isnull=False).exists())
+
+    def test_templates_rendered_once_per_language(self):
+        for i in range(4):
+            self._subscriber(i, idioma="en" if i % 2 else "pt-br")
+        with patch("notificacoes.bulk.render_to_string", wraps=render_to_string) as render:
+            send_campaign(self._newsletter(), chunk_size=3)
+        self.assertEqual(render.call_count, 2)
+        self.assertEqual(len(mail.outbox), 4)
+
+    def test_per_recipient_fields_are_escaped_and_other_dollars_kept(self):
+        self._subscriber(1, nome="Ana <b>&</b>")
+        send_campaign(self._newsletter())
+        message = mail.outbox[0]
+        html_body = message.alternatives[0][0]
+        self.assertEqual(message.subject, "Novidades Ana <b>&</b>")
+        self.assertIn("Ana &lt;b&gt;&amp;&lt;/b&gt;", html_body)
+        self.assertIn("Ana <b>&</b>", message.body)
+        self.assertIn("R$ 5 e $$ promo $nome", message.body)
+
+    @override_settings(EMAIL_BACKEND="notificacoes.tests.FailingBackend")
+    def test_one_connection_and_failures_left_for_outbox_retry(self):
+        FailingBackend.opened = 0
+        for i in range(3):
+            self._subscriber(i)
+        fail = self._subscriber(9)
+        fail.email = "fail@example.com"
+        fail.save()
+
+        result = send_campaign(self._newsletter(), chunk_size=2)
+
+        self.assertEqual((result.sent, result.failed), (3, 1))
+        # One connection for the run, plus one reconnect after the failure
+        self.assertEqual(FailingBackend.opened, 2)
+        log = LogEmail.objects.get(destinatario="fail@example.com")
+        self.assertEqual((log.status, log.tentativas), ("pendente", 1))
+        self.assertGreater(log.proxima_tentativa, timezone.now())
+
+    def test_fatura_vencimento_reminds_invoices_due_in_n_days(self):
+        from faturas.models import Fatura
+
+        cliente = self._subscriber(1, idioma="en", newsletter=False)
+        due = timezone.localdate() + timedelta(days=3)
+        fatura = Fatura.objects.create(
+            cliente=cliente, data_vencimento=due, subtotal=Decimal("1234.50")
+        )
+        Fatura.objects.create(
+            cliente=cliente,
+            data_vencimento=due + timedelta(days=1),
+            subtotal=Decimal("10.00"),
+        )
+
+        result = send_campaign(FaturaVencimentoCampaign(dias=3))
+
+        self.assertEqual(result.sent, 1)
+        message = mail.outbox[0]
+        self.assertIn(fatura.numero, message.subject)
+        self.assertIn("R$ 1,234.50", message.body)
+        self.assertEqual(LogEmail.objects.get().tipo, "fatura_vencimento")
+
+    def test_command_reports_throughput(self):
+        self._subscriber(1)
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as body:
+            body.write("Conteúdo da newsletter")
+        self.addCleanup(os.unlink, body.name)
+        out = StringIO()
+        call_command(
+            "send_bulk_email", "newsletter", "--subject", "Oi", "--body-file", body.name, stdout=out
+        )
+        self.assertIn("1 sent", out.getvalue())
+        self.assertIn("msg/s", out.getvalue())
+
+
+# ─────────────────────────── Unread counters ────────────────────────────────
+
+
+class ContadorNaoLidosTest(TestCase):
+    """Tests for the per-user unread counters."""
+
+    def setUp(self):
+        self.user = make_user("contador@example.com", "Contador")
+
+    def notificacao(self, **kwargs):
+        return Notificacao.objects.create(usuario=self.user, titulo="T", mensagem=".", **kwargs)
+
+    def contador(self):
+        return ContadorNaoLidos.objects.get(pk=self.user.pk).notificacoes
+
+    def test_first_read_builds_the_row_from_the_source_tables(self):
+        self.notificacao()
+        self.notificacao(lida=True)
+        self.assertFalse(ContadorNaoLidos.objects.exists())
+        self.assertEqual(unread.get_counts(self.user.pk), {"notificacoes": 1, "mensagens": 0})
+        self.assertEqual(self.contador(), 1)
+        with self.assertNumQueries(1):
+            unread.get_counts(self.user.pk)
+
+    def test_create_read_and_delete_move_the_counter(self):
+        unread.get_counts(self.user.pk)
+        lida = self.notificacao()
+        apagada = self.notificacao()
+        self.notificacao(lida=True)
+        self.assertEqual(self.contador(), 2)
+        lida.lida = True
+        lida.save()
+        self.assertEqual(self.contador(), 1)
+        apagada.delete()
+        self.assertEqual(self.contador(), 0)
+        # Saving again without a change is not counted twice
+        lida.save()
+        self.assertEqual(self.contador(), 0)
+
+    def test_instance_built_by_hand_recounts(self):
+        unread.get_counts(self.user.pk)
+        notif = self.notificacao()
+        Notificacao(
+            pk=notif.pk,
+            usuario=self.user,
+            titulo="T",
+            mensagem=".",
+            lida=True,
+            created_at=notif.created_at,
+        ).save()
+        self.assertEqual(self.contador(), 0)
+
+    def test_counter_never_goes_negative(self):
+        unread.get_counts(self.user.pk)
+        unread.ajustar("notificacoes", {self.user.pk: -5})
+        self.assertEqual(self.contador(), 0)
+
+    def test_bulk_create_path(self):
+        unread.get_counts(self.user.pk)
+        rows = Notificacao.objects.bulk_create(
+            [Notificacao(usuario=self.user, titulo=str(i), mensagem=".") for i in range(3)]
+        )
+        unread.notificacoes_criadas(rows)
+        self.assertEqual(self.contador(), 3)
+
+    def test_marcar_todas_lidas(self):
+        other = make_user("contador2@example.com", "Outro")
+        Notificacao.objects.create(usuario=other, titulo="T", mensagem=".")
+        unread.get_counts(self.user.pk)
+        for _ in range(3):
+            self.notificacao()
+        self.assertEqual(unread.marcar_todas_lidas(self.user.pk), 3)
+        self.assertEqual(self.contador(), 0)
+        self.assertEqual(unread.marcar_todas_lidas(self.user.pk), 0)
+        self.assertTrue(Notificacao.objects.filter(usuario=other, lida=False).exists())
+
+    def test_recalcular_repairs_drift(self):
+        self.notificacao()
+        unread.get_counts(self.user.pk)
+        ContadorNaoLidos.objects.filter(pk=self.user.pk).update(notificacoes=42)
+        unread.recalcular([self.user.pk])
+        self.assertEqual(self.contador(), 1)
+
+    def test_badge_in_client_area(self):
+        self.notificacao()
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("projetos:dashboard"))
+        self.assertContains(response, 'class="badge rounded-pill bg-danger ms-1"')
+
+
+# ─────────────────────────── Live events ────────────────────────────────────
+
+
+@override_settings(LIVE_EVENTS_REDIS_URL="")
+class LiveBrokerTest(TestCase):
+    """Tests for the in-process live event broker."""
+
+    async def collect(self, stream):
+        return [chunk async for chunk in stream]
+
+    @override_settings(LIVE_EVENTS_QUEUE_SIZE=2, LIVE_EVENTS_HEARTBEAT=1, LIVE_EVENTS_MAX_AGE=5)
+    async def test_slow_stream_is_closed_on_overflow(self):
+        stream = live.stream(7)
+        self.assertEqual(await anext(stream), b"retry: 3000\n\n")
+        for i in range(3):
+            live.publish([7, 8], "notificacao", {"id": i})
+        await asyncio.sleep(0)
+        chunks = await asyncio.wait_for(self.collect(stream), timeout=2)
+        # The oldest event made room for the end-of-stream marker
+        self.assertEqual(chunks, [b'event: notificacao\ndata: {"id":1}\n\n'])
+        self.assertEqual(live.get_broker().subscribers(7), 0)
+
+    async def test_streams_of_the_same_user_all_receive(self):
+        streams = [live.stream(9) for _ in range(2)]
+        for stream in streams:
+            await anext(stream)
+        self.assertEqual(live.get_broker().subscribers(9), 2)
+        live.publish([9], "timeline", {"id": 1})
+        for stream in streams:
+            chunk = await asyncio.wait_for(anext(stream), timeout=2)
+            self.assertTrue(chunk.startswith(b"event: timeline\n"))
+            await stream.aclose()
+        self.assertEqual(live.get_broker().subscribers(9), 0)
+
+
+class RedisLiveBrokerTest(TestCase):
+    """Tests for the Redis pub/sub broker; they run only when LIVE_EVENTS_REDIS_URL is set."""
+
+    def setUp(self):
+        if not settings.LIVE_EVENTS_REDIS_URL:
+            self.skipTest("LIVE_EVENTS_REDIS_URL not configured")
+        self.broker = live.RedisBroker(settings.LIVE_EVENTS_REDIS_URL, channel="ecommdev:live:test")
+
+    async def subscribe_and_publish(self, usuario_id):
+        subscription = await self.broker.subscribe(usuario_id)
+        try:
+            # Published as soon as subscribe() returns: pub/sub would drop it if not yet listening
+            self.broker.publish([usuario_id], live.frame("notificacao", {"id": usuario_id}))
+            return await asyncio.wait_for(subscription.queue.get(), timeout=2)
+        finally:
+            self.broker.unsubscribe(subscription)
+
+    def test_event_published_right_after_subscribe_is_delivered(self):
+        message = asyncio.run(self.subscribe_and_publish(11))
+        self.assertEqual(message, b'event: notificacao\ndata: {"id":11}\n\n')
+
+    def test_listeners_of_closed_loops_are_pruned(self):
+        loops = []
+        for usuario_id in (12, 13, 14):
+            asyncio.run(self.subscribe_and_publish(usuario_id))
+            loops.extend(self.broker._listeners)
+        # Each run's loop is closed afterwards; only the latest one is still tracked
+        self.assertEqual(len(set(loops)), 3)
+        self.assertEqual(list(self.broker._listeners), loops[-1:])
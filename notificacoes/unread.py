@@ -0,0 +1,128 @@
+"""
+Unread counters behind the notification and project-message badges.
+
+- Each user has one ``ContadorNaoLidos`` row, so a badge is a primary-key lookup
+  however long the user's history is.
+- Changes to ``Notificacao.lida`` / ``MensagemProjeto.lido`` move the counters
+  with ``F()`` deltas in the same transaction as the row change. Bulk paths call
+  ``ajustar`` themselves; mark-read is a conditional UPDATE whose row count is
+  the delta, so concurrent requests can never decrement twice.
+- A missing row is built from the source tables on first read, so existing users
+  need no backfill; deltas for users without a row are simply no-ops.
+  ``recalcular`` rebuilds rows from the source tables if they ever drift (e.g.
+  messages removed by deleting their project).
+"""
+
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import ContadorNaoLidos, Notificacao
+
+CAMPOS = ("notificacoes", "mensagens")
+
+
+def ajustar(campo, deltas):
+    """Add ``{usuario_id: delta}`` to ``campo``; one UPDATE per distinct delta."""
+    by_delta = defaultdict(list)
+    for usuario_id, delta in deltas.items():
+        if delta and usuario_id is not None:
+            by_delta[delta].append(usuario_id)
+    now = timezone.now()
+    for delta, usuarios in by_delta.items():
+        ContadorNaoLidos.objects.filter(usuario_id__in=usuarios).update(
+            **{campo: Greatest(F(campo) + delta, Value(0))}, updated_at=now
+        )
+
+
+def ajustar_mudanca(campo, antes, depois):
+    """
+    Apply one row's change. ``antes``/``depois`` are ``(usuario_id, nao_lido)``
+    before and after it, or None when the row did not exist.
+    """
+    deltas = Counter()
+    if antes and antes[1]:
+        deltas[antes[0]] -= 1
+    if depois and depois[1]:
+        deltas[depois[0]] += 1
+    ajustar(campo, deltas)
+
+
+def notificacoes_criadas(notificacoes):
+    """Count notifications inserted with ``bulk_create``."""
+    ajustar("notificacoes", Counter(n.usuario_id for n in notificacoes if not n.lida))
+
+
+def contar(usuario_id):
+    """Unread counts for ``usuario_id`` straight from the source tables."""
+    from projetos.models import MensagemProjeto
+
+    return {
+        "notificacoes": Notificacao.objects.filter(usuario_id=usuario_id, lida=False).count(),
+        # Messages in the user's projects written by someone else (or the system)
+        "mensagens": MensagemProjeto.objects.filter(projeto__cliente_id=usuario_id, lido=False)
+        .exclude(autor_id=usuario_id)
+        .count(),
+    }
+
+
+def get_counts(usuario_id):
+    """``{"notificacoes": n, "mensagens": m}`` for the badges."""
+    counts = ContadorNaoLidos.objects.filter(pk=usuario_id).values(*CAMPOS).first()
+    if counts is None:
+        counts = contar(usuario_id)
+        ContadorNaoLidos.objects.bulk_create(
+            [ContadorNaoLidos(usuario_id=usuario_id, **counts)], ignore_conflicts=True
+        )
+    return counts
+
+
+def recalcular(usuario_ids):
+    """Rebuild the counters of ``usuario_ids`` from the source tables."""
+    ContadorNaoLidos.objects.bulk_create(
+        [ContadorNaoLidos(usuario_id=pk, **contar(pk)) for pk in set(usuario_ids)],
+        update_conflicts=True,
+        unique_fields=["usuario"],
+        update_fields=[*CAMPOS, "updated_at"],
+    )
+
+
+def marcar_lida(usuario_id, pk):
+    """
+    Mark one of the user's notifications as read.
+
+    Returns False when it does not exist or belongs to someone else.
+    """
+    with transaction.atomic():
+        marcada = Notificacao.objects.filter(pk=pk, usuario_id=usuario_id, lida=False).update(
+            lida=True, updated_at=timezone.now()
+        )
+        if marcada:
+            ajustar("notificacoes", {usuario_id: -1})
+            return True
+    return Notificacao.objects.filter(pk=pk, usuario_id=usuario_id).exists()
+
+
+def marcar_todas_lidas(usuario_id):
+    """Mark every unread notification of the user as read; returns how many."""
+    with transaction.atomic():
+        marcadas = Notificacao.objects.filter(usuario_id=usuario_id, lida=False).update(
+            lida=True, updated_at=timezone.now()
+        )
+        ajustar("notificacoes", {usuario_id: -marcadas})
+    return marcadas
+
+
+def marcar_mensagens_lidas(projeto, usuario_id):
+    """Mark the project's messages from other authors as read for its client."""
+    with transaction.atomic():
+        marcadas = (
+            projeto.mensagens.filter(lido=False)
+            .exclude(autor_id=usuario_id)
+            .update(lido=True, updated_at=timezone.now())
+        )
+        ajustar("mensagens", {usuario_id: -marcadas})
+    return marcadas
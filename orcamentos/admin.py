@@ -1,6 +1,8 @@
 from django.contrib import admin
 from django.utils.html import format_html
 
+from core.state_machine import transition
+
 from .models import HistoricoOrcamento, Orcamento
 
 
@@ -37,6 +39,7 @@ class OrcamentoAdmin(admin.ModelAdmin):
     ordering = ["-created_at"]
     date_hierarchy = "created_at"
     inlines = [HistoricoOrcamentoInline]
+    actions = ["marcar_em_analise", "cancelar"]
 
     fieldsets = (
         ("Identificacao", {"fields": ("numero", "status", "cliente")}),
@@ -116,6 +119,24 @@ class OrcamentoAdmin(admin.ModelAdmin):
 
     valor_proposto_display.short_description = "Valor Proposto"
 
+    @admin.action(description="Marcar como em análise")
+    def marcar_em_analise(self, request, queryset):
+        self._transition(request, queryset, "em_analise")
+
+    @admin.action(description="Cancelar orçamentos")
+    def cancelar(self, request, queryset):
+        self._transition(request, queryset, "cancelado")
+
+    def _transition(self, request, queryset, status):
+        total = queryset.count()
+        moved = transition(
+            queryset, status, usuario=request.user, observacao="Ação em massa no admin"
+        )
+        message = f"{moved} orçamento(s) alterado(s)."
+        if moved < total:
+            message += f" {total - moved} ignorado(s): transição não permitida."
+        self.message_user(request, message)
+
 
 @admin.register(HistoricoOrcamento)
 class HistoricoOrcamentoAdmin(admin.ModelAdmin):
@@ -0,0 +1,16 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("orcamentos", "0002_alter_orcamento_cidade_alter_orcamento_estado"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="orcamento",
+            index=models.Index(fields=["-created_at", "-id"], name="orcamentos_created_id_idx"),
+        ),
+    ]
@@ -3,12 +3,13 @@ Orcamentos App Models - Quote requests
 """
 
 from django.conf import settings
-from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, transaction
 from django.utils.translation import gettext_lazy as _
 
+from core.state_machine import StateMachineMixin
 
-class Orcamento(models.Model):
+
+class Orcamento(StateMachineMixin, models.Model):
     """Quote request from potential clients."""
 
     STATUS_CHOICES = [
@@ -97,6 +98,17 @@ class Orcamento(models.Model):
         verbose_name = _("Orçamento")
         verbose_name_plural = _("Orçamentos")
         ordering = ["-created_at"]
+        indexes = [
+            # Keyset pagination (api.pagination.KeysetCursorPagination)
+            models.Index(fields=["-created_at", "-id"], name="orcamentos_created_id_idx"),
+            # Client area: own quotes, newest first / filtered by status
+            models.Index(
+                fields=["cliente", "-created_at", "-id"], name="orcamentos_cli_created_idx"
+            ),
+            models.Index(
+                fields=["cliente", "status", "-created_at"], name="orcamentos_cli_status_idx"
+            ),
+        ]
 
     # Valid status transitions: current_status -> set of allowed next statuses
     VALID_TRANSITIONS = {
@@ -109,52 +121,37 @@ class Orcamento(models.Model):
         "cancelado": set(),
     }
 
-    def clean(self):
-        """Enforce valid state-machine transitions on Orcamento status."""
-        super().clean()
-        if not self.pk:
-            # New instance — allow any initial status (defaults to 'novo')
-            return
-        try:
-            original = Orcamento.objects.get(pk=self.pk)
-        except Orcamento.DoesNotExist:
-            return
-        if original.status == self.status:
-            return  # No change — always valid
-        allowed = self.VALID_TRANSITIONS.get(original.status, set())
-        if self.status not in allowed:
-            raise ValidationError(
-                _(
-                    'Transição de status inválida: "%(from)s" → "%(to)s". '
-                    "Transições permitidas: %(allowed)s"
-                ),
-                params={
-                    "from": original.status,
-                    "to": self.status,
-                    "allowed": ", ".join(sorted(allowed)) if allowed else _("nenhuma"),
-                },
+    @classmethod
+    def record_transitions(cls, rows, to_status, usuario=None, observacao=""):
+        """Add a ``HistoricoOrcamento`` entry per quote moved by ``transition()``."""
+        HistoricoOrcamento.objects.bulk_create(
+            HistoricoOrcamento(
+                orcamento_id=pk,
+                usuario=usuario,
+                acao="Status alterado",
+                status_anterior=status_anterior,
+                status_novo=to_status,
+                observacao=observacao,
             )
+            for pk, status_anterior in rows
+        )
 
     def __str__(self):
         return f"{self.numero} - {self.nome_completo}"
 
     def save(self, *args, **kwargs):
-        if not self.numero:
-            from datetime import datetime
-
-            from django.db.models import Max
-
-            year = datetime.now().year
-            prefix = f"ORC-{year}-"
-            last = Orcamento.objects.filter(numero__startswith=prefix).aggregate(
-                max_num=Max("numero")
-            )["max_num"]
-            if last:
-                count = int(last.split("-")[-1]) + 1
-            else:
-                count = 1
-            self.numero = f"{prefix}{count:04d}"
-        super().save(*args, **kwargs)
+        if self.numero:
+            return super().save(*args, **kwargs)
+        from core.sequences import allocate_numero
+
+        # One transaction, so a failed INSERT also rolls the counter back (no gaps)
+        try:
+            with transaction.atomic():
+                self.numero = allocate_numero(Orcamento, "ORC")
+                super().save(*args, **kwargs)
+        except BaseException:
+            self.numero = ""
+            raise
 
 
 class HistoricoOrcamento(models.Model):
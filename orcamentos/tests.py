@@ -3,8 +3,11 @@ Orcamentos App Tests - Orcamento, HistoricoOrcamento
 """
 
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
 from django.test import TestCase
+from django.urls import reverse
 
+from core.state_machine import transition
 from orcamentos.models import HistoricoOrcamento, Orcamento
 
 User = get_user_model()
@@ -217,3 +220,100 @@ class HistoricoOrcamentoModelTest(TestCase):
         )
         historicos = list(HistoricoOrcamento.objects.filter(orcamento=self.orcamento))
         self.assertEqual(historicos[0].pk, h2.pk)
+
+
+# ─────────────────────────── Status transitions ──────────────────────────────
+
+
+class OrcamentoTransitionTest(TestCase):
+    """Tests for StateMachineMixin on Orcamento and the bulk transition()."""
+
+    def setUp(self):
+        self.user = make_user("trans_user@example.com", "Transition User")
+        self.orcamento = make_orcamento(cliente=self.user)
+
+    def test_clean_uses_loaded_status_without_query(self):
+        orcamento = Orcamento.objects.get(pk=self.orcamento.pk)
+        orcamento.status = "em_analise"
+        with self.assertNumQueries(0):
+            orcamento.clean()
+
+    def test_clean_rejects_invalid_transition(self):
+        orcamento = Orcamento.objects.get(pk=self.orcamento.pk)
+        orcamento.status = "aprovado"
+        with self.assertRaises(ValidationError):
+            orcamento.clean()
+
+    def test_clean_follows_saved_status(self):
+        self.orcamento.status = "em_analise"
+        self.orcamento.save()
+        # The saved status is the new origin: em_analise -> proposta_enviada is valid
+        self.orcamento.status = "proposta_enviada"
+        with self.assertNumQueries(0):
+            self.orcamento.clean()
+
+    def test_clean_queries_when_instance_was_not_loaded(self):
+        Orcamento.objects.filter(pk=self.orcamento.pk).update(status="cancelado")
+        orcamento = Orcamento(pk=self.orcamento.pk, status="em_analise")
+        with self.assertNumQueries(1), self.assertRaises(ValidationError):
+            orcamento.clean()
+
+    def test_clean_with_deferred_status(self):
+        orcamento = Orcamento.objects.only("pk").get(pk=self.orcamento.pk)
+        orcamento.status = "aprovado"
+        with self.assertRaises(ValidationError):
+            orcamento.clean()
+
+    def test_bulk_transition_moves_only_allowed_rows(self):
+        analise = make_orcamento(email="a@example.com", status="em_analise")
+        aprovado = make_orcamento(email="b@example.com", status="aprovado")
+        # lock/select, update, history insert (inside a savepoint)
+        with self.assertNumQueries(5):
+            moved = transition(
+                Orcamento.objects.all(), "cancelado", usuario=self.user, observacao="Lote"
+            )
+        self.assertEqual(moved, 2)
+        statuses = dict(Orcamento.objects.values_list("pk", "status"))
+        self.assertEqual(statuses[self.orcamento.pk], "cancelado")
+        self.assertEqual(statuses[analise.pk], "cancelado")
+        self.assertEqual(statuses[aprovado.pk], "aprovado")
+
+        historico = HistoricoOrcamento.objects.order_by("status_anterior")
+        self.assertEqual(
+            [(h.orcamento_id, h.status_anterior, h.status_novo) for h in historico],
+            [(analise.pk, "em_analise", "cancelado"), (self.orcamento.pk, "novo", "cancelado")],
+        )
+        self.assertTrue(all(h.usuario == self.user and h.observacao == "Lote" for h in historico))
+
+    def test_bulk_transition_bumps_updated_at(self):
+        before = self.orcamento.updated_at
+        transition(Orcamento.objects.filter(pk=self.orcamento.pk), "em_analise")
+        self.orcamento.refresh_from_db()
+        self.assertGreater(self.orcamento.updated_at, before)
+
+    def test_bulk_transition_without_eligible_rows(self):
+        self.assertEqual(transition(Orcamento.objects.all(), "aprovado"), 0)
+        self.assertFalse(HistoricoOrcamento.objects.exists())
+
+    def test_bulk_transition_rejects_unknown_status(self):
+        with self.assertRaises(ValueError):
+            transition(Orcamento.objects.all(), "arquivado")
+
+    def test_admin_action(self):
+        make_orcamento(email="c@example.com", status="aprovado")
+        admin = User.objects.create_superuser(
+            email="admin_orc@example.com", password="Senha@123456", nome_completo="Admin"
+        )
+        self.client.force_login(admin)
+        response = self.client.post(
+            reverse("admin:orcamentos_orcamento_changelist"),
+            {
+                "action": "marcar_em_analise",
+                "_selected_action": list(Orcamento.objects.values_list("pk", flat=True)),
+            },
+            follow=True,
+        )
+        self.assertContains(response, "1 orçamento(s) alterado(s). 1 ignorado(s)")
+        self.orcamento.refresh_from_db()
+        self.assertEqual(self.orcamento.status, "em_analise")
+        self.assertEqual(self.orcamento.historico.get().usuario, admin)
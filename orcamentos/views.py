@@ -1,14 +1,13 @@
 """Orcamentos app views."""
 
-from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.core.mail import send_mail
 from django.urls import reverse_lazy
 from django.utils.translation import gettext_lazy as _
 from django.views.generic import CreateView, ListView, TemplateView
 
 from core.views import HoneypotMixin
+from notificacoes.outbox import queue_email
 from pacotes.models import Pacote
 
 from .models import Orcamento
@@ -109,16 +108,11 @@ Acesse o painel admin para mais detalhes.
         """
 
         try:
-            result = send_mail(
-                subject=subject,
-                message=message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=["contato@ecommdev.com.br"],
-                fail_silently=False,
-            )
-            logger.info(f"Email sent for orcamento {orcamento.numero}: result={result}")
+            # Delivered by the send_queued_emails worker, off the request thread
+            log = queue_email("contato@ecommdev.com.br", subject, message, tipo="orcamento_novo")
+            logger.info(f"Email queued for orcamento {orcamento.numero}: log={log.pk}")
         except Exception as e:
-            logger.error(f"Error sending email for orcamento {orcamento.numero}: {e}")
+            logger.error(f"Error queueing email for orcamento {orcamento.numero}: {e}")
 
 
 class OrcamentoSucessoView(TemplateView):
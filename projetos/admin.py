@@ -1,8 +1,11 @@
 from django.contrib import admin
+from django.db import transaction
 from django.urls import reverse
 from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
 
+from notificacoes import unread
+
 from .models import ArquivoProjeto, MensagemProjeto, Milestone, Projeto, TimelineEvento
 
 
@@ -329,11 +332,20 @@ class MensagemProjetoAdmin(admin.ModelAdmin):
 
     @admin.action(description=_("Marcar como lido"))
     def marcar_como_lido(self, request, queryset):
-        queryset.update(lido=True)
+        self._marcar(queryset, lido=True)
 
     @admin.action(description=_("Marcar como não lido"))
     def marcar_como_nao_lido(self, request, queryset):
-        queryset.update(lido=False)
+        self._marcar(queryset, lido=False)
+
+    @staticmethod
+    def _marcar(queryset, lido):
+        from django.utils import timezone
+
+        with transaction.atomic():
+            clientes = set(queryset.values_list("projeto__cliente_id", flat=True).distinct())
+            queryset.update(lido=lido, updated_at=timezone.now())
+            unread.recalcular(clientes)
 
 
 @admin.register(ArquivoProjeto)
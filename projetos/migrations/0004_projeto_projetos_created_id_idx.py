@@ -0,0 +1,16 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("projetos", "0003_alter_projeto_cliente"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="projeto",
+            index=models.Index(fields=["-created_at", "-id"], name="projetos_created_id_idx"),
+        ),
+    ]
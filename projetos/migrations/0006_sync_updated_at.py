@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:58
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_updated_at(apps, schema_editor):
+    # Existing rows last changed, as far as we know, when they were created
+    apps.get_model("projetos", "MensagemProjeto").objects.update(updated_at=F("created_at"))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("projetos", "0005_owner_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="mensagemprojeto",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, verbose_name="Atualizado em"),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="mensagemprojeto",
+            index=models.Index(fields=["updated_at", "id"], name="projetos_msg_updated_idx"),
+        ),
+    ]
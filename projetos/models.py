@@ -3,7 +3,7 @@ Projetos App Models - Project management
 """
 
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
 from django.utils.translation import gettext_lazy as _
 
 from core.validators import validate_document
@@ -87,6 +87,15 @@ class Projeto(models.Model):
         verbose_name = _("Projeto")
         verbose_name_plural = _("Projetos")
         ordering = ["-created_at"]
+        indexes = [
+            # Keyset pagination (api.pagination.KeysetCursorPagination)
+            models.Index(fields=["-created_at", "-id"], name="projetos_created_id_idx"),
+            # Client area: own projects, newest first / filtered by status
+            models.Index(fields=["cliente", "-created_at", "-id"], name="projetos_cli_created_idx"),
+            models.Index(
+                fields=["cliente", "status", "-created_at"], name="projetos_cli_status_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.nome
@@ -196,15 +205,73 @@ class MensagemProjeto(models.Model):
     anexos = models.JSONField(_("Anexos"), default=list, blank=True)
     lido = models.BooleanField(_("Lido"), default=False)
     created_at = models.DateTimeField(_("Enviado em"), auto_now_add=True)
+    updated_at = models.DateTimeField(_("Atualizado em"), auto_now=True)
 
     class Meta:
         verbose_name = _("Mensagem do Projeto")
         verbose_name_plural = _("Mensagens do Projeto")
         ordering = ["created_at"]
+        indexes = [
+            # Delta sync (api.sync): every change since a watermark
+            models.Index(fields=["updated_at", "id"], name="projetos_msg_updated_idx"),
+        ]
 
     def __str__(self):
         return f"{self.autor} - {self.created_at}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        fields = instance.__dict__
+        if {"projeto_id", "autor_id", "lido"} <= fields.keys():
+            instance._loaded = (fields["projeto_id"], fields["autor_id"], fields["lido"])
+        return instance
+
+    @staticmethod
+    def _counted(cliente_id, autor_id, lido):
+        """``(usuario_id, nao_lida)`` for the project client's unread counter."""
+        return (cliente_id, not lido and autor_id != cliente_id)
+
+    def save(self, *args, **kwargs):
+        """Save and move the project client's unread-message counter."""
+        from notificacoes import unread
+
+        # An explicit pk may point at an existing row: treat it as unknown
+        adding = self._state.adding and self.pk is None
+        loaded = getattr(self, "_loaded", None)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            cliente_id = self.projeto.cliente_id
+            depois = self._counted(cliente_id, self.autor_id, self.lido)
+            if adding:
+                unread.ajustar_mudanca("mensagens", None, depois)
+            elif loaded is not None and loaded[0] == self.projeto_id:
+                antes = self._counted(cliente_id, *loaded[1:])
+                unread.ajustar_mudanca("mensagens", antes, depois)
+            else:
+                # Previous state unknown, or moved between projects: recount
+                owners = {cliente_id}
+                if loaded is not None:
+                    owners.update(
+                        Projeto.objects.filter(pk=loaded[0]).values_list("cliente_id", flat=True)
+                    )
+                unread.recalcular(owners)
+        self._loaded = (self.projeto_id, self.autor_id, self.lido)
+
+    def delete(self, *args, **kwargs):
+        from notificacoes import unread
+
+        cliente_id = self.projeto.cliente_id
+        loaded = getattr(self, "_loaded", None)
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            if loaded is not None and loaded[0] == self.projeto_id:
+                antes = self._counted(cliente_id, *loaded[1:])
+                unread.ajustar_mudanca("mensagens", antes, None)
+            else:
+                unread.recalcular([cliente_id])
+        return result
+
 
 class ArquivoProjeto(models.Model):
     """Project file/document."""
@@ -6,9 +6,15 @@ import datetime
 
 from django.contrib.auth import get_user_model
 from django.db import IntegrityError
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.urls import reverse
 
+from faturas.models import Fatura
+from notificacoes import unread
+from notificacoes.models import ContadorNaoLidos
+from orcamentos.models import Orcamento
 from projetos.models import ArquivoProjeto, MensagemProjeto, Milestone, Projeto, TimelineEvento
+from suporte.models import Ticket
 
 User = get_user_model()
 
@@ -311,6 +317,61 @@ class MensagemProjetoModelTest(TestCase):
         self.assertTrue(self.mensagem.lido)
 
 
+class MensagemNaoLidaCounterTest(TestCase):
+    """The client's unread-message counter follows MensagemProjeto.lido."""
+
+    def setUp(self):
+        self.cliente = make_user("msg_counter@example.com", "Cliente Contador")
+        self.equipe = make_user("msg_team@example.com", "Equipe")
+        self.projeto = make_projeto(self.cliente, "Projeto Contador")
+        unread.get_counts(self.cliente.pk)
+
+    def mensagem(self, autor=None, **kwargs):
+        return MensagemProjeto.objects.create(
+            projeto=self.projeto, autor=autor or self.equipe, conteudo="Oi", **kwargs
+        )
+
+    def mensagens(self):
+        return ContadorNaoLidos.objects.get(pk=self.cliente.pk).mensagens
+
+    def test_messages_from_others_count(self):
+        self.mensagem()
+        self.mensagem(autor=self.cliente)
+        MensagemProjeto.objects.create(projeto=self.projeto, conteudo="Sistema")
+        self.assertEqual(self.mensagens(), 2)
+
+    def test_marking_read_and_deleting_decrement(self):
+        lida = self.mensagem()
+        apagada = self.mensagem()
+        lida.lido = True
+        lida.save()
+        apagada.delete()
+        self.assertEqual(self.mensagens(), 0)
+        # Deleting an already-read message leaves the counter alone
+        lida.delete()
+        self.assertEqual(self.mensagens(), 0)
+
+    def test_moving_to_another_clients_project(self):
+        outro = make_user("msg_counter2@example.com", "Outro Cliente")
+        unread.get_counts(outro.pk)
+        msg = self.mensagem()
+        msg.projeto = make_projeto(outro, "Projeto Outro")
+        msg.save()
+        self.assertEqual(self.mensagens(), 0)
+        self.assertEqual(ContadorNaoLidos.objects.get(pk=outro.pk).mensagens, 1)
+
+    def test_opening_the_conversation_marks_it_read(self):
+        self.mensagem()
+        self.mensagem(autor=self.cliente)
+        self.client.force_login(self.cliente)
+        response = self.client.get(reverse("projetos:mensagens", args=[self.projeto.slug]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.mensagens(), 0)
+        self.assertFalse(MensagemProjeto.objects.filter(autor=self.equipe, lido=False).exists())
+        # The client's own message is the team's to read
+        self.assertFalse(MensagemProjeto.objects.get(autor=self.cliente).lido)
+
+
 # ─────────────────────────── ArquivoProjeto ──────────────────────────────────
 
 
@@ -348,3 +409,75 @@ class ArquivoProjetoModelTest(TestCase):
     def test_meta_ordering_newest_first(self):
         meta = ArquivoProjeto._meta
         self.assertIn("-created_at", meta.ordering)
+
+
+# ─────────────────────────── Dashboard ───────────────────────────────────────
+
+
+@override_settings(SESSION_ACTIVITY_FLUSH_INTERVAL=3600)
+# The query count includes the session read, so pin the DB engine (CI's REDIS_URL selects the cache)
+@override_settings(SESSION_ENGINE="django.contrib.sessions.backends.db")
+class DashboardViewTest(TestCase):
+    """Tests for projetos.views.DashboardView."""
+
+    def setUp(self):
+        self.user = make_user("dash_user@example.com", "Dashboard User")
+        self.other = make_user("dash_other@example.com", "Other User")
+        for status in ["em_desenvolvimento", "em_testes", "concluido"]:
+            make_projeto(self.user, nome=f"Projeto {status}", status=status)
+        make_projeto(self.other, nome="Projeto alheio", status="em_desenvolvimento")
+        for status in ["aberto", "em_atendimento", "fechado"]:
+            Ticket.objects.create(
+                cliente=self.user, assunto="Ajuda", descricao="-", categoria="duvida", status=status
+            )
+        for status in ["novo", "aprovado"]:
+            Orcamento.objects.create(
+                cliente=self.user,
+                nome_completo="Dashboard User",
+                email="dash_user@example.com",
+                telefone="-",
+                cidade="Fortaleza",
+                estado="CE",
+                tipo_projeto="ecommerce",
+                descricao_projeto="-",
+                status=status,
+            )
+        for i, status in enumerate(["pendente", "pendente", "paga"]):
+            Fatura.objects.create(
+                numero=f"INV-2026-09{i:02d}",
+                cliente=self.user,
+                data_vencimento=datetime.date(2026, 4, 10),
+                status=status,
+            )
+        self.client.force_login(self.user)
+        self.url = reverse("projetos:dashboard")
+        # First hit rotates the session; later loads are the steady state
+        self.client.get(self.url)
+
+    def test_counters_are_scoped_to_the_user(self):
+        context = self.client.get(self.url).context
+        self.assertEqual(context["projetos_ativos"], 2)
+        self.assertEqual(context["tickets_abertos"], 2)
+        self.assertEqual(context["orcamentos_pendentes"], 1)
+        self.assertEqual(len(context["faturas_pendentes"]), 2)
+        self.assertEqual(len(context["projetos"]), 3)
+
+    def test_counters_are_zero_without_rows(self):
+        self.client.force_login(self.other)
+        context = self.client.get(self.url).context
+        self.assertEqual(
+            (
+                context["projetos_ativos"],
+                context["tickets_abertos"],
+                context["orcamentos_pendentes"],
+            ),
+            (1, 0, 0),
+        )
+        self.assertEqual(context["faturas_pendentes"], [])
+
+    def test_query_count(self):
+        # session + user, then counters, faturas pendentes, unread badge,
+        # projetos and orçamentos
+        with self.assertNumQueries(7):
+            response = self.client.get(self.url)
+        self.assertContains(response, "INV-2026-0900")
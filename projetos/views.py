@@ -1,11 +1,15 @@
 """Projetos app views."""
 
 import nh3
+from django.contrib.auth import get_user_model
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.shortcuts import get_object_or_404, redirect
 from django.views.generic import DetailView, ListView, TemplateView, View
 
 from faturas.models import Fatura
+from notificacoes import unread
 from orcamentos.models import Orcamento
 from suporte.models import Ticket
 
@@ -22,25 +26,46 @@ class DashboardView(LoginRequiredMixin, TemplateView):
 
     template_name = "projetos/dashboard.html"
 
+    PROJETOS_ATIVOS = ["em_desenvolvimento", "em_testes", "revisao"]
+    TICKETS_ABERTOS = ["aberto", "em_atendimento"]
+    ORCAMENTOS_PENDENTES = ["novo", "em_analise", "aguardando_info"]
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         user = self.request.user
+        # All counters in one query: a correlated COUNT per model on the user row,
+        # each served by that model's (cliente, status) index
+        context.update(
+            get_user_model()
+            .objects.filter(pk=user.pk)
+            .values(
+                projetos_ativos=_count(Projeto, status__in=self.PROJETOS_ATIVOS),
+                tickets_abertos=_count(Ticket, status__in=self.TICKETS_ABERTOS),
+                orcamentos_pendentes=_count(Orcamento, status__in=self.ORCAMENTOS_PENDENTES),
+            )
+            .get()
+        )
         context["projetos"] = Projeto.objects.filter(cliente=user)[:5]
-        context["projetos_ativos"] = Projeto.objects.filter(
-            cliente=user, status__in=["em_desenvolvimento", "em_testes", "revisao"]
-        ).count()
-        context["faturas_pendentes"] = Fatura.objects.filter(cliente=user, status="pendente")
-        context["tickets_abertos"] = Ticket.objects.filter(
-            cliente=user, status__in=["aberto", "em_atendimento"]
-        ).count()
-        # Add orcamentos
         context["orcamentos"] = Orcamento.objects.filter(cliente=user)[:5]
-        context["orcamentos_pendentes"] = Orcamento.objects.filter(
-            cliente=user, status__in=["novo", "em_analise", "aguardando_info"]
-        ).count()
+        # Listed in full, so the template counts the list instead of querying again
+        context["faturas_pendentes"] = list(Fatura.objects.filter(cliente=user, status="pendente"))
         return context
 
 
+def _count(model, **filters):
+    """Number of the outer user's ``model`` rows matching ``filters``."""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(cliente=OuterRef("pk"), **filters)
+            .order_by()
+            .values("cliente")
+            .annotate(total=Count("pk"))
+            .values("total")
+        ),
+        0,
+    )
+
+
 class ProjetoListView(LoginRequiredMixin, ListView):
     """List all client projects."""
 
@@ -77,6 +102,11 @@ class MensagensView(LoginRequiredMixin, DetailView):
     def get_queryset(self):
         return Projeto.objects.filter(cliente=self.request.user)
 
+    def get(self, request, *args, **kwargs):
+        response = super().get(request, *args, **kwargs)
+        unread.marcar_mensagens_lidas(self.object, request.user.pk)
+        return response
+
 
 class ArquivosView(LoginRequiredMixin, DetailView):
     """Project files view."""
@@ -0,0 +1,16 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("suporte", "0003_alter_respostaticket_conteudo"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="ticket",
+            index=models.Index(fields=["-created_at", "-id"], name="suporte_ticket_created_id_idx"),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("suporte", "0004_ticket_suporte_ticket_created_id_idx"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="ticket",
+            index=models.Index(
+                fields=["cliente", "-created_at", "-id"], name="suporte_ticket_cli_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ticket",
+            index=models.Index(
+                fields=["cliente", "status", "-created_at"], name="suporte_ticket_cli_status_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:58
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_updated_at(apps, schema_editor):
+    # Existing rows last changed, as far as we know, when they were created
+    apps.get_model("suporte", "RespostaTicket").objects.update(updated_at=F("created_at"))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("suporte", "0005_owner_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="respostaticket",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, verbose_name="Atualizado em"),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="respostaticket",
+            index=models.Index(fields=["updated_at", "id"], name="suporte_resposta_updated_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="ticket",
+            index=models.Index(
+                fields=["cliente", "updated_at", "id"], name="suporte_ticket_cli_updated_idx"
+            ),
+        ),
+    ]
@@ -4,7 +4,7 @@ Suporte App Models - Support tickets
 
 from django.conf import settings
 from django.core.validators import MaxLengthValidator
-from django.db import models
+from django.db import models, transaction
 from django.utils.translation import gettext_lazy as _
 
 
@@ -84,27 +84,38 @@ class Ticket(models.Model):
         verbose_name = _("Ticket")
         verbose_name_plural = _("Tickets")
         ordering = ["-created_at"]
+        indexes = [
+            # Keyset pagination (api.pagination.KeysetCursorPagination)
+            models.Index(fields=["-created_at", "-id"], name="suporte_ticket_created_id_idx"),
+            # Client area: own tickets, newest first / filtered by status
+            models.Index(
+                fields=["cliente", "-created_at", "-id"], name="suporte_ticket_cli_created_idx"
+            ),
+            models.Index(
+                fields=["cliente", "status", "-created_at"], name="suporte_ticket_cli_status_idx"
+            ),
+            # Delta sync (api.sync): a client's changes since a watermark
+            models.Index(
+                fields=["cliente", "updated_at", "id"], name="suporte_ticket_cli_updated_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"{self.numero} - {self.assunto}"
 
     def save(self, *args, **kwargs):
-        if not self.numero:
-            from datetime import datetime
+        if self.numero:
+            return super().save(*args, **kwargs)
+        from core.sequences import allocate_numero
 
-            from django.db.models import Max
-
-            year = datetime.now().year
-            prefix = f"TKT-{year}-"
-            last = Ticket.objects.filter(numero__startswith=prefix).aggregate(
-                max_num=Max("numero")
-            )["max_num"]
-            if last:
-                count = int(last.split("-")[-1]) + 1
-            else:
-                count = 1
-            self.numero = f"{prefix}{count:04d}"
-        super().save(*args, **kwargs)
+        # One transaction, so a failed INSERT also rolls the counter back (no gaps)
+        try:
+            with transaction.atomic():
+                self.numero = allocate_numero(Ticket, "TKT")
+                super().save(*args, **kwargs)
+        except BaseException:
+            self.numero = ""
+            raise
 
 
 class RespostaTicket(models.Model):
@@ -124,11 +135,16 @@ class RespostaTicket(models.Model):
     anexos = models.JSONField(_("Anexos"), default=list, blank=True)
     interno = models.BooleanField(_("Nota Interna"), default=False)
     created_at = models.DateTimeField(_("Enviado em"), auto_now_add=True)
+    updated_at = models.DateTimeField(_("Atualizado em"), auto_now=True)
 
     class Meta:
         verbose_name = _("Resposta do Ticket")
         verbose_name_plural = _("Respostas do Ticket")
         ordering = ["created_at"]
+        indexes = [
+            # Delta sync (api.sync): every change since a watermark
+            models.Index(fields=["updated_at", "id"], name="suporte_resposta_updated_idx"),
+        ]
 
     def __str__(self):
         return f"{self.ticket.numero} - Resposta de {self.autor}"